@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Admission control for full chat extractions.
+
+A full extraction holds about as much memory as the DBs it reads (decoded
+bubbles, then Chat objects), so a few of them at once can exhaust a small
+machine. AdmissionController admits extraction jobs while the sum of their
+estimated costs (see extraction_cost()) stays within a memory budget and no
+more than `max_running` run at once. Other jobs wait their turn in a bounded
+FIFO queue for up to `queue_timeout` seconds. A job that finds the queue full,
+or is still waiting at the deadline, is rejected with Overloaded, which the
+server answers with 503 and a Retry-After estimate. A job costing more than
+the whole budget still runs, but only alone.
+"""
+
+import logging
+import math
+import os
+import pathlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from cursor_extraction import disk_kv_dbs, workspaces
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("CURSOR_VIEW_EXTRACT_MEMORY_MB", "1024")) * 1024 * 1024)
+DEFAULT_MAX_RUNNING = int(os.environ.get("CURSOR_VIEW_MAX_EXTRACTIONS", "2"))
+DEFAULT_MAX_QUEUED = int(os.environ.get("CURSOR_VIEW_EXTRACT_QUEUE", "8"))
+QUEUE_TIMEOUT = 30.0
+# Peak extraction memory per byte of DB read; about 1 on DBs that hold
+# little besides chats, less when checkpoints and other state dominate
+COST_PER_DB_BYTE = 1.0
+# Assumed extraction time until one has been measured
+DEFAULT_DURATION = 5.0
+
+
+def extraction_cost(root: pathlib.Path) -> int:
+    """Estimated peak memory, in bytes, of a full extraction of `root`."""
+    dbs = {db for _, db in workspaces(root)} | set(disk_kv_dbs(root))
+    total = 0
+    for db in dbs:
+        for f in (db, db.with_name(db.name + "-wal")):
+            try:
+                total += f.stat().st_size
+            except OSError:
+                pass
+    return int(total * COST_PER_DB_BYTE)
+
+
+class Overloaded(Exception):
+    """An extraction was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted (or waiting) job; release() it when the job is done."""
+
+    def __init__(self, controller: "AdmissionController", cost: int, label: str):
+        self.controller = controller
+        self.cost = cost
+        self.label = label
+        self.started = None
+        self.released = False
+
+    def release(self):
+        self.controller.release(self)
+
+
+class AdmissionController:
+    """Memory- and concurrency-bounded gate with a bounded FIFO wait queue."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_running: int = DEFAULT_MAX_RUNNING,
+                 max_queued: int = DEFAULT_MAX_QUEUED, queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_bytes = max_bytes
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._queue: "deque[Ticket]" = deque()
+        self.running = 0
+        self.running_bytes = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.avg_duration = None
+
+    def _fits(self, cost: int) -> bool:
+        if self.running == 0:
+            return True
+        return self.running < self.max_running and self.running_bytes + cost <= self.max_bytes
+
+    def retry_after(self) -> int:
+        """Seconds until a new job would likely be admitted."""
+        duration = self.avg_duration if self.avg_duration is not None else DEFAULT_DURATION
+        waves = (len(self._queue) + self.running) / self.max_running
+        return max(1, min(300, math.ceil(duration * max(1.0, waves))))
+
+    def _reject(self, reason: str) -> Overloaded:
+        retry_after = self.retry_after()
+        logger.warning(f"Extraction rejected ({reason}); "
+                       f"{self.running} running, {len(self._queue)} queued, retry after {retry_after}s")
+        return Overloaded(f"Server busy extracting chats ({reason}); retry in {retry_after}s", retry_after)
+
+    def acquire(self, cost: int, label: str = "") -> Ticket:
+        """Wait for admission of a job of `cost` bytes; raises Overloaded when rejected."""
+        ticket = Ticket(self, cost, label)
+        with self._cond:
+            if not self._queue and self._fits(cost):
+                self._start(ticket)
+                return ticket
+            if len(self._queue) >= self.max_queued:
+                self.rejected_full += 1
+                raise self._reject("queue full")
+            self._queue.append(ticket)
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            deadline = time.monotonic() + self.queue_timeout
+            while not (self._queue[0] is ticket and self._fits(cost)):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(ticket)
+                    self.rejected_timeout += 1
+                    # The next job may be admissible now that this one left the head
+                    self._cond.notify_all()
+                    raise self._reject("timed out in queue")
+                self._cond.wait(remaining)
+            self._queue.popleft()
+            self._start(ticket)
+            self._cond.notify_all()
+            return ticket
+
+    def _start(self, ticket: Ticket):
+        ticket.started = time.monotonic()
+        self.running += 1
+        self.running_bytes += ticket.cost
+        self.admitted += 1
+        logger.debug(f"Admitted extraction {ticket.label} ({ticket.cost / 1024 / 1024:.0f} MB); "
+                     f"{self.running} running")
+
+    def release(self, ticket: Ticket):
+        with self._cond:
+            if ticket.released or ticket.started is None:
+                return
+            ticket.released = True
+            self.running -= 1
+            self.running_bytes -= ticket.cost
+            self.completed += 1
+            duration = time.monotonic() - ticket.started
+            self.avg_duration = duration if self.avg_duration is None else 0.8 * self.avg_duration + 0.2 * duration
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, cost: int, label: str = ""):
+        ticket = self.acquire(cost, label)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "running": self.running,
+                "running_bytes": self.running_bytes,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "max_bytes": self.max_bytes,
+                "max_running": self.max_running,
+                "max_queued": self.max_queued,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected_queue_full": self.rejected_full,
+                "rejected_timeout": self.rejected_timeout,
+                "completed": self.completed,
+                "avg_duration_s": round(self.avg_duration, 3) if self.avg_duration is not None else None,
+            }
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Write extracted chats to a normalized analytics archive.
+
+Tables
+------
+    projects  – id, name, root_path
+    sessions  – composer_id, project_id, workspace_id, title, created_at,
+                last_updated_at, db_path, message_count
+    messages  – session_id, seq, role, content
+
+The SQLite archive can be queried directly (`sqlite3 chats.sqlite`). Parquet
+output writes one file per table into a directory and needs `pyarrow`.
+
+Rows are written chat by chat in batched transactions as the chats come in;
+fed from RootSet.iter_chats(), only a batch of chats is ever in memory. Writing into an existing SQLite
+archive replaces the sessions it already holds, so it can be refreshed.
+"""
+
+import pathlib
+import sqlite3
+from typing import Dict, Iterable
+
+from cursor_extraction import Chat, MissingDependency
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id        INTEGER PRIMARY KEY,
+    name      TEXT,
+    root_path TEXT,
+    UNIQUE (name, root_path)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    composer_id     TEXT PRIMARY KEY,
+    project_id      INTEGER REFERENCES projects(id),
+    workspace_id    TEXT,
+    title           TEXT,
+    created_at      INTEGER,
+    last_updated_at INTEGER,
+    db_path         TEXT,
+    message_count   INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id TEXT REFERENCES sessions(composer_id),
+    seq        INTEGER,
+    role       TEXT,
+    content    TEXT
+);
+"""
+
+# Created after the bulk load; maintaining them row by row is much slower.
+INDEXES = """
+CREATE UNIQUE INDEX IF NOT EXISTS messages_session_seq ON messages(session_id, seq);
+CREATE INDEX IF NOT EXISTS messages_role ON messages(role);
+CREATE INDEX IF NOT EXISTS sessions_project ON sessions(project_id);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(last_updated_at);
+CREATE INDEX IF NOT EXISTS sessions_workspace ON sessions(workspace_id);
+"""
+
+BATCH_MESSAGES = 50_000
+
+
+def write_sqlite_archive(chats: Iterable[Chat], path: pathlib.Path) -> Dict[str, int]:
+    """Write chats into the SQLite archive at `path`. Returns row counts."""
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    # The archive is rebuilt from the source DBs if a write is interrupted
+    con.execute("PRAGMA journal_mode=OFF")
+    con.execute("PRAGMA synchronous=OFF")
+    cur = con.cursor()
+
+    project_ids: Dict[tuple, int] = {}
+    counts = {"projects": 0, "sessions": 0, "messages": 0}
+    pending = 0
+    try:
+        cur.execute("BEGIN")
+        for chat in chats:
+            # Keyed by value, not id(): chats (and their Project) may be freed as they are written
+            key = (chat.project.name, chat.project.root_path)
+            pid = project_ids.get(key)
+            if pid is None:
+                proj = chat.project
+                cur.execute("INSERT OR IGNORE INTO projects (name, root_path) VALUES (?, ?)",
+                            (proj.name, proj.root_path))
+                cur.execute("SELECT id FROM projects WHERE name IS ? AND root_path IS ?",
+                            (proj.name, proj.root_path))
+                pid = project_ids[key] = cur.fetchone()[0]
+                counts["projects"] += 1
+
+            cur.execute("DELETE FROM messages WHERE session_id=?", (chat.composer_id,))
+            cur.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chat.composer_id, pid, chat.workspace_id, chat.title, chat.created_at,
+                 chat.last_updated_at, chat.db_path, len(chat.messages)),
+            )
+            cur.executemany(
+                "INSERT INTO messages VALUES (?, ?, ?, ?)",
+                ((chat.composer_id, seq, m.role, m.content) for seq, m in enumerate(chat.messages)),
+            )
+            counts["sessions"] += 1
+            counts["messages"] += len(chat.messages)
+            pending += len(chat.messages)
+            if pending >= BATCH_MESSAGES:
+                cur.execute("COMMIT")
+                cur.execute("BEGIN")
+                pending = 0
+        cur.execute("COMMIT")
+        con.executescript(INDEXES)
+        con.execute("ANALYZE")
+    finally:
+        con.close()
+    return counts
+
+
+def write_parquet_archive(chats: Iterable[Chat], directory: pathlib.Path) -> Dict[str, int]:
+    """Write projects/sessions/messages.parquet into `directory`. Returns row counts."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise MissingDependency("Parquet output needs pyarrow: python3 -m pip install pyarrow")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    project_schema = pa.schema([("id", pa.int64()), ("name", pa.string()), ("root_path", pa.string())])
+    session_schema = pa.schema([
+        ("composer_id", pa.string()), ("project_id", pa.int64()), ("workspace_id", pa.string()),
+        ("title", pa.string()), ("created_at", pa.int64()), ("last_updated_at", pa.int64()),
+        ("db_path", pa.string()), ("message_count", pa.int64()),
+    ])
+    message_schema = pa.schema([
+        ("session_id", pa.string()), ("seq", pa.int64()),
+        ("role", pa.dictionary(pa.int32(), pa.string())), ("content", pa.string()),
+    ])
+
+    projects = {"id": [], "name": [], "root_path": []}
+    sessions = {name: [] for name in session_schema.names}
+    messages = {name: [] for name in message_schema.names}
+    project_ids: Dict[tuple, int] = {}
+    counts = {"projects": 0, "sessions": 0, "messages": 0}
+
+    writer = pq.ParquetWriter(directory / "messages.parquet", message_schema)
+
+    def flush_messages():
+        if messages["seq"]:
+            writer.write_table(pa.table(messages, schema=message_schema))
+            for col in messages.values():
+                col.clear()
+
+    try:
+        for chat in chats:
+            key = (chat.project.name, chat.project.root_path)
+            pid = project_ids.get(key)
+            if pid is None:
+                pid = project_ids[key] = len(project_ids) + 1
+                projects["id"].append(pid)
+                projects["name"].append(chat.project.name)
+                projects["root_path"].append(chat.project.root_path)
+            for name, value in zip(session_schema.names, (
+                    chat.composer_id, pid, chat.workspace_id, chat.title, chat.created_at,
+                    chat.last_updated_at, chat.db_path, len(chat.messages))):
+                sessions[name].append(value)
+            for seq, m in enumerate(chat.messages):
+                messages["session_id"].append(chat.composer_id)
+                messages["seq"].append(seq)
+                messages["role"].append(m.role)
+                messages["content"].append(m.content)
+            counts["messages"] += len(chat.messages)
+            if len(messages["seq"]) >= BATCH_MESSAGES:
+                flush_messages()
+        flush_messages()
+    finally:
+        writer.close()
+
+    pq.write_table(pa.table(projects, schema=project_schema), directory / "projects.parquet")
+    pq.write_table(pa.table(sessions, schema=session_schema), directory / "sessions.parquet")
+    counts["projects"] = len(projects["id"])
+    counts["sessions"] = len(sessions["composer_id"])
+    return counts
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chat detection with MinHash signatures and LSH banding.
+
+Each chat is reduced to the set of its word 3-gram shingles; a MinHash
+signature of NUM_PERM values estimates the Jaccard similarity between two
+such sets. Signatures are cut into BANDS bands and chats sharing a band land
+in the same LSH bucket, so only bucket-mates are compared and the cost grows
+roughly linearly with the number of chats. Candidates whose estimated
+similarity is at least THRESHOLD are merged into clusters.
+
+Like the search index, signatures are kept per composer and recomputed only
+for chats whose (lastUpdatedAt, message count) stamp changed. Needs numpy.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from chat_search import TOKEN_RE, chat_summary, chat_text, require_numpy
+from cursor_extraction import Chat, MissingDependency
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+BANDS = 16           # 16 bands of 8 rows: pairs above ~0.7 Jaccard collide
+THRESHOLD = 0.8
+MIN_SHINGLES = 5     # near-empty chats would all "match" each other
+SEED = 1
+
+_MASK32 = (1 << 32) - 1
+
+
+class DuplicateDetector:
+    """Incrementally maintained MinHash/LSH clusters of near-identical chats."""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS,
+                 threshold: float = THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # cid -> {"stamp", "sig" (uint32[num_perm] or None), "meta"}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._clusters: Optional[List[List[str]]] = None
+        self._perms = None
+        # Background job state has its own lock so callers never wait for a run
+        self._job_lock = threading.Lock()
+        self._job: Optional[threading.Thread] = None
+        self._queued: Optional[List[Chat]] = None
+        # Set once a background run finds numpy missing; update_async() then stops scheduling
+        self._disabled = False
+
+    def _permutations(self):
+        if self._perms is None:
+            np, _ = require_numpy()
+            rng = np.random.RandomState(SEED)
+            # Odd multipliers, as multiply-shift hashing requires
+            a = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+            b = rng.randint(0, 1 << 63, size=self.num_perm, dtype=np.uint64)
+            self._perms = (a[:, None], b[:, None])
+        return self._perms
+
+    def signature(self, text: str):
+        """MinHash signature of the word 3-gram shingles of `text`, or None if too short."""
+        np, _ = require_numpy()
+        tokens = TOKEN_RE.findall(text.lower())
+        shingles = {hash(s) & _MASK32 for s in zip(tokens, tokens[1:], tokens[2:])}
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        hv = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        a, b = self._permutations()
+        # (num_perm, n_shingles) multiply-shift hashes: the high 32 bits of
+        # a*x + b mod 2^64 (uint64 wrap-around is intended)
+        phv = a * hv
+        phv += b
+        phv >>= np.uint64(32)
+        return phv.min(axis=1).astype(np.uint32)
+
+    def update(self, chats: Iterable[Chat]) -> Dict[str, int]:
+        """Sync signatures with `chats`: compute new/changed ones, drop missing ones."""
+        changed = 0
+        with self._lock:
+            seen = set()
+            for chat in chats:
+                cid = chat.composer_id
+                seen.add(cid)
+                stamp = (chat.last_updated_at, len(chat.messages))
+                doc = self._docs.get(cid)
+                if doc and doc["stamp"] == stamp:
+                    continue
+                self._docs[cid] = {
+                    "stamp": stamp,
+                    "sig": self.signature(chat_text(chat)),
+                    "meta": chat_summary(chat),
+                }
+                changed += 1
+            removed = [cid for cid in self._docs if cid not in seen]
+            for cid in removed:
+                del self._docs[cid]
+            if changed or removed:
+                self._clusters = None
+        return {"changed": changed, "removed": len(removed)}
+
+    def update_async(self, chats: List[Chat]):
+        """
+        Run update() in a background thread; coalesces calls made while it
+        runs. Does nothing once a run found numpy missing.
+        """
+        with self._job_lock:
+            if self._disabled:
+                return
+            self._queued = chats
+            if self._job is None:
+                self._job = threading.Thread(target=self._run_jobs, name="duplicate-detector",
+                                             daemon=True)
+                self._job.start()
+
+    def _run_jobs(self):
+        while True:
+            with self._job_lock:
+                chats, self._queued = self._queued, None
+                # Give up the job in the same locked block that found no work,
+                # so update_async() either queued before this or starts a new job
+                if chats is None:
+                    self._job = None
+                    return
+            try:
+                self.update(chats)
+                self.clusters()
+            except MissingDependency as e:
+                logger.info(f"Duplicate detection disabled: {e}")
+                with self._job_lock:
+                    self._disabled = True
+                    self._queued = self._job = None
+                return
+            except Exception as e:
+                logger.error(f"Error in duplicate detection: {e}", exc_info=True)
+
+    @property
+    def pending(self) -> bool:
+        with self._job_lock:
+            return self._job is not None
+
+    def clusters(self) -> List[List[str]]:
+        """Clusters (lists of composerIds, 2 or more each) of near-duplicate chats."""
+        with self._lock:
+            if self._clusters is None:
+                self._clusters = self._find_clusters()
+            return self._clusters
+
+    def _find_clusters(self) -> List[List[str]]:
+        np, _ = require_numpy()
+        ids = [cid for cid, doc in self._docs.items() if doc["sig"] is not None]
+        if len(ids) < 2:
+            return []
+        sigs = np.stack([self._docs[cid]["sig"] for cid in ids])
+        rows = self.num_perm // self.bands
+
+        # Chats with identical signatures are joined up front, without
+        # comparing them, so only distinct signatures go through the bands
+        # and buckets of many copies of one chat stay cheap
+        full = sigs.view(np.dtype((np.void, sigs.dtype.itemsize * self.num_perm))).ravel()
+        _, first, inverse = np.unique(full, return_index=True, return_inverse=True)
+        parent = first[inverse.reshape(-1)].tolist()
+        distinct = sigs[first]
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            chunk = np.ascontiguousarray(distinct[:, band * rows:(band + 1) * rows])
+            keys = chunk.view(np.dtype((np.void, chunk.dtype.itemsize * rows))).ravel()
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            # Bucket boundaries where the band value changes
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(order)])
+            for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+                members = order[start:start + size]
+                # Every pair of bucket-mates is compared: two chats can be
+                # near-duplicates of each other but not of a third one
+                for i in range(len(members) - 1):
+                    sim = (distinct[members[i + 1:]] == distinct[members[i]]).mean(axis=1)
+                    for other in members[i + 1:][sim >= self.threshold]:
+                        ra, rb = find(int(first[members[i]])), find(int(first[other]))
+                        if ra != rb:
+                            parent[rb] = ra
+
+        groups: Dict[int, List[str]] = {}
+        for i, cid in enumerate(ids):
+            groups.setdefault(find(i), []).append(cid)
+        clusters = [g for g in groups.values() if len(g) > 1]
+        # Most recently updated chat first, largest clusters first
+        for g in clusters:
+            g.sort(key=lambda cid: self._docs[cid]["stamp"][0] or 0, reverse=True)
+        clusters.sort(key=len, reverse=True)
+        return clusters
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Clusters with chat summaries, for the API."""
+        clusters = self.clusters()
+        with self._lock:
+            return [{"size": len(g), "chats": [self._docs[cid]["meta"] for cid in g]}
+                    for g in clusters if all(cid in self._docs for cid in g)]
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Turn extracted chats into what the web UI and exports show.
+
+`format_chat_for_frontend()` produces the chat JSON served by the API and
+`generate_standalone_html()` the self-contained HTML export. Kept free of
+Flask so command-line tools can render chats the same way the server does.
+"""
+
+import datetime
+import logging
+import os
+import uuid
+from pathlib import Path
+
+from cursor_extraction import Chat, extract_project_from_git_repos, extract_project_name_from_path
+from cursor_roots import RootSet
+
+logger = logging.getLogger(__name__)
+
+def frontend_project(project: dict, workspace_id: str, root: Path = None) -> dict:
+    """Improve a generic project name/rootPath and tag it with the workspace ID."""
+    # If project name is a username or unknown, try to extract a better name from rootPath
+    if project.get('rootPath'):
+        current_name = project.get('name', '')
+        username = os.path.basename(os.path.expanduser('~'))
+
+        # Check if project name is username or unknown or very generic
+        if (current_name == username or 
+            current_name == '(unknown)' or 
+            current_name == 'Root' or
+            # Check if rootPath is directly under /Users/username with no additional path components
+            (project.get('rootPath').startswith(f'/Users/{username}') and 
+             project.get('rootPath').count('/') <= 3)):
+
+            # Try to extract a better name from the path
+            project_name = extract_project_name_from_path(project.get('rootPath'), debug=False)
+
+            # Only use the new name if it's meaningful
+            if (project_name and 
+                project_name != 'Unknown Project' and 
+                project_name != username and
+                project_name not in ['Documents', 'Downloads', 'Desktop']):
+
+                logger.debug(f"Improved project name from '{current_name}' to '{project_name}'")
+                project['name'] = project_name
+            elif project.get('rootPath').startswith(f'/Users/{username}/Documents/codebase/'):
+                # Special case for /Users/saharmor/Documents/codebase/X
+                parts = project.get('rootPath').split('/')
+                if len(parts) > 5:  # /Users/username/Documents/codebase/X
+                    project['name'] = parts[5]
+                    logger.debug(f"Set project name to specific codebase subdirectory: {parts[5]}")
+                else:
+                    project['name'] = "cursor-view"  # Current project as default
+
+    # If the project doesn't have a rootPath or it's very generic, enhance it with workspace_id
+    if not project.get('rootPath') or project.get('rootPath') == '/' or project.get('rootPath') == '/Users':
+        if workspace_id != 'unknown':
+            # Use workspace_id to create a more specific path
+            if not project.get('rootPath'):
+                project['rootPath'] = f"/workspace/{workspace_id}"
+            elif project.get('rootPath') == '/' or project.get('rootPath') == '/Users':
+                project['rootPath'] = f"{project['rootPath']}/workspace/{workspace_id}"
+
+    # FALLBACK: If project name is still generic, try to extract it from git repositories
+    if project.get('name') in ['Home Directory', '(unknown)']:
+        git_project_name = extract_project_from_git_repos(workspace_id, debug=True, root=root)
+        if git_project_name:
+            logger.debug(f"Improved project name from '{project.get('name')}' to '{git_project_name}' using git repo")
+            project['name'] = git_project_name
+
+    # Add workspace_id to the project data explicitly
+    project['workspace_id'] = workspace_id
+    return project
+
+def format_chat_for_frontend(chat: Chat, project_cache: dict = None, roots: RootSet = None):
+    """
+    Format the chat data to match what the frontend expects.
+
+    Chats of one workspace share a Project, so pass the same `project_cache`
+    dict when formatting many chats to fix up each project only once. `roots`
+    routes chats of namespaced roots to their storage directory.
+    """
+    try:
+        session_id = chat.composer_id or str(uuid.uuid4())
+        
+        # Format date from createdAt timestamp or use current date
+        date = int(datetime.datetime.now().timestamp())
+        created_at = chat.created_at
+        if created_at and isinstance(created_at, (int, float)):
+            # Convert from milliseconds to seconds
+            date = created_at / 1000
+        
+        # Get workspace_id from chat
+        workspace_id = chat.workspace_id or 'unknown'
+        
+        # Get the database path information
+        db_path = chat.db_path or 'Unknown database path'
+        
+        if project_cache is None:
+            project_cache = {}
+        key = (id(chat.project), workspace_id)
+        if key not in project_cache:
+            project_cache[key] = frontend_project(chat.project.to_dict(), workspace_id,
+                                                  roots.root_path(session_id) if roots else None)
+        
+        # Create properly formatted chat object
+        formatted = {
+            'project': project_cache[key],
+            'messages': [m.to_dict() for m in chat.messages],
+            'date': date,
+            'session_id': session_id,
+            'workspace_id': workspace_id,
+            'db_path': db_path  # Include the database path in the output
+        }
+        if roots is not None and roots.namespaced:
+            formatted['root'] = roots.split_id(session_id)[0].name
+        return formatted
+    except Exception as e:
+        logger.error(f"Error formatting chat: {e}")
+        # Return a minimal valid object if there's an error
+        return {
+            'project': {'name': 'Error', 'rootPath': '/'},
+            'messages': [],
+            'date': int(datetime.datetime.now().timestamp()),
+            'session_id': str(uuid.uuid4()),
+            'workspace_id': 'error',
+            'db_path': 'Error retrieving database path'
+        }
+
+# Stylesheet of generate_standalone_html(), also used by the static site
+# (static_site.py) so its index pages look like the chat pages
+STANDALONE_CSS = """\
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; line-height: 1.6; color: #333; max-width: 900px; margin: 20px auto; padding: 20px; border: 1px solid #eee; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }
+        h1, h2, h3 { color: #2c3e50; }
+        .header { background: linear-gradient(90deg, #f0f7ff 0%, #f0fff7 100%); color: white; padding: 15px 20px; border-radius: 8px 8px 0 0; margin: -20px -20px 20px -20px; }
+        .chat-info { display: flex; flex-wrap: wrap; gap: 10px 20px; margin-bottom: 20px; background-color: #f9f9f9; padding: 12px 15px; border-radius: 8px; font-size: 0.9em; }
+        .info-item { display: flex; align-items: center; }
+        .info-label { font-weight: bold; margin-right: 5px; color: #555; }
+        pre { background-color: #eef; padding: 15px; border-radius: 5px; overflow-x: auto; border: 1px solid #ddd; font-family: 'Courier New', Courier, monospace; font-size: 0.9em; white-space: pre-wrap; word-wrap: break-word; }
+        code { background-color: transparent; padding: 0; border-radius: 0; font-family: inherit; }
+        .message-content pre code { background-color: transparent; }
+        .message-content { word-wrap: break-word; overflow-wrap: break-word; }"""
+
+def generate_standalone_html(chat):
+    """Generate a standalone HTML representation of the chat."""
+    logger.info(f"Generating HTML for session ID: {chat.get('session_id', 'N/A')}")
+    try:
+        # Format date for display
+        date_display = "Unknown date"
+        if chat.get('date'):
+            try:
+                date_obj = datetime.datetime.fromtimestamp(chat['date'])
+                date_display = date_obj.strftime("%Y-%m-%d %H:%M:%S")
+            except Exception as e:
+                logger.warning(f"Error formatting date: {e}")
+        
+        # Get project info
+        project_name = chat.get('project', {}).get('name', 'Unknown Project')
+        project_path = chat.get('project', {}).get('rootPath', 'Unknown Path')
+        logger.info(f"Project: {project_name}, Path: {project_path}, Date: {date_display}")
+        
+        # Build the HTML content
+        messages_html = ""
+        messages = chat.get('messages', [])
+        logger.info(f"Found {len(messages)} messages for the chat.")
+        
+        if not messages:
+            logger.warning("No messages found in the chat object to generate HTML.")
+            messages_html = "<p>No messages found in this conversation.</p>"
+        else:
+            for i, msg in enumerate(messages):
+                role = msg.get('role', 'unknown')
+                content = msg.get('content', '')
+                logger.debug(f"Processing message {i+1}/{len(messages)} - Role: {role}, Content length: {len(content)}")
+                
+                if not content or not isinstance(content, str):
+                    logger.warning(f"Message {i+1} has invalid content: {content}")
+                    content = "Content unavailable"
+                
+                # Simple HTML escaping
+                escaped_content = content.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                
+                # Convert markdown code blocks (handle potential nesting issues simply)
+                processed_content = ""
+                in_code_block = False
+                for line in escaped_content.split('\n'):
+                    if line.strip().startswith("```"):
+                        if not in_code_block:
+                            processed_content += "<pre><code>"
+                            in_code_block = True
+                            # Remove the first ``` marker
+                            line = line.strip()[3:] 
+                        else:
+                            processed_content += "</code></pre>\n"
+                            in_code_block = False
+                            line = "" # Skip the closing ``` line
+                    
+                    if in_code_block:
+                         # Inside code block, preserve spacing and add line breaks
+                        processed_content += line + "\n" 
+                    else:
+                        # Outside code block, use <br> for newlines
+                        processed_content += line + "<br>"
+                
+                # Close any unclosed code block at the end
+                if in_code_block:
+                    processed_content += "</code></pre>"
+                
+                avatar = "👤" if role == "user" else "🤖"
+                name = "You" if role == "user" else "Cursor Assistant"
+                bg_color = "#f0f7ff" if role == "user" else "#f0fff7"
+                border_color = "#3f51b5" if role == "user" else "#00796b"
+                
+                messages_html += f"""
+                <div class="message" style="margin-bottom: 20px;">
+                    <div class="message-header" style="display: flex; align-items: center; margin-bottom: 8px;">
+                        <div class="avatar" style="width: 32px; height: 32px; border-radius: 50%; background-color: {border_color}; color: white; display: flex; justify-content: center; align-items: center; margin-right: 10px;">
+                            {avatar}
+                        </div>
+                        <div class="sender" style="font-weight: bold;">{name}</div>
+                    </div>
+                    <div class="message-content" style="padding: 15px; border-radius: 8px; background-color: {bg_color}; border-left: 4px solid {border_color}; margin-left: {0 if role == 'user' else '40px'}; margin-right: {0 if role == 'assistant' else '40px'};">
+                        {processed_content} 
+                    </div>
+                </div>
+                """
+
+        # Create the complete HTML document
+        html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Cursor Chat - {project_name}</title>
+    <style>
+{STANDALONE_CSS}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Cursor Chat: {project_name}</h1>
+    </div>
+    <div class="chat-info">
+        <div class="info-item"><span class="info-label">Project:</span> <span>{project_name}</span></div>
+        <div class="info-item"><span class="info-label">Path:</span> <span>{project_path}</span></div>
+        <div class="info-item"><span class="info-label">Date:</span> <span>{date_display}</span></div>
+        <div class="info-item"><span class="info-label">Session ID:</span> <span>{chat.get('session_id', 'Unknown')}</span></div>
+    </div>
+    <h2>Conversation History</h2>
+    <div class="messages">
+{messages_html}
+    </div>
+    <div style="margin-top: 30px; font-size: 12px; color: #999; text-align: center; border-top: 1px solid #eee; padding-top: 15px;">
+        <a href="https://github.com/saharmor/cursor-view" target="_blank" rel="noopener noreferrer">Exported from Cursor View</a>
+    </div>
+</body>
+</html>"""
+        
+        logger.info(f"Finished generating HTML. Total length: {len(html)}")
+        return html
+    except Exception as e:
+        logger.error(f"Error generating HTML for session {chat.get('session_id', 'N/A')}: {e}", exc_info=True)
+        # Return an HTML formatted error message
+        return f"<html><body><h1>Error generating chat export</h1><p>Error: {e}</p></body></html>"
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Offline "similar chats" and semantic search over extracted chats.
+
+Every chat becomes a sparse TF-IDF vector over hashed word unigrams and
+bigrams. Hashing the features into a fixed-size space means there is no
+vocabulary to rebuild, so changed composers can be re-vectorized one at a
+time. Queries are answered with one sparse matrix-vector product (cosine
+similarity on L2-normalized rows).
+
+Needs numpy and scipy; both are imported lazily so the rest of the app works
+without them.
+"""
+
+import logging
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from cursor_extraction import Chat, MissingDependency
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 1 << 18
+MAX_CHARS_PER_CHAT = 200_000  # long agent sessions add little beyond this
+
+TOKEN_RE = re.compile(r"[a-z0-9_]{2,}")
+
+
+def require_numpy():
+    """(numpy, scipy.sparse); raises MissingDependency with the pip command if either is missing."""
+    try:
+        import numpy as np
+        import scipy.sparse as sp
+    except ImportError:
+        raise MissingDependency("Semantic search needs numpy and scipy: "
+                           "python3 -m pip install numpy scipy")
+    return np, sp
+
+
+def hashed_terms(text: str) -> Dict[int, int]:
+    """
+    Count hashed unigram and bigram features of `text`.
+
+    Uses the built-in hash(), which is salted per process; that is fine
+    because the index only lives in memory and is never persisted.
+    """
+    tokens = TOKEN_RE.findall(text.lower())
+    # Count first, hash each distinct term once
+    terms = Counter(tokens)
+    terms.update(zip(tokens, tokens[1:]))
+    counts: Dict[int, int] = {}
+    mask = N_FEATURES - 1
+    for term, n in terms.items():
+        h = hash(term) & mask
+        counts[h] = counts.get(h, 0) + n
+    return counts
+
+
+def chat_summary(chat: Chat) -> Dict[str, Any]:
+    """Small JSON-ready description of a chat used in search results."""
+    return {
+        "session_id": chat.composer_id,
+        "title": chat.title,
+        "project": chat.project.name,
+        "workspace_id": chat.workspace_id,
+        "date": chat.created_at / 1000 if isinstance(chat.created_at, (int, float)) else None,
+        "message_count": len(chat.messages),
+    }
+
+
+def chat_text(chat: Chat) -> str:
+    parts = [chat.title or "", chat.project.name or ""]
+    size = 0
+    for m in chat.messages:
+        parts.append(m.content)
+        size += len(m.content)
+        if size > MAX_CHARS_PER_CHAT:
+            break
+    return "\n".join(parts)
+
+
+class ChatIndex:
+    """Incrementally updated TF-IDF index of chats, keyed by composerId."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # cid -> {"stamp", "terms", "meta"}; terms are parallel arrays of
+        # feature ids and counts (8 bytes per feature) rather than a dict
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._matrix = None
+        self._ids: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._idf = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _stamp(chat: Chat):
+        return (chat.last_updated_at, len(chat.messages))
+
+    def update(self, chats: Iterable[Chat]) -> Dict[str, int]:
+        """Sync the index with `chats`: vectorize new/changed ones, drop missing ones."""
+        added = updated = 0
+        with self._lock:
+            seen = set()
+            for chat in chats:
+                cid = chat.composer_id
+                seen.add(cid)
+                stamp = self._stamp(chat)
+                doc = self._docs.get(cid)
+                if doc and doc["stamp"] == stamp:
+                    continue
+                if doc:
+                    updated += 1
+                else:
+                    added += 1
+                counts = hashed_terms(chat_text(chat))
+                self._docs[cid] = {
+                    "stamp": stamp,
+                    "terms": (array("i", counts.keys()), array("f", counts.values())),
+                    "meta": chat_summary(chat),
+                }
+            removed = [cid for cid in self._docs if cid not in seen]
+            for cid in removed:
+                del self._docs[cid]
+            # Document frequencies change with every update, so the matrix
+            # (cheap to rebuild, all vectorized) is rebuilt on the next query
+            if added or updated or removed:
+                self._matrix = None
+        return {"added": added, "updated": updated, "removed": len(removed)}
+
+    def _query_weights(self, counts: Dict[int, int]):
+        """Sublinear tf * idf for a query, as (indices, values) of unit length."""
+        np, _ = require_numpy()
+        idx = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        vals = (1.0 + np.log(tf)) * self._idf[idx]
+        norm = float(np.sqrt((vals * vals).sum()))
+        return idx, (vals / norm if norm else vals)
+
+    def _build(self):
+        """(Re)build the CSR matrix of normalized TF-IDF rows. Caller holds the lock."""
+        np, sp = require_numpy()
+        self._ids = list(self._docs)
+        self._row = {cid: i for i, cid in enumerate(self._ids)}
+        n = len(self._ids)
+        terms = [self._docs[cid]["terms"] for cid in self._ids]
+        lengths = np.fromiter((len(t[0]) for t in terms), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        indices = (np.concatenate([np.frombuffer(t[0], dtype=np.int32) for t in terms])
+                   if n else np.zeros(0, np.int32))
+        tf = (np.concatenate([np.frombuffer(t[1], dtype=np.float32) for t in terms])
+              if n else np.zeros(0, np.float32))
+
+        df = np.bincount(indices, minlength=N_FEATURES)
+        self._idf = np.where(df > 0, np.log((1.0 + n) / (1.0 + df)) + 1.0, 0.0).astype(np.float32)
+
+        m = sp.csr_matrix(((1.0 + np.log(tf)) * self._idf[indices], indices, indptr),
+                          shape=(n, N_FEATURES))
+        norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self._matrix = sp.diags(1.0 / norms).dot(m).tocsr()
+
+    def _top(self, qidx, qvals, limit: int, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        np, sp = require_numpy()
+        if not len(self._ids) or not len(qidx) or limit <= 0:
+            return []
+        q = sp.csr_matrix((qvals, qidx, [0, len(qidx)]), shape=(1, N_FEATURES))
+        scores = (self._matrix @ q.T).toarray().ravel()
+        if exclude is not None and exclude in self._row:
+            scores[self._row[exclude]] = -1.0
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{**self._docs[self._ids[i]]["meta"], "score": round(float(scores[i]), 4)}
+                for i in top if scores[i] > 0]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Rank chats by cosine similarity to a free-text query."""
+        with self._lock:
+            if self._matrix is None:
+                self._build()
+            # Features no indexed chat contains carry no signal
+            counts = {h: c for h, c in hashed_terms(query).items() if self._idf[h] > 0}
+            if not counts:
+                return []
+            qidx, qvals = self._query_weights(counts)
+            return self._top(qidx, qvals, limit)
+
+    def similar(self, composer_id: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Rank other chats by similarity to `composer_id`; None if it is not indexed."""
+        with self._lock:
+            if composer_id not in self._docs:
+                return None
+            if self._matrix is None:
+                self._build()
+            row = self._matrix.getrow(self._row[composer_id])
+            return self._top(row.indices, row.data, limit, exclude=composer_id)
+
+
+class IndexRefresher:
+    """
+    Keep indexes (anything with update(chats)) in step with the extracted
+    chats from a background thread. update() is cheap to call on every
+    request: it only starts a refresh when the chats' extraction fingerprint
+    changed, and calls made while one runs are coalesced into the next.
+    wait() blocks until the indexes cover the chats last handed in.
+    """
+
+    def __init__(self, *indexes):
+        self._indexes = indexes
+        self._cond = threading.Condition()
+        self._fingerprint = None
+        self._queued = None
+        self._job: Optional[threading.Thread] = None
+
+    def update(self, chats: List[Chat], fingerprint: Optional[tuple] = None):
+        """Refresh the indexes from `chats` in the background unless `fingerprint` is unchanged."""
+        with self._cond:
+            # A fingerprint with unknown parts (None) never matches, so those chats are always indexed
+            known = fingerprint is not None and None not in fingerprint
+            if known and fingerprint == self._fingerprint:
+                return
+            self._fingerprint = fingerprint if known else None
+            self._queued = chats
+            if self._job is None:
+                self._job = threading.Thread(target=self._run_jobs, name="index-refresher", daemon=True)
+                self._job.start()
+
+    def _run_jobs(self):
+        while True:
+            with self._cond:
+                chats, self._queued = self._queued, None
+                if chats is None:
+                    self._job = None
+                    self._cond.notify_all()
+                    return
+            for index in self._indexes:
+                try:
+                    changes = index.update(chats)
+                    logger.debug(f"{type(index).__name__} refreshed: {changes}")
+                except Exception as e:
+                    logger.error(f"Error refreshing {type(index).__name__}: {e}", exc_info=True)
+
+    @property
+    def pending(self) -> bool:
+        with self._cond:
+            return self._job is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until no refresh is running or queued; False if `timeout` ran out first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._job is None, timeout)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Incremental mirroring of chats into a central archive server.
+
+Three pieces, all speaking the formatted-chat JSON the web UI uses:
+
+ChangeFeed   – numbers every chat change with a sequence. It re-extracts only
+               when the storage fingerprint (size/mtime of every DB) changed,
+               and a chat counts as changed when its (lastUpdatedAt, message
+               count) stamp did. Served as /api/changes?since=<sequence>.
+               Sequences are per process; `epoch` tells clients when they
+               must start over from 0.
+SyncStore    – the aggregator side: a SQLite file of mirrored chats keyed by
+               (source, composerId), fed by POST /api/sync. Mirrored chats
+               are served as "<source>:<composerId>", like chats of a named
+               root, so they never collide with the aggregator's own.
+push_changes – the `--sync-to <url>` client: asks the aggregator which stamps
+               it already holds, then pushes only the differences in gzip
+               compressed batches.
+
+Both sync endpoints require the aggregator's shared token in the
+X-Sync-Token header. Try it with two local instances:
+
+    python3 server.py --port 5001 --sync-store team.sqlite --sync-token s3cret
+    python3 server.py --sync-to http://127.0.0.1:5001 --sync-token s3cret --sync-interval 0
+"""
+
+import gzip
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cursor_extraction import Chat, cursor_root, load_chats, storage_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Request header carrying the aggregator's --sync-token
+SYNC_TOKEN_HEADER = "X-Sync-Token"
+
+BATCH_CHATS = 200
+BATCH_BYTES = 4 * 1024 * 1024  # uncompressed JSON per POST
+
+
+def chat_stamp(chat: Chat) -> List[Any]:
+    return [chat.last_updated_at, len(chat.messages)]
+
+
+class ChangeFeed:
+    """Sequence-numbered log of chat changes on this machine."""
+
+    def __init__(self, loader: Callable[[], List[Chat]] = None,
+                 fingerprint: Callable[[], Optional[tuple]] = None):
+        # Default to the current user's Cursor root
+        self._loader = loader or (lambda: load_chats(cursor_root()))
+        self._fingerprint_of = fingerprint or (lambda: storage_fingerprint(cursor_root()))
+        self._lock = threading.Lock()
+        self.epoch = uuid.uuid4().hex
+        self.sequence = 0
+        self._fingerprint = None
+        # cid -> [seq, stamp, Chat]; deleted cid -> seq
+        self._entries: Dict[str, list] = {}
+        self._deleted: Dict[str, int] = {}
+
+    def refresh(self, chats: Optional[List[Chat]] = None) -> int:
+        """
+        Record changes since the last refresh; returns the number of changes.
+        Pass `chats` when they were just extracted anyway, otherwise the
+        storage is re-read only if its fingerprint changed.
+        """
+        with self._lock:
+            if chats is None:
+                fp = self._fingerprint_of()
+                if fp is not None and fp == self._fingerprint:
+                    return 0
+                chats = self._loader()
+                self._fingerprint = fp
+            changes = 0
+            seen = set()
+            for chat in chats:
+                cid = chat.composer_id
+                seen.add(cid)
+                stamp = chat_stamp(chat)
+                entry = self._entries.get(cid)
+                if entry and entry[1] == stamp:
+                    entry[2] = chat
+                    continue
+                self.sequence += 1
+                self._entries[cid] = [self.sequence, stamp, chat]
+                self._deleted.pop(cid, None)
+                changes += 1
+            for cid in [cid for cid in self._entries if cid not in seen]:
+                del self._entries[cid]
+                self.sequence += 1
+                self._deleted[cid] = self.sequence
+                changes += 1
+            return changes
+
+    def composer_ids(self) -> set:
+        with self._lock:
+            return set(self._entries)
+
+    def changes(self, since: int = 0, epoch: Optional[str] = None,
+                limit: int = BATCH_CHATS) -> Dict[str, Any]:
+        """
+        Chats changed and composerIds deleted after sequence `since`, oldest
+        change first, at most `limit` chats. Continue with since=<next>.
+        """
+        with self._lock:
+            reset = epoch is not None and epoch != self.epoch
+            if reset or since > self.sequence:
+                since = 0
+            changed = sorted((e for e in self._entries.values() if e[0] > since),
+                             key=lambda e: e[0])
+            more = len(changed) > limit
+            changed = changed[:limit]
+            upto = changed[-1][0] if more else self.sequence
+            deleted = [cid for cid, seq in self._deleted.items() if since < seq <= upto]
+            return {
+                "epoch": self.epoch,
+                "reset": reset,
+                "sequence": self.sequence,
+                "next": upto,
+                "more": more,
+                "chats": [(e[1], e[2]) for e in changed],
+                "deleted": deleted,
+            }
+
+
+class SyncStore:
+    """Aggregator-side archive of chats mirrored from other machines."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS mirrored_chats (
+        source     TEXT,
+        session_id TEXT,
+        stamp      TEXT,
+        date       REAL,
+        body       BLOB,
+        PRIMARY KEY (source, session_id)
+    );
+    CREATE INDEX IF NOT EXISTS mirrored_chats_session ON mirrored_chats(session_id);
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(self.path, check_same_thread=False)
+        self._con.executescript(self.SCHEMA)
+        # Bumped by every apply(); chats() decodes the archive once per sequence
+        self.sequence = 0
+        self._decoded: Tuple[int, Optional[List[Tuple[Any, Dict[str, Any]]]]] = (-1, None)
+
+    def state(self, source: str) -> Dict[str, Any]:
+        """composerId -> stamp of everything held for `source`."""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT session_id, stamp FROM mirrored_chats WHERE source=?", (source,))
+            return {cid: json.loads(stamp) for cid, stamp in rows}
+
+    def apply(self, source: str, chats: List[Dict[str, Any]], deleted: List[str]) -> Dict[str, int]:
+        """Upsert formatted chats (each with a "stamp") and remove deleted ones."""
+        with self._lock, self._con:
+            self._con.executemany(
+                "INSERT OR REPLACE INTO mirrored_chats VALUES (?, ?, ?, ?, ?)",
+                ((source, c["session_id"], json.dumps(c.pop("stamp", None)), c.get("date"),
+                  gzip.compress(json.dumps(c).encode("utf-8"))) for c in chats),
+            )
+            self._con.executemany(
+                "DELETE FROM mirrored_chats WHERE source=? AND session_id=?",
+                ((source, cid) for cid in deleted),
+            )
+            self.sequence += 1
+        return {"upserted": len(chats), "deleted": len(deleted)}
+
+    def _decode(self, source, body) -> Dict[str, Any]:
+        chat = json.loads(gzip.decompress(body))
+        chat["session_id"] = f"{source}:{chat['session_id']}"
+        chat["source"] = source
+        return chat
+
+    def chats(self) -> List[Tuple[Any, Dict[str, Any]]]:
+        """
+        (lastUpdatedAt, chat) of every mirrored chat, most recently updated
+        first, tagged with its source. The list is shared between callers
+        until the next apply(); don't modify it.
+        """
+        with self._lock:
+            sequence, decoded = self._decoded
+            if sequence == self.sequence:
+                return decoded
+            sequence = self.sequence
+            rows = self._con.execute(
+                "SELECT source, stamp, body FROM mirrored_chats").fetchall()
+        out = []
+        for source, stamp, body in rows:
+            stamp = json.loads(stamp) if stamp else None
+            out.append(((stamp[0] if stamp else None) or 0, self._decode(source, body)))
+        out.sort(key=lambda item: item[0], reverse=True)
+        with self._lock:
+            if sequence == self.sequence:
+                self._decoded = (sequence, out)
+        return out
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """A mirrored chat by its "<source>:<composerId>" id, or None."""
+        source, sep, cid = session_id.partition(":")
+        if not sep:
+            return None
+        with self._lock:
+            row = self._con.execute(
+                "SELECT source, body FROM mirrored_chats WHERE source=? AND session_id=?",
+                (source, cid)).fetchone()
+        return self._decode(*row) if row else None
+
+
+def _request(url: str, payload: Any = None, token: Optional[str] = None) -> Any:
+    headers = {SYNC_TOKEN_HEADER: token} if token else {}
+    if payload is None:
+        req = urllib.request.Request(url, headers=headers)
+    else:
+        req = urllib.request.Request(
+            url, data=gzip.compress(json.dumps(payload).encode("utf-8")),
+            headers={**headers, "Content-Type": "application/json", "Content-Encoding": "gzip"},
+            method="POST")
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def _batches(items: List[Dict[str, Any]]):
+    batch, size = [], 0
+    for item in items:
+        n = len(json.dumps(item))
+        if batch and (len(batch) >= BATCH_CHATS or size + n > BATCH_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += n
+    yield batch
+
+
+def push_changes(url: str, feed: ChangeFeed, format_chat: Callable[[Chat], Dict[str, Any]],
+                 source: Optional[str] = None, interval: float = 60,
+                 stop: Optional[threading.Event] = None, token: Optional[str] = None) -> Dict[str, int]:
+    """
+    Mirror local chats into the aggregator at `url`, then keep pushing
+    deltas every `interval` seconds (once if `interval` is 0). `token` is
+    the aggregator's --sync-token.
+    """
+    url = url.rstrip("/")
+    source = source or socket.gethostname()
+    remote = _request(f"{url}/api/sync/state?source={urllib.parse.quote(source)}", token=token)["chats"]
+    logger.info(f"Aggregator holds {len(remote)} chats from {source}")
+    since, epoch = 0, None
+    totals = {"pushed": 0, "deleted": 0}
+    while True:
+        feed.refresh()
+        while True:
+            page = feed.changes(since, epoch)
+            # Skip chats the aggregator already has in the same version
+            chats = []
+            for stamp, chat in page["chats"]:
+                if remote.get(chat.composer_id) != stamp:
+                    d = format_chat(chat)
+                    d["stamp"] = stamp
+                    chats.append(d)
+            deleted = [cid for cid in page["deleted"] if cid in remote]
+            if since == 0 or page["reset"]:
+                # A full listing: also drop what the aggregator holds that
+                # no longer exists here
+                local = feed.composer_ids()
+                deleted += [cid for cid in remote if cid not in local and cid not in deleted]
+            for i, batch in enumerate(_batches(chats)):
+                if batch or (i == 0 and deleted):
+                    _request(f"{url}/api/sync", {
+                        "source": source,
+                        "chats": batch,
+                        "deleted": deleted if i == 0 else [],
+                    }, token)
+            for c in chats:
+                remote[c["session_id"]] = c["stamp"]
+            for cid in deleted:
+                remote.pop(cid, None)
+            totals["pushed"] += len(chats)
+            totals["deleted"] += len(deleted)
+            if chats or deleted:
+                logger.info(f"Pushed {len(chats)} changed and {len(deleted)} deleted chats to {url}")
+            since, epoch = page["next"], page["epoch"]
+            if not page["more"]:
+                break
+        if not interval or (stop is not None and stop.wait(interval)):
+            return totals
+        if stop is None:
+            time.sleep(interval)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Index of the fenced code blocks in every chat.
+
+Blocks are found line by line, the same way `generate_standalone_html` does
+it: a line starting with ``` opens or closes a block. The opening fence's
+info string gives the language; Cursor writes it as ``lang:path`` or
+``start:end:path`` for file edits, so the path is kept too.
+
+Only messages that contain a fence are scanned, and chats are re-scanned only
+when their (lastUpdatedAt, message count) stamp changes, so the index is
+refreshed cheaply on every extraction. Lookups by language go through a
+per-language map and code search only ever looks at block contents.
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cursor_extraction import Chat, _intern
+
+FENCE = "```"
+
+LANGUAGE_ALIASES = {
+    "py": "python", "python3": "python",
+    "js": "javascript", "jsx": "javascript", "node": "javascript",
+    "ts": "typescript", "tsx": "typescript",
+    "sh": "bash", "shell": "bash", "zsh": "bash", "console": "bash",
+    "yml": "yaml",
+    "rb": "ruby", "rs": "rust", "golang": "go", "kt": "kotlin",
+    "c++": "cpp", "cs": "csharp", "md": "markdown",
+    "postgres": "sql", "postgresql": "sql", "mysql": "sql", "sqlite": "sql",
+}
+
+
+def parse_fence_info(info: str) -> Tuple[str, Optional[str]]:
+    """Split a fence info string into (language, path)."""
+    info = info.strip()
+    if not info:
+        return "", None
+    head = info.split()[0]
+    parts = head.split(":")
+    if parts[0].isdigit():
+        # ```12:40:src/app.py – line range and path, no language
+        path = parts[-1] if len(parts) > 1 and not parts[-1].isdigit() else None
+        lang = ""
+    else:
+        lang = parts[0]
+        path = ":".join(parts[1:]) or None
+    lang = lang.lower()
+    if not lang and path and "." in path:
+        lang = path.rsplit(".", 1)[1].lower()
+    return LANGUAGE_ALIASES.get(lang, lang), path
+
+
+def iter_fenced_blocks(text: str) -> Iterator[Tuple[str, str, int]]:
+    """Yield (info, content, start_line) for each fenced block in `text`."""
+    info = None
+    start = 0
+    lines: List[str] = []
+    for lineno, line in enumerate(text.split("\n")):
+        if line.strip().startswith(FENCE):
+            if info is None:
+                info = line.strip()[3:]
+                start = lineno
+                lines = []
+            else:
+                yield info, "\n".join(lines), start
+                info = None
+        elif info is not None:
+            lines.append(line)
+    # An unclosed block runs to the end of the message
+    if info is not None:
+        yield info, "\n".join(lines), start
+
+
+class CodeBlock:
+    __slots__ = ("composer_id", "message_index", "block_index", "role",
+                 "language", "path", "start_line", "content", "sha1")
+
+    def __init__(self, composer_id, message_index, block_index, role,
+                 language, path, start_line, content):
+        self.composer_id = composer_id
+        self.message_index = message_index
+        self.block_index = block_index
+        self.role = role
+        self.language = _intern(language)
+        self.path = path
+        self.start_line = start_line
+        self.content = content
+        self.sha1 = hashlib.sha1(content.encode("utf-8", "replace")).hexdigest()
+
+    def to_dict(self, with_content: bool = True) -> Dict[str, Any]:
+        d = {
+            "session_id": self.composer_id,
+            "message_index": self.message_index,
+            "block_index": self.block_index,
+            "role": self.role,
+            "language": self.language,
+            "path": self.path,
+            "start_line": self.start_line,
+            "size": len(self.content),
+            "lines": self.content.count("\n") + 1 if self.content else 0,
+            "sha1": self.sha1,
+        }
+        if with_content:
+            d["content"] = self.content
+        return d
+
+
+def chat_code_blocks(chat: Chat) -> List[CodeBlock]:
+    blocks = []
+    for mi, m in enumerate(chat.messages):
+        if FENCE not in m.content:
+            continue
+        for bi, (info, content, start) in enumerate(iter_fenced_blocks(m.content)):
+            lang, path = parse_fence_info(info)
+            blocks.append(CodeBlock(chat.composer_id, mi, bi, m.role, lang, path, start, content))
+    return blocks
+
+
+class CodeIndex:
+    """Incrementally updated index of code blocks, keyed by composerId."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # cid -> {"stamp", "blocks", "project", "title"}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        # language -> {cid: number of blocks}
+        self._by_language: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self):
+        return sum(len(doc["blocks"]) for doc in self._docs.values())
+
+    def _index_languages(self, cid: str, blocks: List[CodeBlock], delta: int):
+        for b in blocks:
+            per_chat = self._by_language.setdefault(b.language, {})
+            n = per_chat.get(cid, 0) + delta
+            if n:
+                per_chat[cid] = n
+            else:
+                per_chat.pop(cid, None)
+                if not per_chat:
+                    del self._by_language[b.language]
+
+    def update(self, chats: Iterable[Chat]) -> Dict[str, int]:
+        """Sync the index with `chats`: re-scan new/changed ones, drop missing ones."""
+        changed = 0
+        with self._lock:
+            seen = set()
+            for chat in chats:
+                cid = chat.composer_id
+                seen.add(cid)
+                stamp = (chat.last_updated_at, len(chat.messages))
+                doc = self._docs.get(cid)
+                if doc and doc["stamp"] == stamp:
+                    continue
+                if doc:
+                    self._index_languages(cid, doc["blocks"], -1)
+                blocks = chat_code_blocks(chat)
+                self._index_languages(cid, blocks, 1)
+                self._docs[cid] = {
+                    "stamp": stamp,
+                    "blocks": blocks,
+                    "project": chat.project.name,
+                    "title": chat.title,
+                }
+                changed += 1
+            removed = [cid for cid in self._docs if cid not in seen]
+            for cid in removed:
+                self._index_languages(cid, self._docs.pop(cid)["blocks"], -1)
+        return {"changed": changed, "removed": len(removed)}
+
+    def languages(self) -> Dict[str, int]:
+        """Number of code blocks per language, most common first."""
+        with self._lock:
+            counts = {lang: sum(per_chat.values()) for lang, per_chat in self._by_language.items()}
+        return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+    def search(self, query: str = "", language: Optional[str] = None,
+               project: Optional[str] = None, unique: bool = False,
+               limit: int = 50, with_content: bool = True) -> Dict[str, Any]:
+        """
+        Code blocks matching all given filters, newest chats first.
+
+        `query` is a case-insensitive substring of the block content,
+        `language` an exact (alias-normalized) language and `project` a
+        substring of the project name. `unique` drops repeated snippets.
+        """
+        q = query.lower()
+        if language is not None:
+            language = language.lower()
+            language = LANGUAGE_ALIASES.get(language, language)
+        proj = project.lower() if project else None
+        results = []
+        total = 0
+        seen_hashes = set()
+        with self._lock:
+            if language is not None:
+                cids = self._by_language.get(language, {}).keys()
+            else:
+                cids = self._docs.keys()
+            docs = sorted((self._docs[cid] for cid in cids),
+                          key=lambda d: d["stamp"][0] or 0, reverse=True)
+            for doc in docs:
+                if proj and proj not in (doc["project"] or "").lower():
+                    continue
+                for b in doc["blocks"]:
+                    if language is not None and b.language != language:
+                        continue
+                    if q and q not in b.content.lower():
+                        continue
+                    if unique:
+                        if b.sha1 in seen_hashes:
+                            continue
+                        seen_hashes.add(b.sha1)
+                    total += 1
+                    if len(results) < limit:
+                        d = b.to_dict(with_content)
+                        d["project"] = doc["project"]
+                        d["title"] = doc["title"]
+                        results.append(d)
+        return {"total": total, "blocks": results}
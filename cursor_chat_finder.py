@@ -4,120 +4,73 @@ Find and extract all Cursor chat histories from a user's system.
 This script locates all workspace and session databases and extracts chat data.
 """
 
-import os
-import glob
+import contextlib
+import datetime
+import gzip
 import json
+import os
 import pathlib
-import platform
-import datetime
+import sys
 from typing import List, Dict, Any, Optional
 
-from extract_cursor_chat import load_chat_session
+from cursor_extraction import Chat, MissingDependency, cursor_root, disk_kv_dbs, workspaces
+from cursor_roots import RootSet
+
+# Storage roots to extract; replaced from --root
+roots = RootSet()
 
 def get_cursor_storage_path() -> pathlib.Path:
     """Get the path where Cursor stores its data based on the OS."""
-    system = platform.system()
-    home = pathlib.Path.home()
-    
-    if system == "Darwin":  # macOS
-        return home / "Library" / "Application Support" / "Cursor"
-    elif system == "Windows":
-        return home / "AppData" / "Roaming" / "Cursor"
-    elif system == "Linux":
-        return home / ".config" / "Cursor"
-    else:
-        raise RuntimeError(f"Unsupported platform: {system}")
+    return cursor_root()
 
-def find_workspace_dbs() -> List[Dict[str, pathlib.Path]]:
-    """Find all workspace databases (state.vscdb) and their associated session DBs."""
-    cursor_path = get_cursor_storage_path()
-    workspace_storage = cursor_path / "User" / "workspaceStorage"
-    
-    if not workspace_storage.exists():
-        return []
-    
-    results = []
-    
-    # Possible locations for session databases
-    extension_dirs = [
-        cursor_path / "User" / "globalStorage" / "cursor.cursor",
-        cursor_path / "User" / "globalStorage" / "cursor"
-    ]
-    
-    # Find all session databases across all possible locations
-    all_session_dbs = []
-    for extension_dir in extension_dirs:
-        if extension_dir.exists():
-            for session_db in extension_dir.glob("*.sqlite"):
-                all_session_dbs.append(session_db)
-    
-    # If no session DBs found, try more generic patterns
-    if not all_session_dbs:
-        for pattern in ["*.sqlite", "*.db", "*.sqlite3"]:
-            for extension_dir in extension_dirs:
-                if extension_dir.exists():
-                    for session_db in extension_dir.glob(pattern):
-                        all_session_dbs.append(session_db)
+def find_workspace_dbs(cursor_path: pathlib.Path = None) -> List[Dict[str, Any]]:
+    """Find all workspace databases (state.vscdb) and the session DBs next to them.
+
+    Session DBs are global, so they are listed once for the whole storage
+    root instead of being paired with every workspace.
+    """
+    cursor_path = cursor_path or get_cursor_storage_path()
+    results = [{"workspace_db": db, "workspace_id": ws_id}
+               for ws_id, db in workspaces(cursor_path)]
+    kv_dbs = disk_kv_dbs(cursor_path)
     
     # Create a dummy workspace entry if no workspaces but we have session DBs
-    if all_session_dbs and not any(workspace_storage.glob("*")):
-        results.append({
-            "workspace_db": None,  # We'll handle None values in extract_all_chats
-            "session_dbs": all_session_dbs,
-            "workspace_id": "unknown"
-        })
-        return results
-    
-    # Process workspaces
-    for workspace_dir in workspace_storage.glob("*"):
-        workspace_db = workspace_dir / "state.vscdb"
-        if not workspace_db.exists():
-            continue
-            
-        # For now, just associate all session DBs with all workspaces
-        # This is a simplification but ensures we don't miss any chats
-        results.append({
-            "workspace_db": workspace_db,
-            "session_dbs": all_session_dbs,
-            "workspace_id": workspace_dir.name
-        })
+    if kv_dbs and not results:
+        results.append({"workspace_db": None, "workspace_id": "unknown"})
     
+    for entry in results:
+        entry["session_dbs"] = kv_dbs
     return results
 
+def _chat_date(chat: Chat) -> str:
+    """Format the chat's last update (or creation) time, falling back to its DB mtime."""
+    ts = chat.last_updated_at or chat.created_at
+    if isinstance(ts, (int, float)):
+        when = datetime.datetime.fromtimestamp(ts / 1000)
+    else:
+        try:
+            when = datetime.datetime.fromtimestamp(pathlib.Path(chat.db_path).stat().st_mtime)
+        except (TypeError, OSError):
+            when = datetime.datetime.now()
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+def chat_record(chat: Chat) -> Dict[str, Any]:
+    """Convert a Chat into the record format written by this script."""
+    return {
+        "project": chat.project.to_dict(),
+        "messages": [m.to_dict() for m in chat.messages],
+        "date": _chat_date(chat),
+        "session_id": chat.composer_id,
+        "workspace_id": chat.workspace_id,
+    }
+
 def extract_all_chats() -> List[Dict[str, Any]]:
     """Extract all chat sessions from all workspaces."""
-    all_workspaces = find_workspace_dbs()
-    all_chats = []
-    
-    if not all_workspaces:
+    if not any(find_workspace_dbs(root.path) for root in roots.roots):
         # Create sample data for demo purposes
         return create_sample_chats()
     
-    for workspace in all_workspaces:
-        workspace_db = workspace["workspace_db"]
-        
-        for session_db in workspace["session_dbs"]:
-            try:
-                # Get file modification time as a proxy for chat date
-                mod_time = datetime.datetime.fromtimestamp(session_db.stat().st_mtime)
-                chat_date = mod_time.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Extract the chat session
-                session = load_chat_session(workspace_db, session_db) if workspace_db else create_fallback_session(session_db)
-                
-                # Skip sessions with no messages
-                if not session.messages:
-                    continue
-                    
-                # Add metadata
-                chat_data = session.to_dict()
-                chat_data["date"] = chat_date
-                chat_data["session_id"] = session_db.stem
-                chat_data["workspace_id"] = workspace["workspace_id"]
-                
-                all_chats.append(chat_data)
-            except Exception as e:
-                print(f"Error extracting chat from {session_db}: {e}")
+    all_chats = [chat_record(chat) for chat in load_root_chats()]
     
     # Sort by date (newest first)
     all_chats.sort(key=lambda x: x["date"], reverse=True)
@@ -128,12 +81,9 @@ def extract_all_chats() -> List[Dict[str, Any]]:
         
     return all_chats
 
-def create_fallback_session(session_db: pathlib.Path):
-    """Create a fallback session when workspace_db is not available"""
-    from extract_cursor_chat import ChatSession, extract_messages
-    project = {"name": "Unknown Project", "rootPath": "/"}
-    messages = extract_messages(session_db)
-    return ChatSession(project, messages)
+def load_root_chats() -> List[Chat]:
+    """Chats of every configured root, extracted in parallel (and not cached), newest first."""
+    return roots.extract_chats()
 
 def create_sample_chats() -> List[Dict[str, Any]]:
     """Create sample chat data for demo purposes"""
@@ -160,19 +110,112 @@ def create_sample_chats() -> List[Dict[str, Any]]:
         }
     ]
 
-def save_all_chats(output_path: pathlib.Path):
+@contextlib.contextmanager
+def open_output(output_path: pathlib.Path, compress: Optional[str] = None):
+    """
+    Open `output_path` (or stdout for "-") for binary writing, optionally
+    through a gzip or zstd compressor. zstd needs the `zstandard` package.
+    """
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise MissingDependency("zstd output needs zstandard: python3 -m pip install zstandard")
+    to_stdout = str(output_path) == "-"
+    raw = sys.stdout.buffer if to_stdout else open(output_path, "wb")
+    try:
+        if compress == "gzip":
+            with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                yield out
+        elif compress == "zstd":
+            with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as out:
+                yield out
+        else:
+            yield raw
+    finally:
+        if to_stdout:
+            raw.flush()
+        else:
+            raw.close()
+
+def compression_for(output_path: pathlib.Path) -> Optional[str]:
+    """Pick a compression from the output file suffix (.gz / .zst)."""
+    return {".gz": "gzip", ".zst": "zstd"}.get(pathlib.PurePath(str(output_path)).suffix)
+
+def save_all_chats(output_path: pathlib.Path, compress: Optional[str] = None):
     """Save all extracted chats to a JSON file."""
     chats = extract_all_chats()
-    output_path.write_text(json.dumps(chats, ensure_ascii=False, indent=2))
+    with open_output(output_path, compress) as out:
+        out.write(json.dumps(chats, ensure_ascii=False, indent=2).encode("utf-8"))
     return chats
 
+def save_ndjson(output_path: pathlib.Path, compress: Optional[str] = None) -> int:
+    """
+    Write one chat per line (JSON Lines) as chats are extracted, a batch at
+    a time (see RootSet.iter_chats()), so memory stays flat and readers can
+    start immediately. Lines are grouped by root and only roughly newest
+    first; sort on "date" if the order matters.
+    """
+    line_buffered = str(output_path) == "-" and not compress
+    count = 0
+    with open_output(output_path, compress) as out:
+        for chat in roots.iter_chats():
+            out.write(json.dumps(chat_record(chat), ensure_ascii=False).encode("utf-8") + b"\n")
+            if line_buffered:
+                out.flush()
+            count += 1
+    return count
+
+def save_archive(output_path: pathlib.Path, fmt: str) -> Dict[str, int]:
+    """
+    Save all chats to a normalized SQLite or Parquet archive, writing rows
+    as chats are extracted (see RootSet.iter_chats()).
+    """
+    from chat_archive import write_parquet_archive, write_sqlite_archive
+    
+    writer = write_sqlite_archive if fmt == "sqlite" else write_parquet_archive
+    return writer(roots.iter_chats(), output_path)
+
 if __name__ == "__main__":
     import argparse
     
+    default_out = {"json": "cursor_chats.json", "ndjson": "cursor_chats.ndjson",
+                   "sqlite": "cursor_chats.sqlite", "parquet": "cursor_chats_parquet"}
     parser = argparse.ArgumentParser(description="Extract all Cursor chat histories")
-    parser.add_argument("--out", type=pathlib.Path, default=pathlib.Path("cursor_chats.json"),
-                        help="Output JSON file (default: cursor_chats.json)")
+    parser.add_argument("--out", type=pathlib.Path,
+                        help="Output file, directory for parquet, or - for stdout "
+                             "(default: cursor_chats.<format>)")
+    parser.add_argument("--format", choices=sorted(default_out), default="json",
+                        help="json: one JSON document, newest first; ndjson: one chat per "
+                             "line, streamed as extracted (roughly newest first, not sorted); "
+                             "sqlite/parquet: normalized projects/sessions/messages "
+                             "tables (parquet needs pyarrow)")
+    parser.add_argument("--compress", choices=["gzip", "zstd"],
+                        help="Compress json/ndjson output (default: from .gz/.zst suffix)")
+    parser.add_argument("--root", action="append", default=[], metavar="[NAME=]PATH",
+                        help="Cursor storage root to extract; repeat for several, "
+                             "ids are then prefixed with NAME: (default: this user's)")
     args = parser.parse_args()
+    roots = RootSet(args.root)
+    out = args.out or pathlib.Path(default_out[args.format])
+    compress = args.compress or compression_for(out)
+    # Keep stdout clean for piping into jq & co.
+    report = sys.stderr if str(out) == "-" else sys.stdout
     
-    chats = save_all_chats(args.out)
-    print(f"Extracted {len(chats)} chat sessions to {args.out}") 
\ No newline at end of file
+    try:
+        if args.format == "json":
+            chats = save_all_chats(out, compress)
+            print(f"Extracted {len(chats)} chat sessions to {out}", file=report)
+        elif args.format == "ndjson":
+            count = save_ndjson(out, compress)
+            print(f"Extracted {count} chat sessions to {out}", file=report)
+        else:
+            counts = save_archive(out, args.format)
+            print(f"Archived {counts['sessions']} chat sessions ({counts['messages']} messages, "
+                  f"{counts['projects']} projects) to {out}")
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; don't dump a traceback on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
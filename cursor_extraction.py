@@ -0,0 +1,1594 @@
+#!/usr/bin/env python3
+"""
+Shared Cursor chat extraction engine.
+
+Used by `server.py`, `cursor_chat_finder.py` and `extract_cursor_chat.py` so
+there is one implementation of discovery, DB reading and merging. Each DB is
+scanned once per extraction: workspace DBs for project info, composer
+metadata and ItemTable chats, the global DB (plus any legacy session DBs)
+for `cursorDiskKV` bubbles and composer data.
+
+Data model
+----------
+`load_chats()` returns compact `Chat` objects (see "Data model" below);
+`extract_chats()` returns the same chats as dicts, newest first:
+
+    project       – {'name': str, 'rootPath': str}
+    session       – {'composerId': str, 'title': str,
+                     'createdAt': int|None, 'lastUpdatedAt': int|None}
+    messages      – [{'role': 'user'|'assistant', 'content': str}]
+    workspace_id  – workspace folder name, or '(global)' / '(unknown)'
+    db_path       – path of the first DB a message of the chat came from
+
+Extra sources can be plugged in with `register_source()`.
+"""
+
+import heapq
+import json
+import threading
+import logging
+import os
+import platform
+import sqlite3
+import pathlib
+import sys
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+################################################################################
+# Cursor storage roots
+################################################################################
+def cursor_root() -> pathlib.Path:
+    h = pathlib.Path.home()
+    s = platform.system()
+    if s == "Darwin":   return h / "Library" / "Application Support" / "Cursor"
+    if s == "Windows":  return h / "AppData" / "Roaming" / "Cursor"
+    if s == "Linux":    return h / ".config" / "Cursor"
+    raise RuntimeError(f"Unsupported OS: {s}")
+
+################################################################################
+# Data model
+################################################################################
+# A large history holds hundreds of thousands of messages, so the in-memory
+# model uses slotted objects instead of per-message dicts: role strings are
+# interned, one Project is shared by every chat of a workspace, and dicts are
+# only built by to_dict() when a chat is serialized.
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class Project:
+    __slots__ = ("name", "root_path")
+
+    def __init__(self, name: str, root_path: str):
+        self.name = name
+        self.root_path = root_path
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Project":
+        return cls(d.get("name", "(unknown)"), d.get("rootPath", "(unknown)"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "rootPath": self.root_path}
+
+class Message:
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = _intern(role)
+        self.content = content
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+class Chat:
+    __slots__ = ("composer_id", "title", "created_at", "last_updated_at",
+                 "project", "messages", "workspace_id", "db_path")
+
+    def __init__(self, composer_id: str, title: str, created_at, last_updated_at,
+                 project: Project, messages: List[Message], workspace_id: str,
+                 db_path: str = None):
+        self.composer_id = composer_id
+        self.title = title
+        self.created_at = created_at
+        self.last_updated_at = last_updated_at
+        self.project = project
+        self.messages = messages
+        self.workspace_id = _intern(workspace_id)
+        self.db_path = _intern(db_path)
+
+    @property
+    def session(self) -> Dict[str, Any]:
+        return {"composerId": self.composer_id, "title": self.title,
+                "createdAt": self.created_at, "lastUpdatedAt": self.last_updated_at}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the chat in the documented dict format."""
+        d = {
+            "project": self.project.to_dict(),
+            "session": self.session,
+            "messages": [m.to_dict() for m in self.messages],
+            "workspace_id": self.workspace_id,
+        }
+        if self.db_path is not None:
+            d["db_path"] = self.db_path
+        return d
+
+################################################################################
+# Helpers
+################################################################################
+class MissingDependency(RuntimeError):
+    """An optional package a feature needs is not installed; the message says how to install it."""
+
+def j(cur: sqlite3.Cursor, table: str, key: str):
+    cur.execute(f"SELECT value FROM {table} WHERE key=?", (key,))
+    row = cur.fetchone()
+    if row:
+        try:    return json.loads(row[0])
+        except Exception as e: 
+            logger.debug(f"Failed to parse JSON for {key}: {e}")
+    return None
+
+def _bubble_row(k: str, v, db_path_str: str):
+    """Decode one bubbleId:* row into (composerId, role, text, db_path, bubbleId), or None."""
+    try:
+        if v is None:
+            return None
+            
+        b = json.loads(v)
+    except Exception as e:
+        logger.debug(f"Failed to parse bubble JSON for key {k}: {e}")
+        return None
+    
+    txt = (b.get("text") or b.get("richText") or "").strip()
+    if not txt:         return None
+    role = "user" if b.get("type") == 1 else "assistant"
+    _, composerId, bubbleId = k.split(":", 2)  # Format is bubbleId:composerId:bubbleId
+    return composerId, role, txt, db_path_str, bubbleId
+
+def iter_bubbles_from_disk_kv(db: pathlib.Path) -> Iterable[tuple[str,str,str,str,str]]:
+    """Yield (composerId, role, text, db_path, bubbleId) from cursorDiskKV table."""
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        cur = con.cursor()
+        # Check if table exists
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cursorDiskKV'")
+        if not cur.fetchone():
+            con.close()
+            return
+        
+        # Full scans walk the table in rowid (= insertion) order anyway; make it explicit
+        cur.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%' ORDER BY rowid")
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return
+    
+    db_path_str = str(db)
+    
+    for k, v in cur:
+        row = _bubble_row(k, v, db_path_str)
+        if row:
+            yield row
+    
+    con.close()
+
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+LOOKUP_BATCH = 500
+
+def read_composer_bubbles(db: pathlib.Path, composer_id: str):
+    """
+    Assemble one composer from point lookups: read its composerData:<id>
+    header, then fetch the bubbles listed in fullConversationHeadersOnly with
+    batched exact-key lookups on the key index, in conversation order.
+    Bubbles under bubbleId:<id>: that the header does not list follow in
+    rowid order, as in a full extraction (see _order_bubbles()).
+
+    Returns (composerData, rows) with rows shaped like iter_bubbles_from_disk_kv(),
+    or None if the DB has no header for the composer.
+    """
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return None
+    try:
+        cur = con.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cursorDiskKV'")
+        if not cur.fetchone():
+            return None
+        data = j(cur, "cursorDiskKV", f"composerData:{composer_id}")
+        if not isinstance(data, dict):
+            return None
+        
+        keys = [f"bubbleId:{composer_id}:{h['bubbleId']}"
+                for h in data.get("fullConversationHeadersOnly") or []
+                if isinstance(h, dict) and h.get("bubbleId")]
+        # A key-only range scan is answered from the key index
+        listed = set(keys)
+        cur.execute("SELECT key FROM cursorDiskKV WHERE key >= ? AND key < ? ORDER BY rowid",
+                    prefix_range(f"bubbleId:{composer_id}:"))
+        keys += [k for (k,) in cur.fetchall() if k not in listed]
+        values = {}
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            cur.execute(f"SELECT key, value FROM cursorDiskKV WHERE key IN ({','.join('?' * len(batch))})", batch)
+            values.update(cur.fetchall())
+        
+        db_path_str = str(db)
+        rows = [row for row in (_bubble_row(k, values.get(k), db_path_str) for k in keys) if row]
+        return data, rows
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return None
+    finally:
+        con.close()
+
+# Every ItemTable key the workspace readers use. read_workspace_items() fetches
+# them with one IN query (plus one range scan for the aiService.* families) and
+# decodes each once; workspace_info(), iter_chat_from_item_table() and the git
+# repo fallback all work from that dict.
+WORKSPACE_KEYS = (
+    "history.entries",
+    "debug.selectedroot",
+    "composer.composerData",
+    "workbench.panel.aichat.view.aichat.chatdata",
+    "scm:view:visibleRepositories",
+)
+AI_SERVICE_PREFIXES = ("aiService.prompts", "aiService.generations")
+
+def prefix_range(prefix: str):
+    """(low, high) bounds matching every key that starts with `prefix`."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def read_workspace_items(db: pathlib.Path) -> Optional[Dict[str, Any]]:
+    """
+    Fetch and decode the ItemTable values of WORKSPACE_KEYS and the
+    aiService.* families in at most two queries. Chat families the DB's
+    layout lacks (see WORKSPACE_LAYOUT_FAMILIES) are not queried; the
+    layout is probed on the same connection when the DB changed since it
+    was last read. Keys that are absent or not valid JSON are left out.
+    Returns None if the DB cannot be read.
+    """
+    fp = _file_fingerprint(db)
+    layout = _cached_layout(db, fp, WORKSPACE_LAYOUT_FAMILIES)
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        try:
+            cur = con.cursor()
+            if layout is None:
+                layout = _probe_layout(cur, WORKSPACE_LAYOUT_FAMILIES)
+                _store_layout(db, fp, WORKSPACE_LAYOUT_FAMILIES, layout)
+            present = layout.get("ItemTable", ())
+            optional = WORKSPACE_LAYOUT_FAMILIES["ItemTable"]
+            keys = [k for k in WORKSPACE_KEYS if k not in optional or k in present]
+            cur.execute(f"SELECT key, value FROM ItemTable WHERE key IN ({','.join('?' * len(keys))})", keys)
+            rows = cur.fetchall()
+            ranges = [prefix_range(p) for p in AI_SERVICE_PREFIXES if p in present]
+            if ranges:
+                cur.execute("SELECT key, value FROM ItemTable WHERE "
+                            + " OR ".join("(key >= ? AND key < ?)" for _ in ranges)
+                            + " ORDER BY rowid",
+                            [bound for r in ranges for bound in r])
+                rows += cur.fetchall()
+        finally:
+            con.close()
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error reading ItemTable of {db}: {e}")
+        return None
+
+    items = {}
+    for k, v in rows:
+        try:
+            items[k] = json.loads(v)
+        except Exception as e:
+            logger.debug(f"Failed to parse JSON for {k}: {e}")
+    return items
+
+def iter_chat_from_item_table(db: pathlib.Path, items: Dict[str, Any] = None) -> Iterable[tuple[str,str,str,str]]:
+    """
+    Yield (composerId, role, text, db_path) from ItemTable.
+    Pass `items` from read_workspace_items() to avoid reading the DB again.
+    """
+    if items is None:
+        items = read_workspace_items(db)
+        if items is None:
+            return
+    # Try to get chat data from workbench.panel.aichat.view.aichat.chatdata
+    chat_data = items.get("workbench.panel.aichat.view.aichat.chatdata")
+    if chat_data and "tabs" in chat_data:
+        for tab in chat_data.get("tabs", []):
+            tab_id = tab.get("tabId", "unknown")
+            for bubble in tab.get("bubbles", []):
+                bubble_type = bubble.get("type")
+                if not bubble_type:
+                    continue
+                
+                # Extract text from various possible fields
+                text = ""
+                if "text" in bubble:
+                    text = bubble["text"]
+                elif "content" in bubble:
+                    text = bubble["content"]
+                
+                if text and isinstance(text, str):
+                    role = "user" if bubble_type == "user" else "assistant"
+                    yield tab_id, role, text, str(db)
+    
+    # Check for composer data
+    composer_data = items.get("composer.composerData")
+    if composer_data:
+        for comp in composer_data.get("allComposers", []):
+            comp_id = comp.get("composerId", "unknown")
+            messages = comp.get("messages", [])
+            for msg in messages:
+                role = msg.get("role", "unknown")
+                content = msg.get("content", "")
+                if content:
+                    yield comp_id, role, content, str(db)
+    
+    # Also check for aiService entries
+    for key_prefix in AI_SERVICE_PREFIXES:
+        for k, data in items.items():
+            if not k.startswith(key_prefix):
+                continue
+            if isinstance(data, list):
+                for item in data:
+                    if "id" in item and "text" in item:
+                        role = "user" if "prompts" in key_prefix else "assistant"
+                        yield item.get("id", "unknown"), role, item.get("text", ""), str(db)
+
+def _composer_row(k: str, v, db_path_str: str):
+    """Decode one composerData:* row into (composerId, composerData, db_path), or None."""
+    try:
+        if v is None:
+            return None
+        return k.split(":")[1], json.loads(v), db_path_str
+    except Exception as e:
+        logger.debug(f"Failed to parse composer data for key {k}: {e}")
+        return None
+
+def iter_composer_data(db: pathlib.Path) -> Iterable[tuple[str,dict,str]]:
+    """Yield (composerId, composerData, db_path) from cursorDiskKV table."""
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        cur = con.cursor()
+        # Check if table exists
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cursorDiskKV'")
+        if not cur.fetchone():
+            con.close()
+            return
+        
+        cur.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'composerData:%'")
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return
+    
+    db_path_str = str(db)
+    
+    for k, v in cur:
+        row = _composer_row(k, v, db_path_str)
+        if row:
+            yield row
+    
+    con.close()
+
+################################################################################
+# Workspace discovery
+################################################################################
+def workspaces(base: pathlib.Path):
+    ws_root = base / "User" / "workspaceStorage"
+    if not ws_root.exists():
+        return
+    for folder in ws_root.iterdir():
+        db = folder / "state.vscdb"
+        if db.exists():
+            yield folder.name, db
+
+def extract_project_name_from_path(root_path, debug=False):
+    """
+    Extract a project name from a path, skipping user directories.
+    """
+    if not root_path or root_path == '/':
+        return "Root"
+        
+    path_parts = [p for p in root_path.split('/') if p]
+    
+    # Skip common user directory patterns
+    project_name = None
+    home_dir_patterns = ['Users', 'home']
+    
+    # Get current username for comparison
+    current_username = os.path.basename(os.path.expanduser('~'))
+    
+    # Find user directory in path
+    username_index = -1
+    for i, part in enumerate(path_parts):
+        if part in home_dir_patterns:
+            username_index = i + 1
+            break
+    
+    # If this is just /Users/username with no deeper path, don't use username as project
+    if username_index >= 0 and username_index < len(path_parts) and path_parts[username_index] == current_username:
+        if len(path_parts) <= username_index + 1:
+            return "Home Directory"
+    
+    if username_index >= 0 and username_index + 1 < len(path_parts):
+        # First try specific project directories we know about by name
+        known_projects = ['genaisf', 'cursor-view', 'cursor', 'cursor-apps', 'universal-github', 'inquiry']
+        
+        # Look at the most specific/deepest part of the path first
+        for i in range(len(path_parts)-1, username_index, -1):
+            if path_parts[i] in known_projects:
+                project_name = path_parts[i]
+                if debug:
+                    logger.debug(f"Found known project name from specific list: {project_name}")
+                break
+        
+        # If no known project found, use the last part of the path as it's likely the project directory
+        if not project_name and len(path_parts) > username_index + 1:
+            # Check if we have a structure like /Users/username/Documents/codebase/project_name
+            if 'Documents' in path_parts and 'codebase' in path_parts:
+                doc_index = path_parts.index('Documents')
+                codebase_index = path_parts.index('codebase')
+                
+                # If there's a path component after 'codebase', use that as the project name
+                if codebase_index + 1 < len(path_parts):
+                    project_name = path_parts[codebase_index + 1]
+                    if debug:
+                        logger.debug(f"Found project name in Documents/codebase structure: {project_name}")
+            
+            # If no specific structure found, use the last component of the path
+            if not project_name:
+                project_name = path_parts[-1]
+                if debug:
+                    logger.debug(f"Using last path component as project name: {project_name}")
+        
+        # Skip username as project name
+        if project_name == current_username:
+            project_name = 'Home Directory'
+            if debug:
+                logger.debug(f"Avoided using username as project name")
+        
+        # Skip common project container directories
+        project_containers = ['Documents', 'Projects', 'Code', 'workspace', 'repos', 'git', 'src', 'codebase']
+        if project_name in project_containers:
+            # Don't use container directories as project names
+            # Try to use the next component if available
+            container_index = path_parts.index(project_name)
+            if container_index + 1 < len(path_parts):
+                project_name = path_parts[container_index + 1]
+                if debug:
+                    logger.debug(f"Skipped container dir, using next component as project name: {project_name}")
+        
+        # If we still don't have a project name, use the first non-system directory after username
+        if not project_name and username_index + 1 < len(path_parts):
+            system_dirs = ['Library', 'Applications', 'System', 'var', 'opt', 'tmp']
+            for i in range(username_index + 1, len(path_parts)):
+                if path_parts[i] not in system_dirs and path_parts[i] not in project_containers:
+                    project_name = path_parts[i]
+                    if debug:
+                        logger.debug(f"Using non-system dir as project name: {project_name}")
+                    break
+    else:
+        # If not in a user directory, use the basename
+        project_name = path_parts[-1] if path_parts else "Root"
+        if debug:
+            logger.debug(f"Using basename as project name: {project_name}")
+    
+    # Final check: don't return username as project name
+    if project_name == current_username:
+        project_name = "Home Directory"
+        if debug:
+            logger.debug(f"Final check: replaced username with 'Home Directory'")
+    
+    return project_name if project_name else "Unknown Project"
+
+def workspace_info(db: pathlib.Path, items: Dict[str, Any] = None):
+    """
+    Return (project, composer metadata) of a workspace DB.
+    Pass `items` from read_workspace_items() to avoid reading the DB again.
+    """
+    if items is None:
+        items = read_workspace_items(db)
+    if items is None:
+        return {"name": "(unknown)", "rootPath": "(unknown)"}, {}
+
+    # Get file paths from history entries to extract the project name
+    proj = {"name": "(unknown)", "rootPath": "(unknown)"}
+    ents = items.get("history.entries") or []
+    
+    # Extract file paths from history entries, stripping the file:/// scheme
+    paths = []
+    for e in ents:
+        resource = e.get("editor", {}).get("resource", "")
+        if resource and resource.startswith("file:///"):
+            paths.append(resource[len("file:///"):])
+    
+    # If we found file paths, extract the project name using the longest common prefix
+    if paths:
+        logger.debug(f"Found {len(paths)} paths in history entries")
+        
+        # Get the longest common prefix
+        common_prefix = os.path.commonprefix(paths)
+        logger.debug(f"Common prefix: {common_prefix}")
+        
+        # Find the last directory separator in the common prefix
+        last_separator_index = common_prefix.rfind('/')
+        if last_separator_index > 0:
+            project_root = common_prefix[:last_separator_index]
+            logger.debug(f"Project root from common prefix: {project_root}")
+            
+            # Extract the project name using the helper function
+            project_name = extract_project_name_from_path(project_root, debug=True)
+            
+            proj = {"name": project_name, "rootPath": "/" + project_root.lstrip('/')}
+    
+    # Try backup methods if we didn't get a project name
+    if proj["name"] == "(unknown)":
+        logger.debug("Trying backup methods for project name")
+        
+        # Check debug.selectedroot as a fallback
+        selected_root = items.get("debug.selectedroot")
+        if selected_root and isinstance(selected_root, str) and selected_root.startswith("file:///"):
+            path = selected_root[len("file:///"):]
+            if path:
+                root_path = "/" + path.strip("/")
+                logger.debug(f"Project root from debug.selectedroot: {root_path}")
+                
+                # Extract the project name using the helper function
+                project_name = extract_project_name_from_path(root_path, debug=True)
+                
+                if project_name:
+                    proj = {"name": project_name, "rootPath": root_path}
+
+    # composers meta
+    comp_meta={}
+    cd = items.get("composer.composerData") or {}
+    for c in cd.get("allComposers",[]):
+        comp_meta[c["composerId"]] = {
+            "title": c.get("name","(untitled)"),
+            "createdAt": c.get("createdAt"),
+            "lastUpdatedAt": c.get("lastUpdatedAt")
+        }
+    
+    # Try to get composer info from workbench.panel.aichat.view.aichat.chatdata
+    chat_data = items.get("workbench.panel.aichat.view.aichat.chatdata") or {}
+    for tab in chat_data.get("tabs", []):
+        tab_id = tab.get("tabId")
+        if tab_id and tab_id not in comp_meta:
+            comp_meta[tab_id] = {
+                "title": f"Chat {tab_id[:8]}",
+                "createdAt": None,
+                "lastUpdatedAt": None
+            }
+        
+    return proj, comp_meta
+
+################################################################################
+# GlobalStorage
+################################################################################
+def global_storage_path(base: pathlib.Path) -> pathlib.Path:
+    """Return path to the global storage state.vscdb."""
+    global_db = base / "User" / "globalStorage" / "state.vscdb"
+    if global_db.exists():
+        return global_db
+    
+    # Legacy paths
+    g_dirs = [base/"User"/"globalStorage"/"cursor.cursor",
+              base/"User"/"globalStorage"/"cursor"]
+    for d in g_dirs:
+        if d.exists():
+            for file in d.glob("*.sqlite"):
+                return file
+    
+    return None
+
+def session_dbs(base: pathlib.Path) -> List[pathlib.Path]:
+    """Return legacy per-extension session DBs, each listed once."""
+    g_dirs = [base/"User"/"globalStorage"/"cursor.cursor",
+              base/"User"/"globalStorage"/"cursor"]
+    found = [f for d in g_dirs if d.exists() for f in sorted(d.glob("*.sqlite"))]
+    if not found:
+        # Older builds used other extensions for the same files
+        for pattern in ["*.db", "*.sqlite3"]:
+            found += [f for d in g_dirs if d.exists() for f in sorted(d.glob(pattern))]
+    return found
+
+def disk_kv_dbs(base: pathlib.Path) -> List[pathlib.Path]:
+    """Return every DB that may hold cursorDiskKV chat data: global DB first, then session DBs."""
+    dbs = []
+    global_db = global_storage_path(base)
+    if global_db:
+        dbs.append(global_db)
+    dbs += [db for db in session_dbs(base) if db != global_db]
+    return dbs
+
+def storage_fingerprint(base: pathlib.Path) -> Optional[tuple]:
+    """
+    (path, size, mtime) of every DB an extraction reads, WAL files included.
+    Equal fingerprints mean a new extraction would find the same chats.
+    Returns None when registered sources make that impossible to tell.
+    """
+    if _sources:
+        return None
+    dbs = [db for _, db in workspaces(base)] + disk_kv_dbs(base)
+    fp = []
+    for db in sorted(set(dbs)):
+        for f in (db, db.with_name(db.name + "-wal")):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            fp.append((str(f), st.st_size, st.st_mtime_ns))
+    return tuple(fp)
+
+################################################################################
+# Storage layouts
+################################################################################
+# Cursor has kept chats in several layouts over time: aichat "tabs" in the
+# global ItemTable, composerData:* entries with inline conversations, and
+# composerData headers plus one bubbleId:* row per message in cursorDiskKV.
+# Rather than scanning every global/session DB for every layout on each run,
+# a DB's layout (which of the key families below it holds) is detected with
+# index lookups once per version of the file, and decides which readers run.
+
+# cursorDiskKV key family -> decoder of one row into what merge_extraction()
+# expects for that family. A new layout is supported by adding its family
+# here and handling its rows in _merge_job_results().
+DISK_KV_DECODERS = {
+    "bubbleId:": _bubble_row,
+    "composerData:": _composer_row,
+}
+
+# Table -> key prefixes whose presence db_layout() reports
+LAYOUT_FAMILIES = {
+    "cursorDiskKV": tuple(DISK_KV_DECODERS),
+    "ItemTable": ("workbench.panel.aichat.view.aichat.chatdata",),
+}
+# The same for workspace DBs: the chat families read_workspace_items() only
+# queries when present (project metadata keys are always read)
+WORKSPACE_LAYOUT_FAMILIES = {
+    "ItemTable": ("workbench.panel.aichat.view.aichat.chatdata",) + AI_SERVICE_PREFIXES,
+}
+
+# DB path -> (file fingerprint, families probed, layout), least recently
+# stored first; bounded like the workspace git-repos cache
+LAYOUT_CACHE_SIZE = 1024
+_layouts: Dict[str, tuple] = {}
+_layouts_lock = threading.Lock()
+
+def _file_fingerprint(db: pathlib.Path) -> tuple:
+    fp = []
+    for f in (db, db.with_name(db.name + "-wal")):
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        fp.append((st.st_size, st.st_mtime_ns))
+    return tuple(fp)
+
+def _cached_layout(db: pathlib.Path, fp: tuple, families: Dict[str, tuple]) -> Optional[Dict[str, tuple]]:
+    cached = _layouts.get(str(db))
+    if cached and cached[0] == fp and cached[1] is families:
+        return cached[2]
+    return None
+
+def _store_layout(db: pathlib.Path, fp: tuple, families: Dict[str, tuple], layout: Dict[str, tuple]):
+    logger.debug(f"Layout of {db}: {layout}")
+    with _layouts_lock:
+        _layouts.pop(str(db), None)
+        _layouts[str(db)] = (fp, families, layout)
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            del _layouts[next(iter(_layouts))]
+
+def _probe_layout(cur: sqlite3.Cursor, families: Dict[str, tuple]) -> Dict[str, tuple]:
+    """One index range probe (LIMIT 1) per family of `families` on an open DB."""
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = {row[0] for row in cur.fetchall()}
+    layout = {}
+    for table, prefixes in families.items():
+        if table not in tables:
+            continue
+        present = tuple(p for p in prefixes if cur.execute(
+            f"SELECT 1 FROM {table} WHERE key >= ? AND key < ? LIMIT 1",
+            prefix_range(p)).fetchone())
+        if present:
+            layout[table] = present
+    return layout
+
+def db_layout(db: pathlib.Path, families: Dict[str, tuple] = LAYOUT_FAMILIES) -> Dict[str, tuple]:
+    """
+    Table -> the `families` prefixes that have at least one key in it, for
+    the tables of `db` that have any. Cached until the DB file changes.
+    """
+    fp = _file_fingerprint(db)
+    layout = _cached_layout(db, fp, families)
+    if layout is not None:
+        return layout
+    layout = {}
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        try:
+            layout = _probe_layout(con.cursor(), families)
+        finally:
+            con.close()
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error detecting layout of {db}: {e}")
+    _store_layout(db, fp, families, layout)
+    return layout
+
+################################################################################
+# Extraction pipeline
+################################################################################
+class ExtractionCancelled(Exception):
+    """Raised inside a reader when its extraction run has been cancelled."""
+
+class ExtractionProgress:
+    """Thread-safe counters describing how far an extraction run has got."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total_dbs = 0
+        self.done_dbs = 0
+        self.messages = 0
+        self.current = None
+        self.cancelled = False
+
+    def start(self, total_dbs: int):
+        # Additive, so extractions of several roots can share one progress
+        with self._lock:
+            self.total_dbs += total_dbs
+
+    def finish_db(self, db_path: str, messages: int):
+        with self._lock:
+            self.done_dbs += 1
+            self.messages += messages
+            self.current = db_path
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_dbs": self.total_dbs,
+                "done_dbs": self.done_dbs,
+                "messages": self.messages,
+                "current": self.current,
+                "cancelled": self.cancelled,
+            }
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ExtractionCancelled()
+
+def _log_diagnostics(root: pathlib.Path):
+    """Log tables and AI-related keys of the first workspace and global DB."""
+    try:
+        first_ws = next(workspaces(root))
+        if first_ws:
+            ws_id, db = first_ws
+            logger.debug(f"\n--- DIAGNOSTICS for workspace {ws_id} ---")
+            con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+            cur = con.cursor()
+            
+            # List all tables
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [row[0] for row in cur.fetchall()]
+            logger.debug(f"Tables in workspace DB: {tables}")
+            
+            # Search for AI-related keys
+            if "ItemTable" in tables:
+                for pattern in ['%ai%', '%chat%', '%composer%', '%prompt%', '%generation%']:
+                    cur.execute("SELECT key FROM ItemTable WHERE key LIKE ?", (pattern,))
+                    keys = [row[0] for row in cur.fetchall()]
+                    if keys:
+                        logger.debug(f"Keys matching '{pattern}': {keys}")
+            
+            con.close()
+            
+        # Check global storage
+        global_db = global_storage_path(root)
+        if global_db:
+            logger.debug(f"\n--- DIAGNOSTICS for global storage ---")
+            con = sqlite3.connect(f"file:{global_db}?mode=ro", uri=True)
+            cur = con.cursor()
+            
+            # List all tables
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [row[0] for row in cur.fetchall()]
+            logger.debug(f"Tables in global DB: {tables}")
+            
+            # Search for AI-related keys in ItemTable
+            if "ItemTable" in tables:
+                for pattern in ['%ai%', '%chat%', '%composer%', '%prompt%', '%generation%']:
+                    cur.execute("SELECT key FROM ItemTable WHERE key LIKE ?", (pattern,))
+                    keys = [row[0] for row in cur.fetchall()]
+                    if keys:
+                        logger.debug(f"Keys matching '{pattern}': {keys}")
+            
+            # Check for keys in cursorDiskKV
+            if "cursorDiskKV" in tables:
+                cur.execute("SELECT DISTINCT substr(key, 1, instr(key, ':') - 1) FROM cursorDiskKV")
+                prefixes = [row[0] for row in cur.fetchall()]
+                logger.debug(f"Key prefixes in cursorDiskKV: {prefixes}")
+            
+            con.close()
+        
+        logger.debug("\n--- END DIAGNOSTICS ---\n")
+    except Exception as e:
+        logger.debug(f"Error in diagnostics: {e}")
+
+# Each reader below touches exactly one DB and returns plain data, so the
+# sync pipeline can call them in order and the async pipeline can run them
+# concurrently on an executor. Results are merged in a fixed order either way.
+
+# Workspace DB path -> (file fingerprint, decoded scm:view:visibleRepositories),
+# kept from the last read_workspace() so the git project-name fallback need not
+# reopen the DB. Entries go stale when the DB changes, and the least recently
+# used ones are dropped beyond GIT_REPOS_CACHE_SIZE DBs.
+GIT_REPOS_CACHE_SIZE = 1024
+_git_repos: "OrderedDict[str, tuple]" = OrderedDict()
+_git_repos_lock = threading.Lock()
+
+def _remember_git_repos(db: pathlib.Path, fingerprint: tuple, git_data):
+    with _git_repos_lock:
+        _git_repos[str(db)] = (fingerprint, git_data)
+        _git_repos.move_to_end(str(db))
+        while len(_git_repos) > GIT_REPOS_CACHE_SIZE:
+            _git_repos.popitem(last=False)
+
+def _cached_git_repos(db: pathlib.Path):
+    """(True, git data) if read_workspace() saw this version of `db`, else (False, None)."""
+    fp = _file_fingerprint(db)
+    with _git_repos_lock:
+        cached = _git_repos.get(str(db))
+        if cached is None or cached[0] != fp:
+            return False, None
+        _git_repos.move_to_end(str(db))
+        return True, cached[1]
+
+def read_workspace(ws_id: str, db: pathlib.Path, cancel=None) -> Dict[str, Any]:
+    """Read project info, composer metadata and ItemTable messages of a workspace DB."""
+    _check_cancel(cancel)
+    # Taken before the read, so a write racing with it only makes the entry stale
+    fp = _file_fingerprint(db)
+    items = read_workspace_items(db)
+    proj, meta = workspace_info(db, items)
+    rows = []
+    if items is not None:
+        _remember_git_repos(db, fp, items.get("scm:view:visibleRepositories"))
+        for row in iter_chat_from_item_table(db, items):
+            _check_cancel(cancel)
+            rows.append(row)
+    return {"ws_id": ws_id, "project": proj, "meta": meta, "rows": rows}
+
+def read_disk_kv_bubbles(db: pathlib.Path, cancel=None) -> list:
+    """Read all (composerId, role, text, db_path, bubbleId) bubbles from a cursorDiskKV table."""
+    rows = []
+    for row in iter_bubbles_from_disk_kv(db):
+        _check_cancel(cancel)
+        rows.append(row)
+    return rows
+
+def read_disk_kv_composers(db: pathlib.Path, cancel=None) -> list:
+    """Read all (composerId, composerData, db_path) entries from a cursorDiskKV table."""
+    rows = []
+    for row in iter_composer_data(db):
+        _check_cancel(cancel)
+        rows.append(row)
+    return rows
+
+def read_disk_kv(db: pathlib.Path, cancel=None) -> Dict[str, list]:
+    """
+    Read every cursorDiskKV key family the DB's layout has in a single scan,
+    in rowid order. Returns family -> rows decoded by DISK_KV_DECODERS.
+    """
+    families = db_layout(db).get("cursorDiskKV", ())
+    out = {family: [] for family in families}
+    if not families:
+        return out
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return out
+    db_path_str = str(db)
+    try:
+        cur = con.cursor()
+        cur.execute("SELECT key, value FROM cursorDiskKV WHERE "
+                    + " OR ".join("key LIKE ?" for _ in families) + " ORDER BY rowid",
+                    [f"{family}%" for family in families])
+        for k, v in cur:
+            _check_cancel(cancel)
+            # LIKE ignores case; anything not spelled like a family is skipped
+            family = k[:k.find(":") + 1]
+            decode = DISK_KV_DECODERS.get(family)
+            row = decode(k, v, db_path_str) if decode else None
+            if row:
+                out[family].append(row)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+    finally:
+        con.close()
+    return out
+
+def read_global_chatdata(global_db: pathlib.Path, cancel=None):
+    """Read the legacy aichat chatdata blob from the global ItemTable, if any."""
+    _check_cancel(cancel)
+    try:
+        con = sqlite3.connect(f"file:{global_db}?mode=ro", uri=True)
+        try:
+            return j(con.cursor(), "ItemTable", "workbench.panel.aichat.view.aichat.chatdata")
+        finally:
+            con.close()
+    except Exception as e:
+        logger.debug(f"Error processing global ItemTable: {e}")
+        return None
+
+################################################################################
+# Pluggable sources
+################################################################################
+# name -> reader(root, cancel) returning {"project": {...}, "meta": {cid: meta},
+# "rows": [(composerId, role, text, db_path), ...]}. Results are merged like a
+# workspace whose workspace_id is the source name.
+_sources: Dict[str, Callable] = {}
+
+def register_source(name: str, reader: Callable):
+    """Register an extra chat source that every extraction run will read."""
+    _sources[name] = reader
+
+def unregister_source(name: str):
+    _sources.pop(name, None)
+
+def read_source(name: str, root: pathlib.Path, cancel=None) -> Dict[str, Any]:
+    _check_cancel(cancel)
+    res = dict(_sources[name](root, cancel) or {})
+    res.setdefault("project", {"name": name, "rootPath": "(unknown)"})
+    res.setdefault("meta", {})
+    res.setdefault("rows", [])
+    res["ws_id"] = name
+    return res
+
+class MessageDeduper:
+    """
+    Drop messages that several sources report for the same composer.
+
+    A bubble ID identifies a message across sources, so a repeated ID is
+    always a duplicate. Otherwise messages are keyed on (role, content), but
+    only count as duplicates when an earlier *different* source already
+    produced them: one source repeating itself ("continue", "yes") is kept.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, set] = defaultdict(set)
+        self.content: Dict[str, Dict[tuple, str]] = defaultdict(dict)
+        self.dropped: Dict[str, int] = defaultdict(int)
+
+    def accept(self, cid: str, role: str, text: str, source: str, bubble_id: str = None) -> bool:
+        if bubble_id:
+            if bubble_id in self.ids[cid]:
+                self.dropped[source] += 1
+                return False
+            self.ids[cid].add(bubble_id)
+        first = self.content[cid].setdefault((role, text), source)
+        if first != source:
+            self.dropped[source] += 1
+            return False
+        return True
+
+    @property
+    def total(self) -> int:
+        return sum(self.dropped.values())
+
+def _order_bubbles(messages: list, start: int, bubble_ids: list, headers: list):
+    """Sort messages[start:start+len(bubble_ids)] into the order of the composer's headers."""
+    position = {h.get("bubbleId"): i for i, h in enumerate(headers) if isinstance(h, dict)}
+    end = start + len(bubble_ids)
+    # Bubbles missing from the header keep their rowid order, after the rest
+    keyed = sorted(zip(bubble_ids, messages[start:end]),
+                   key=lambda pair: position.get(pair[0], len(position)))
+    messages[start:end] = [msg for _, msg in keyed]
+
+def merge_extraction(ws_results: list, bubbles: list = (), composers: list = (),
+                     chat_data=None, stats: Dict[str, Any] = None) -> List[Chat]:
+    """
+    Combine reader results into Chat objects, newest first.
+
+    Messages reported by more than one source are merged (see
+    MessageDeduper); pass a dict as `stats` to receive message and
+    duplicate counts.
+    """
+    dedup = MessageDeduper()
+    # map lookups
+    ws_proj  : Dict[str,Project]       = {}
+    comp_meta: Dict[str,Dict[str,Any]] = {}
+    comp2ws  : Dict[str,str]           = {}
+    sessions : Dict[str,Dict[str,Any]] = defaultdict(lambda: {"messages":[]})
+
+    # 1. Workspace DBs first
+    for res in ws_results:
+        ws_id = res["ws_id"]
+        ws_proj[ws_id] = Project.from_dict(res["project"])
+        for cid, m in res["meta"].items():
+            comp_meta[cid] = m
+            comp2ws[cid] = ws_id
+        
+        for cid, role, text, db_path in res["rows"]:
+            # Add the message
+            if dedup.accept(cid, role, text, f"workspace:{ws_id}"):
+                sessions[cid]["messages"].append(Message(role, text))
+            # Make sure to record the database path
+            if "db_path" not in sessions[cid]:
+                sessions[cid]["db_path"] = db_path
+            if cid not in comp_meta:
+                comp_meta[cid] = {"title": f"Chat {cid[:8]}", "createdAt": None, "lastUpdatedAt": None}
+                comp2ws[cid] = ws_id
+        logger.debug(f"  - Extracted {len(res['rows'])} messages from workspace {ws_id}")
+    
+    logger.debug(f"Processed {len(ws_results)} workspaces")
+
+    # 2. Global storage bubbles from cursorDiskKV. A composer's bubbles end up
+    # contiguous in its message list; remember where, so they can be put in
+    # conversation order once its composerData header is seen.
+    bubble_spans: Dict[str, tuple] = {}
+    # Composers whose metadata is only a placeholder until their header is seen
+    untimed: set = set()
+    for cid, role, text, db_path, bubble_id in bubbles:
+        if dedup.accept(cid, role, text, "bubbles", bubble_id):
+            if cid not in bubble_spans:
+                bubble_spans[cid] = (len(sessions[cid]["messages"]), [])
+            bubble_spans[cid][1].append(bubble_id)
+            sessions[cid]["messages"].append(Message(role, text))
+        # Record the database path
+        if "db_path" not in sessions[cid]:
+            sessions[cid]["db_path"] = db_path
+        if cid not in comp_meta:
+            comp_meta[cid] = {"title": f"Chat {cid[:8]}", "createdAt": None, "lastUpdatedAt": None}
+            comp2ws[cid] = "(global)"
+            untimed.add(cid)
+    logger.debug(f"  - Extracted {len(bubbles)} messages from global cursorDiskKV bubbles")
+    
+    # Composer data
+    comp_count = 0
+    for cid, data, db_path in composers:
+        # The first header of a composer no workspace lists gives its times
+        if cid not in comp_meta or cid in untimed:
+            untimed.discard(cid)
+            created_at = data.get("createdAt")
+            comp_meta[cid] = {
+                "title": f"Chat {cid[:8]}",
+                "createdAt": created_at,
+                "lastUpdatedAt": data.get("lastUpdatedAt") or created_at
+            }
+            comp2ws[cid] = "(global)"
+        
+        # Record the database path
+        if "db_path" not in sessions[cid]:
+            sessions[cid]["db_path"] = db_path
+        
+        headers = data.get("fullConversationHeadersOnly")
+        if headers and cid in bubble_spans:
+            _order_bubbles(sessions[cid]["messages"], *bubble_spans[cid], headers)
+            
+        # Extract conversation from composer data
+        conversation = data.get("conversation", [])
+        if conversation:
+            msg_count = 0
+            for msg in conversation:
+                msg_type = msg.get("type")
+                if msg_type is None:
+                    continue
+                
+                # Type 1 = user, Type 2 = assistant
+                role = "user" if msg_type == 1 else "assistant"
+                content = msg.get("text", "")
+                if (content and isinstance(content, str)
+                        and dedup.accept(cid, role, content, "conversation", msg.get("bubbleId"))):
+                    sessions[cid]["messages"].append(Message(role, content))
+                    msg_count += 1
+            
+            if msg_count > 0:
+                comp_count += 1
+                logger.debug(f"  - Added {msg_count} messages from composer {cid[:8]}")
+    
+    if comp_count > 0:
+        logger.debug(f"  - Extracted data from {comp_count} composers in global cursorDiskKV")
+    
+    # Global ItemTable chat data
+    if chat_data:
+        msg_count = 0
+        for tab in chat_data.get("tabs", []):
+            tab_id = tab.get("tabId")
+            if tab_id and tab_id not in comp_meta:
+                comp_meta[tab_id] = {
+                    "title": f"Global Chat {tab_id[:8]}",
+                    "createdAt": None,
+                    "lastUpdatedAt": None
+                }
+                comp2ws[tab_id] = "(global)"
+            
+            for bubble in tab.get("bubbles", []):
+                content = ""
+                if "text" in bubble:
+                    content = bubble["text"]
+                elif "content" in bubble:
+                    content = bubble["content"]
+                
+                if content and isinstance(content, str):
+                    role = "user" if bubble.get("type") == "user" else "assistant"
+                    if dedup.accept(tab_id, role, content, "global chatdata", bubble.get("id")):
+                        sessions[tab_id]["messages"].append(Message(role, content))
+                        msg_count += 1
+        logger.debug(f"  - Extracted {msg_count} messages from global chat data")
+
+    if dedup.total:
+        logger.debug(f"  - Dropped {dedup.total} duplicate messages: {dict(dedup.dropped)}")
+
+    # 3. Build final list
+    unknown_project = Project("(unknown)", "(unknown)")
+    out = []
+    for cid, data in sessions.items():
+        if not data["messages"]:
+            continue
+        ws_id = comp2ws.get(cid, "(unknown)")
+        meta = comp_meta.get(cid, {"title": "(untitled)", "createdAt": None, "lastUpdatedAt": None})
+        out.append(Chat(cid, meta.get("title"), meta.get("createdAt"), meta.get("lastUpdatedAt"),
+                        ws_proj.get(ws_id, unknown_project), data["messages"], ws_id,
+                        data.get("db_path")))
+    
+    # Sort by last updated time if available
+    out.sort(key=lambda c: c.last_updated_at or 0, reverse=True)
+    logger.debug(f"Total chat sessions extracted: {len(out)}")
+    if stats is not None:
+        stats["chats"] = len(out)
+        stats["messages"] = sum(len(c.messages) for c in out)
+        stats["duplicates_dropped"] = dedup.total
+        stats["duplicates_by_source"] = dict(dedup.dropped)
+    return out
+
+def _extraction_jobs(root: pathlib.Path) -> list:
+    """Plan one (kind, reader, args) job per DB read for an extraction run."""
+    jobs = [("workspace", read_workspace, (ws_id, db)) for ws_id, db in workspaces(root)]
+    jobs += [("workspace", read_source, (name, root)) for name in list(_sources)]
+    # Only DBs whose layout holds chats get a reader (see db_layout())
+    for db in disk_kv_dbs(root):
+        if db_layout(db).get("cursorDiskKV"):
+            jobs.append(("disk_kv", read_disk_kv, (db,)))
+    global_db = global_storage_path(root)
+    if global_db and db_layout(global_db).get("ItemTable"):
+        jobs.append(("chatdata", read_global_chatdata, (global_db,)))
+    return jobs
+
+def _merge_job_results(jobs: list, results: list, stats: Dict[str, Any] = None) -> List[Chat]:
+    parts = {"workspace": [], "bubbles": [], "composers": [], "chatdata": None}
+    for (kind, _, _), res in zip(jobs, results):
+        if kind == "chatdata":
+            parts["chatdata"] = res
+        elif kind == "disk_kv":
+            parts["bubbles"].extend(res.get("bubbleId:", ()))
+            parts["composers"].extend(res.get("composerData:", ()))
+        else:
+            parts[kind].extend([res] if kind == "workspace" else res)
+    return merge_extraction(parts["workspace"], parts["bubbles"],
+                            parts["composers"], parts["chatdata"], stats)
+
+def load_chats(root: pathlib.Path = None, stats: Dict[str, Any] = None) -> List[Chat]:
+    """Extract every chat under `root` as Chat objects, newest first."""
+    root = root or cursor_root()
+    logger.debug(f"Using Cursor root: {root}")
+
+    # Diagnostic: Check for AI-related keys in the first workspace
+    if os.environ.get("CURSOR_CHAT_DIAGNOSTICS"):
+        _log_diagnostics(root)
+
+    jobs = _extraction_jobs(root)
+    results = []
+    for kind, reader, args in jobs:
+        logger.debug(f"Reading {kind} from {args[-1]}")
+        results.append(reader(*args))
+    return _merge_job_results(jobs, results, stats)
+
+def extract_chats(root: pathlib.Path = None) -> list[Dict[str,Any]]:
+    """Extract every chat under `root` in the documented dict format."""
+    return [chat.to_dict() for chat in load_chats(root)]
+
+def find_composer_workspace(root: pathlib.Path, composer_id: str):
+    """Return (ws_id, db) of the workspace whose composer list mentions `composer_id`."""
+    for ws_id, db in workspaces(root):
+        try:
+            con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+            try:
+                # instr() searches the raw value, so no workspace JSON gets decoded
+                cur = con.execute("SELECT 1 FROM ItemTable WHERE key='composer.composerData' "
+                                  "AND instr(value, ?) > 0", (composer_id,))
+                if cur.fetchone():
+                    return ws_id, db
+            finally:
+                con.close()
+        except sqlite3.DatabaseError as e:
+            logger.debug(f"Database error with {db}: {e}")
+    return None
+
+def load_chat(composer_id: str, root: pathlib.Path = None, full_scan: bool = True) -> Optional[Chat]:
+    """
+    Load a single chat by composerId.
+
+    Chats with a composerData:<id> header are assembled from a handful of
+    indexed reads (see read_composer_bubbles()) plus their owning workspace.
+    Older layouts without a header fall back to a full load_chats() scan,
+    or return None with `full_scan=False` so the caller can run (and
+    budget) that scan itself.
+    """
+    root = root or cursor_root()
+    for db in disk_kv_dbs(root):
+        found = read_composer_bubbles(db, composer_id)
+        if found is None:
+            continue
+        data, rows = found
+        owner = find_composer_workspace(root, composer_id)
+        ws_results = [read_workspace(*owner)] if owner else []
+        chats = merge_extraction(ws_results, rows, [(composer_id, data, str(db))])
+        chat = next((c for c in chats if c.composer_id == composer_id), None)
+        if chat:
+            return chat
+        break
+    
+    if not full_scan:
+        return None
+    return next((c for c in load_chats(root) if c.composer_id == composer_id), None)
+
+################################################################################
+# Most recent chats
+################################################################################
+# The chat list shows the newest chats first, so the first screen only needs
+# a few of them. load_recent_chats() ranks composers by their metadata alone
+# and reads the bubbles of just the ones it returns, instead of scanning every
+# bubble in the DB.
+
+def read_composer_timestamps(db: pathlib.Path) -> Dict[str, Any]:
+    """
+    composerId -> lastUpdatedAt (else createdAt) of every composerData:*
+    header, the time merge_extraction() gives a composer no workspace
+    lists, extracted by SQLite's json_extract() so no header is decoded in
+    Python.
+    """
+    low, high = prefix_range("composerData:")
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return {}
+    try:
+        cur = con.execute("SELECT key, CASE WHEN json_valid(value) THEN "
+                          "coalesce(json_extract(value, '$.lastUpdatedAt'), json_extract(value, '$.createdAt')) END "
+                          "FROM cursorDiskKV WHERE key >= ? AND key < ?", (low, high))
+        return {k.split(":")[1]: updated_at for k, updated_at in cur}
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return {}
+    finally:
+        con.close()
+
+def read_composers_disk_kv(db: pathlib.Path, composer_ids: Iterable[str]):
+    """
+    (bubbles, composers) of the given composers in one DB, shaped like
+    read_disk_kv()'s bubbleId:/composerData: rows: each composer's bubbles
+    come from a range scan of its bubbleId:<id>: keys, in rowid order.
+    """
+    bubbles, composers = [], []
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return bubbles, composers
+    db_path_str = str(db)
+    try:
+        cur = con.cursor()
+        for cid in composer_ids:
+            cur.execute("SELECT key, value FROM cursorDiskKV WHERE key >= ? AND key < ? ORDER BY rowid",
+                        prefix_range(f"bubbleId:{cid}:"))
+            bubbles.extend(row for row in (_bubble_row(k, v, db_path_str) for k, v in cur.fetchall()) if row)
+            cur.execute("SELECT key, value FROM cursorDiskKV WHERE key = ?", (f"composerData:{cid}",))
+            for k, v in cur.fetchall():
+                row = _composer_row(k, v, db_path_str)
+                if row:
+                    composers.append(row)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+    finally:
+        con.close()
+    return bubbles, composers
+
+def load_recent_chats(n: int, root: pathlib.Path = None, full_scan: bool = True) -> Optional[List[Chat]]:
+    """
+    The `n` most recent chats under `root`, newest first: the same chats as
+    load_chats()[:n], without reading the bubbles of any other chat.
+
+    Composers are ranked by their workspace metadata (composer.composerData)
+    or, for composers only the global DB knows, by the lastUpdatedAt (else
+    createdAt) of their composerData:* header. A heap yields the newest
+    candidates, which are then assembled with merge_extraction() exactly as
+    a full extraction would. That gives them the same time, except for
+    composers whose first messages came from a workspace that does not list
+    them, so an assembled chat goes back on the heap under its real time
+    and is only returned once it is still the newest. Chats without any
+    time sort last in an order only a full extraction can tell; reaching
+    them falls back to load_chats(), or returns None with `full_scan=False`.
+    """
+    sources = read_chat_sources(root or cursor_root())
+    times = composer_times(sources)
+
+    # (-time, tie-breaker, composerId, assembled Chat or None)
+    heap = [(-(t or 0), i, cid, None) for i, (cid, t) in enumerate(times.items())]
+    heapq.heapify(heap)
+    seq = len(heap)
+    out: List[Chat] = []
+    while len(out) < n:
+        if not heap or not heap[0][0]:
+            logger.debug("Recent chats reached chats without timestamps; a full extraction is needed")
+            return load_chats(root)[:n] if full_scan else None
+        if heap[0][3] is not None:
+            out.append(heapq.heappop(heap)[3])
+            continue
+        # Assemble the newest unassembled candidates in one go
+        batch = []
+        while heap and heap[0][3] is None and heap[0][0] and len(batch) < n - len(out):
+            batch.append(heapq.heappop(heap)[2])
+        for chat in assemble_chats(sources, batch):
+            heapq.heappush(heap, (-(chat.last_updated_at or 0), seq, chat.composer_id, chat))
+            seq += 1
+    return out
+
+################################################################################
+# Streaming extraction
+################################################################################
+# Exports write each chat once and never look at it again, so they don't need
+# every chat in memory at once. iter_chats() lists the composers from the key
+# index and assembles them a batch at a time with the same indexed reads as
+# load_recent_chats(); only one batch of bubbles is decoded at any time.
+
+STREAM_BATCH = 200
+
+def read_chat_sources(root: pathlib.Path) -> Dict[str, Any]:
+    """
+    Everything an extraction reads besides the cursorDiskKV rows: workspace
+    (and plugged-in source) results, the DBs whose layout holds cursorDiskKV
+    chats, and the legacy global chat data. Workspace rows and chat data
+    tabs are also grouped by composer for assemble_chats().
+    """
+    ws_results = [read_workspace(ws_id, db) for ws_id, db in workspaces(root)]
+    ws_results += [read_source(name, root) for name in list(_sources)]
+    kv_dbs = [db for db in disk_kv_dbs(root) if db_layout(db).get("cursorDiskKV")]
+    global_db = global_storage_path(root)
+    chat_data = None
+    if global_db and db_layout(global_db).get("ItemTable"):
+        chat_data = read_global_chatdata(global_db)
+    ws_rows = []
+    for res in ws_results:
+        by_cid = defaultdict(list)
+        for row in res["rows"]:
+            by_cid[row[0]].append(row)
+        ws_rows.append(by_cid)
+    tabs = {tab.get("tabId"): tab for tab in (chat_data or {}).get("tabs", []) if tab.get("tabId")}
+    return {"workspaces": ws_results, "ws_rows": ws_rows, "kv_dbs": kv_dbs,
+            "chat_data": chat_data, "tabs": tabs}
+
+def composer_times(sources: Dict[str, Any]) -> Dict[str, Any]:
+    """composerId -> the time it is ranked by before its bubbles are read (see load_recent_chats())."""
+    # Later workspaces win, as in merge_extraction(); headers only count for
+    # composers no workspace lists, and the first DB's header wins
+    times: Dict[str, Any] = {}
+    for db in reversed(sources["kv_dbs"]):
+        times.update(read_composer_timestamps(db))
+    for res in sources["workspaces"]:
+        times.update((cid, meta.get("lastUpdatedAt")) for cid, meta in res["meta"].items())
+    return times
+
+def read_composer_ids(db: pathlib.Path) -> List[str]:
+    """
+    composerIds with a composerData:* header or bubbleId:* rows in `db`. The
+    bubble keys are skipped over one composer at a time with key-index
+    seeks, so no bubble value is read.
+    """
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+        return []
+    ids: Dict[str, None] = {}
+    try:
+        cur = con.cursor()
+        cur.execute("SELECT key FROM cursorDiskKV WHERE key >= ? AND key < ?", prefix_range("composerData:"))
+        ids.update((k.split(":")[1], None) for (k,) in cur.fetchall())
+        low, high = prefix_range("bubbleId:")
+        while True:
+            cur.execute("SELECT key FROM cursorDiskKV WHERE key >= ? AND key < ? ORDER BY key LIMIT 1", (low, high))
+            row = cur.fetchone()
+            if not row:
+                break
+            cid = row[0].split(":")[1]
+            ids[cid] = None
+            low = prefix_range(f"bubbleId:{cid}:")[1]
+    except sqlite3.DatabaseError as e:
+        logger.debug(f"Database error with {db}: {e}")
+    finally:
+        con.close()
+    return list(ids)
+
+def assemble_chats(sources: Dict[str, Any], composer_ids: List[str]) -> List[Chat]:
+    """
+    The chats of `composer_ids` (those with messages), assembled with
+    merge_extraction() exactly as a full extraction would, from indexed
+    reads of just their bubbles and headers.
+    """
+    wanted = set(composer_ids)
+    bubbles, composers = [], []
+    for db in sources["kv_dbs"]:
+        b, c = read_composers_disk_kv(db, composer_ids)
+        bubbles += b
+        composers += c
+    batch_ws = [dict(res, rows=[row for cid in composer_ids for row in by_cid.get(cid, ())])
+                for res, by_cid in zip(sources["workspaces"], sources["ws_rows"])]
+    batch_chat_data = None
+    if sources["chat_data"]:
+        batch_chat_data = {"tabs": [sources["tabs"][cid] for cid in composer_ids if cid in sources["tabs"]]}
+    return [chat for chat in merge_extraction(batch_ws, bubbles, composers, batch_chat_data)
+            if chat.composer_id in wanted]
+
+def iter_chats(root: pathlib.Path = None, batch_size: int = STREAM_BATCH) -> Iterable[Chat]:
+    """
+    Yield every chat under `root` (the same chats as load_chats()), holding
+    only `batch_size` of them in memory at a time.
+
+    Chats come roughly newest first, ranked by their composer metadata like
+    load_recent_chats(), but unlike load_chats() they are not sorted by the
+    time their messages give them.
+    """
+    sources = read_chat_sources(root or cursor_root())
+    times = composer_times(sources)
+    for by_cid in sources["ws_rows"]:
+        times.update((cid, None) for cid in by_cid if cid not in times)
+    for db in sources["kv_dbs"]:
+        times.update((cid, None) for cid in read_composer_ids(db) if cid not in times)
+    times.update((cid, None) for cid in sources["tabs"] if cid not in times)
+    ids = sorted(times, key=lambda cid: times[cid] or 0, reverse=True)
+    for i in range(0, len(ids), batch_size):
+        yield from assemble_chats(sources, ids[i:i + batch_size])
+
+################################################################################
+# Async extraction pipeline
+################################################################################
+# Bounded pool for blocking SQLite reads. Sized small on purpose: the reads are
+# I/O bound and more threads than disks just adds seek contention.
+IO_WORKERS = int(os.environ.get("CURSOR_VIEW_IO_WORKERS", "4"))
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="cursor-io")
+
+async def load_chats_async(progress: ExtractionProgress = None, root: pathlib.Path = None,
+                           stats: Dict[str, Any] = None) -> List[Chat]:
+    """
+    Asyncio variant of load_chats().
+
+    Every DB read runs on the bounded I/O executor and reads of different
+    workspace DBs overlap. Cancelling the awaiting task stops all readers at
+    their next row and skips readers that have not started yet.
+    """
+    import asyncio  # only needed (and already loaded) when running in a loop
+
+    progress = progress or ExtractionProgress()
+    cancel = threading.Event()
+    loop = asyncio.get_running_loop()
+    root = root or cursor_root()
+    logger.debug(f"Using Cursor root: {root}")
+
+    if os.environ.get("CURSOR_CHAT_DIAGNOSTICS"):
+        await loop.run_in_executor(_io_executor, _log_diagnostics, root)
+
+    async def run(kind, reader, args):
+        result = await loop.run_in_executor(_io_executor, reader, *args, cancel)
+        count = {"workspace": lambda r: len(r["rows"]),
+                 "disk_kv": lambda r: sum(len(rows) for rows in r.values()),
+                 "chatdata": lambda r: 0}[kind](result)
+        progress.finish_db(str(args[-1]), count)
+        return result
+
+    jobs = await loop.run_in_executor(_io_executor, _extraction_jobs, root)
+    progress.start(len(jobs))
+
+    try:
+        results = await asyncio.gather(*(run(*job) for job in jobs))
+    except asyncio.CancelledError:
+        progress.cancelled = True
+        logger.info("Chat extraction cancelled")
+        raise
+    finally:
+        # Executor threads cannot be interrupted; this makes readers that are
+        # still running (after a cancel or a failed sibling) stop at their next row.
+        cancel.set()
+
+    return _merge_job_results(jobs, results, stats)
+
+async def extract_chats_async(progress: ExtractionProgress = None,
+                              root: pathlib.Path = None) -> list[Dict[str,Any]]:
+    """Asyncio variant of extract_chats()."""
+    return [chat.to_dict() for chat in await load_chats_async(progress, root)]
+
+################################################################################
+# Project name fallbacks
+################################################################################
+def extract_project_from_git_repos(workspace_id, debug=False, root: pathlib.Path = None):
+    """
+    Extract project name from the git repositories in a workspace.
+    Returns None if no repositories found or unable to access the DB.
+    """
+    if not workspace_id or workspace_id == "unknown" or workspace_id == "(unknown)" or workspace_id == "(global)":
+        if debug:
+            logger.debug(f"Invalid workspace ID: {workspace_id}")
+        return None
+        
+    # Find the workspace DB
+    cursor_base = root or cursor_root()
+    workspace_db_path = cursor_base / "User" / "workspaceStorage" / workspace_id / "state.vscdb"
+    
+    if not workspace_db_path.exists():
+        if debug:
+            logger.debug(f"Workspace DB not found for ID: {workspace_id}")
+        return None
+        
+    try:
+        cached, git_data = _cached_git_repos(workspace_db_path)
+        if not cached:
+            # Not read by an extraction since it last changed; connect to the workspace DB
+            if debug:
+                logger.debug(f"Connecting to workspace DB: {workspace_db_path}")
+            con = sqlite3.connect(f"file:{workspace_db_path}?mode=ro", uri=True)
+            try:
+                git_data = j(con.cursor(), "ItemTable", "scm:view:visibleRepositories")
+            finally:
+                con.close()
+        
+        # Look for git repositories
+        if not git_data or not isinstance(git_data, dict) or 'all' not in git_data:
+            if debug:
+                logger.debug(f"No git repositories found in workspace {workspace_id}, git_data: {git_data}")
+            return None
+            
+        # Extract repo paths from the 'all' key
+        repos = git_data.get('all', [])
+        if not repos or not isinstance(repos, list):
+            if debug:
+                logger.debug(f"No repositories in 'all' key for workspace {workspace_id}, repos: {repos}")
+            return None
+            
+        if debug:
+            logger.debug(f"Found {len(repos)} git repositories in workspace {workspace_id}: {repos}")
+            
+        # Process each repo path
+        for repo in repos:
+            if not isinstance(repo, str):
+                continue
+                
+            # Look for git:Git:file:/// pattern
+            if "git:Git:file:///" in repo:
+                # Extract the path part
+                path = repo.split("file:///")[-1]
+                path_parts = [p for p in path.split('/') if p]
+                
+                if path_parts:
+                    # Use the last part as the project name
+                    project_name = path_parts[-1]
+                    if debug:
+                        logger.debug(f"Found project name '{project_name}' from git repo in workspace {workspace_id}")
+                    return project_name
+            else:
+                if debug:
+                    logger.debug(f"No 'git:Git:file:///' pattern in repo: {repo}")
+                    
+        if debug:
+            logger.debug(f"No suitable git repos found in workspace {workspace_id}")
+    except Exception as e:
+        if debug:
+            logger.debug(f"Error extracting git repos from workspace {workspace_id}: {e}")
+        return None
+        
+    return None
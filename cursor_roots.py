@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Serve several Cursor storage roots (other users, old machine backups, Cursor
+Insiders) from one process.
+
+Each root gets its own cache and a single extraction worker thread, so roots
+are extracted in parallel and a root is only re-read when its storage
+fingerprint changed. When a slow root has not finished within ROOT_TIMEOUT,
+its previous chats (if any) are served instead of blocking the others.
+Given an AdmissionController, full extractions are admitted against its
+memory budget, and a root that cannot be admitted serves its previous chats
+too (or raises Overloaded when it has none).
+
+With more than one root, composerIds are namespaced as ``<root name>:<id>``
+so chats from different roots never collide; a single root keeps the plain
+ids the rest of the app has always used.
+"""
+
+import logging
+import os
+import pathlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from admission import AdmissionController, Overloaded, Ticket, extraction_cost
+from cursor_extraction import (
+    Chat,
+    ExtractionProgress,
+    cursor_root,
+    iter_chats,
+    load_chat,
+    load_chats,
+    load_chats_async,
+    load_recent_chats,
+    storage_fingerprint,
+)
+
+logger = logging.getLogger(__name__)
+
+ROOT_TIMEOUT = float(os.environ.get("CURSOR_VIEW_ROOT_TIMEOUT", "30"))
+
+
+def parse_root_spec(spec: str) -> Tuple[Optional[str], pathlib.Path]:
+    """Parse ``NAME=PATH`` or ``PATH`` into (name or None, path)."""
+    name, sep, path = spec.partition("=")
+    if sep and name and os.sep not in name:
+        return name, pathlib.Path(path).expanduser()
+    return None, pathlib.Path(spec).expanduser()
+
+
+class CursorRoot:
+    """One storage root with its cached chats and extraction worker."""
+
+    def __init__(self, name: str, path: pathlib.Path, admission: Optional[AdmissionController] = None):
+        self.name = name
+        self.path = path
+        self.admission = admission
+        self.namespace: Optional[str] = None
+        self._lock = threading.Lock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"root-{name}")
+        self._pending: Optional[Future] = None
+        self.chats: Optional[List[Chat]] = None
+        self.stats: Dict[str, Any] = {}
+        self.fingerprint = None
+
+    def qualify(self, chats: List[Chat]) -> List[Chat]:
+        if self.namespace:
+            for chat in chats:
+                chat.composer_id = f"{self.namespace}:{chat.composer_id}"
+        return chats
+
+    def _load(self) -> List[Chat]:
+        fp = storage_fingerprint(self.path)
+        if fp is not None and fp == self.fingerprint and self.chats is not None:
+            return self.chats
+        stats: Dict[str, Any] = {}
+        if self.admission is None:
+            chats = self.qualify(load_chats(self.path, stats=stats))
+        else:
+            with self.admission.admit(extraction_cost(self.path), f"root {self.name}"):
+                chats = self.qualify(load_chats(self.path, stats=stats))
+        self.store(chats, stats, fp)
+        return chats
+
+    def current_chats(self) -> Optional[List[Chat]]:
+        """The cached chats if the root's storage has not changed since they were extracted."""
+        fp = storage_fingerprint(self.path)
+        with self._lock:
+            if fp is not None and fp == self.fingerprint:
+                return self.chats
+        return None
+
+    def store(self, chats: List[Chat], stats: Dict[str, Any], fingerprint):
+        with self._lock:
+            self.chats, self.stats, self.fingerprint = chats, stats, fingerprint
+
+    def refresh(self) -> Future:
+        """Start (or join) a background re-extraction of this root."""
+        with self._lock:
+            if self._pending is None or self._pending.done():
+                self._pending = self._worker.submit(self._load)
+            return self._pending
+
+
+class RootSet:
+    """The configured roots; the default is the current user's Cursor root."""
+
+    def __init__(self, specs: Sequence[str] = (), admission: Optional[AdmissionController] = None):
+        self._specs = list(specs)
+        self.admission = admission
+        self._roots: Optional[List[CursorRoot]] = None
+
+    @property
+    def roots(self) -> List[CursorRoot]:
+        # Resolved lazily so merely importing the server never touches the filesystem
+        if self._roots is None:
+            parsed = [parse_root_spec(s) for s in self._specs] or [(None, cursor_root())]
+            roots, names = [], set()
+            for name, path in parsed:
+                base = name or path.name or "root"
+                name, n = base, 1
+                while name in names:
+                    n += 1
+                    name = f"{base}-{n}"
+                names.add(name)
+                roots.append(CursorRoot(name, path, self.admission))
+            if len(roots) > 1:
+                for root in roots:
+                    root.namespace = root.name
+            self._roots = roots
+        return self._roots
+
+    @property
+    def namespaced(self) -> bool:
+        return len(self.roots) > 1
+
+    def split_id(self, composer_id: str) -> Tuple[Optional[CursorRoot], str]:
+        """Return (root, composerId within that root); root is None if unknown."""
+        if not self.namespaced:
+            return self.roots[0], composer_id
+        name, sep, cid = composer_id.partition(":")
+        for root in self.roots:
+            if sep and root.name == name:
+                return root, cid
+        return None, composer_id
+
+    def root_path(self, composer_id: str) -> Optional[pathlib.Path]:
+        root, _ = self.split_id(composer_id)
+        return root.path if root else None
+
+    def fingerprint(self) -> Optional[tuple]:
+        fps = tuple(storage_fingerprint(root.path) for root in self.roots)
+        return None if None in fps else fps
+
+    def load_chats(self, stats: Dict[str, Any] = None,
+                   timeout: Optional[float] = ROOT_TIMEOUT) -> List[Chat]:
+        """
+        Chats of every root, newest first. Roots still extracting after
+        `timeout` seconds contribute their previous chats; with a single root
+        there is nothing else to serve, so it is always awaited. So do roots
+        whose extraction was not admitted, unless they have none (Overloaded).
+        `stats` also receives the storage fingerprint the chats came from.
+        """
+        roots = self.roots
+        futures = {root: root.refresh() for root in roots}
+        done, _ = wait(futures.values(), timeout=timeout if len(roots) > 1 else None)
+        out: List[Chat] = []
+        slow = []
+        fingerprints = []
+        for root, future in futures.items():
+            if future in done:
+                try:
+                    chats = future.result()
+                except Overloaded:
+                    if root.chats is None:
+                        raise
+                    slow.append(root.name)
+                    chats = root.chats
+            else:
+                slow.append(root.name)
+                chats = root.chats or []
+            out.extend(chats)
+            # Unknown (None) unless the root's cache still holds exactly these chats
+            with root._lock:
+                fingerprints.append(root.fingerprint if root.chats is chats else None)
+        if slow:
+            logger.warning(f"Serving cached chats for slow roots: {', '.join(slow)}")
+        if len(roots) > 1:
+            out.sort(key=lambda c: c.last_updated_at or 0, reverse=True)
+        if stats is not None:
+            merge_stats(stats, [root.stats for root in roots])
+            stats["slow_roots"] = slow
+            stats["fingerprint"] = tuple(fingerprints)
+        return out
+
+    def extract_chats(self) -> List[Chat]:
+        """
+        Chats of every root, newest first, extracted in parallel but not
+        cached: for one-shot commands that free each chat once written.
+        """
+        roots = self.roots
+        with ThreadPoolExecutor(max_workers=len(roots), thread_name_prefix="extract") as pool:
+            results = list(pool.map(lambda root: root.qualify(load_chats(root.path)), roots))
+        out = [chat for chats in results for chat in chats]
+        if len(roots) > 1:
+            out.sort(key=lambda c: c.last_updated_at or 0, reverse=True)
+        return out
+
+    def iter_chats(self) -> Iterable[Chat]:
+        """
+        Chats of every root, one root after the other, as iter_chats()
+        assembles them: not cached and not sorted across roots, so writers
+        can stream them out with a batch of chats in memory.
+        """
+        for root in self.roots:
+            for chat in iter_chats(root.path):
+                yield root.qualify([chat])[0]
+
+    def admit_extraction(self, label: str) -> Optional[Ticket]:
+        """Admission of extracting every root at once, or None without admission control."""
+        if self.admission is None:
+            return None
+        return self.admission.acquire(self.extraction_cost(), label)
+
+    async def load_chats_async(self, progress: ExtractionProgress = None,
+                               ticket: Optional[Ticket] = None) -> List[Chat]:
+        """
+        load_chats_async() over every root concurrently, sharing one progress.
+        Runs under `ticket` from admit_extraction(), which is acquired here
+        (blocking the loop until admitted) if not given, and released when
+        the extraction ends.
+        """
+        import asyncio  # see load_chats_async()
+
+        progress = progress or ExtractionProgress()
+        if ticket is None:
+            ticket = self.admit_extraction("async")
+
+        async def one(root: CursorRoot):
+            stats: Dict[str, Any] = {}
+            fp = storage_fingerprint(root.path)
+            chats = root.qualify(await load_chats_async(progress, root.path, stats))
+            root.store(chats, stats, fp)
+            return chats
+
+        try:
+            results = await asyncio.gather(*(one(root) for root in self.roots))
+        finally:
+            if ticket is not None:
+                ticket.release()
+        out = [chat for chats in results for chat in chats]
+        if len(results) > 1:
+            out.sort(key=lambda c: c.last_updated_at or 0, reverse=True)
+        return out
+
+    def load_recent_chats(self, n: int) -> Optional[List[Chat]]:
+        """
+        The `n` newest chats of every root, for a first page that must not
+        wait for a full extraction. Roots whose cached chats are current
+        serve those; the others are read with load_recent_chats() and then
+        start a full extraction in the background, which later pages join.
+        Returns None when every root is current (load_chats() is then just
+        as fast and also knows the total).
+        """
+        out: List[Chat] = []
+        stale = []
+        for root in self.roots:
+            chats = root.current_chats()
+            if chats is None:
+                recent = load_recent_chats(n, root.path, full_scan=False)
+                if recent is None:
+                    # Only a full extraction can order the rest; the root's own runs under admission
+                    try:
+                        chats = root.refresh().result()
+                    except Overloaded:
+                        if root.chats is None:
+                            raise
+                        chats = root.chats
+                else:
+                    chats = root.qualify(recent)
+                    stale.append(root)
+            out.extend(chats[:n])
+        if not stale:
+            return None
+        for root in stale:
+            root.refresh()
+        if len(self.roots) > 1:
+            out.sort(key=lambda c: c.last_updated_at or 0, reverse=True)
+        return out[:n]
+
+    def extraction_cost(self) -> int:
+        """Estimated memory of extracting every root at once (see admission.extraction_cost())."""
+        return sum(extraction_cost(root.path) for root in self.roots)
+
+    def load_chat(self, composer_id: str) -> Optional[Chat]:
+        """
+        One chat by (qualified) id. Chats without a composer header are only
+        found by a full extraction, which joins the root's cached (and
+        admitted) one; it raises Overloaded when that is turned away.
+        """
+        root, cid = self.split_id(composer_id)
+        if root is None:
+            return None
+        chat = load_chat(cid, root.path, full_scan=False)
+        if chat is not None:
+            return root.qualify([chat])[0]
+        return next((c for c in root.refresh().result() if c.composer_id == composer_id), None)
+
+
+def merge_stats(into: Dict[str, Any], parts: List[Dict[str, Any]]):
+    """Sum per-root extraction stats (numbers and per-source dicts)."""
+    for part in parts:
+        for key, value in part.items():
+            if isinstance(value, dict):
+                target = into.setdefault(key, {})
+                for k, v in value.items():
+                    target[k] = target.get(k, 0) + v
+            elif isinstance(value, (int, float)):
+                into[key] = into.get(key, 0) + value
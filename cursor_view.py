@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Command-line access to Cursor chats without starting the web server.
+
+    python3 cursor_view.py list [--limit N] [--project NAME] [--json]
+    python3 cursor_view.py show <id> [--json]
+    python3 cursor_view.py search <text> [--limit N] [--json]
+    python3 cursor_view.py export <id> [--format html|json] [--out FILE]
+    python3 cursor_view.py build-site <dir> [--page-size N] [--workers N]
+
+Ids may be abbreviated to any unique prefix. Chats are read from a cached
+index (a chat_archive SQLite file) that is only rebuilt when the Cursor DBs
+changed since it was written, so repeated commands skip extraction entirely.
+build-site renders every chat into a static website instead (see
+static_site.py) and reads the live DBs, like export.
+Flask is never imported, and the extraction and rendering modules are only
+imported once a command needs them.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+CACHE_DIR = pathlib.Path(os.environ.get("CURSOR_VIEW_CACHE_DIR",
+                                        pathlib.Path.home() / ".cache" / "cursor-view"))
+
+################################################################################
+# Cached index
+################################################################################
+def cache_path(root_specs: List[str]) -> pathlib.Path:
+    key = hashlib.sha1("\0".join(sorted(root_specs)).encode()).hexdigest()[:12]
+    return CACHE_DIR / f"index-{key}.sqlite"
+
+
+def _fingerprint(roots) -> Optional[str]:
+    from cursor_extraction import storage_fingerprint
+
+    fps = [(root.name, storage_fingerprint(root.path)) for root in roots.roots]
+    if any(fp is None for _, fp in fps):
+        return None
+    return json.dumps([CACHE_VERSION, fps])
+
+
+def open_index(root_specs: List[str], refresh: bool = False) -> sqlite3.Connection:
+    """Open the cached index, rebuilding it first if the Cursor DBs changed."""
+    from cursor_roots import RootSet
+
+    roots = RootSet(root_specs)
+    path = cache_path(root_specs)
+    fingerprint = _fingerprint(roots)
+    if path.exists() and not refresh and fingerprint is not None:
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = con.execute("SELECT value FROM cache_meta WHERE key='fingerprint'").fetchone()
+            if row and row[0] == fingerprint:
+                return con
+        except sqlite3.DatabaseError:
+            pass
+        con.close()
+
+    from chat_archive import write_sqlite_archive
+
+    t0 = time.perf_counter()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    counts = write_sqlite_archive(roots.iter_chats(), tmp)
+    con = sqlite3.connect(tmp)
+    with con:
+        con.execute("CREATE TABLE cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute("INSERT INTO cache_meta VALUES ('fingerprint', ?)", (fingerprint or "",))
+    con.close()
+    os.replace(tmp, path)
+    logger.info(f"Indexed {counts['sessions']} chats in {time.perf_counter() - t0:.2f}s into {path}")
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+SESSION_COLUMNS = """
+    s.composer_id, s.title, s.created_at, s.last_updated_at, s.message_count,
+    s.workspace_id, s.db_path, p.name, p.root_path
+"""
+
+
+def _session(row) -> Dict[str, Any]:
+    keys = ("session_id", "title", "created_at", "last_updated_at", "message_count",
+            "workspace_id", "db_path", "project", "root_path")
+    return dict(zip(keys, row))
+
+
+def resolve_id(con: sqlite3.Connection, prefix: str) -> str:
+    """Expand an id prefix to the single composerId it names."""
+    rows = con.execute(
+        "SELECT composer_id FROM sessions WHERE composer_id >= ? AND composer_id < ? LIMIT 2",
+        (prefix, prefix + "\uffff")).fetchall()
+    if not rows:
+        raise LookupError(f"No chat with id {prefix}")
+    if len(rows) > 1:
+        raise LookupError(f"Id prefix {prefix} is ambiguous")
+    return rows[0][0]
+
+
+def session_messages(con: sqlite3.Connection, composer_id: str) -> List[Dict[str, str]]:
+    return [{"role": role, "content": content} for role, content in con.execute(
+        "SELECT role, content FROM messages WHERE session_id=? ORDER BY seq", (composer_id,))]
+
+################################################################################
+# Commands
+################################################################################
+def _when(session: Dict[str, Any]) -> str:
+    ms = session["last_updated_at"] or session["created_at"]
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ms / 1000)) if ms else " " * 16
+
+
+def _write_json(data):
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+
+
+def cmd_list(con, args):
+    query = f"SELECT {SESSION_COLUMNS} FROM sessions s LEFT JOIN projects p ON p.id = s.project_id"
+    params: list = []
+    if args.project:
+        query += " WHERE p.name LIKE ?"
+        params.append(f"%{args.project}%")
+    query += " ORDER BY coalesce(s.last_updated_at, s.created_at) DESC LIMIT ?"
+    params.append(args.limit)
+    sessions = [_session(row) for row in con.execute(query, params)]
+    if args.json:
+        return _write_json(sessions)
+    for s in sessions:
+        print(f"{_when(s)}  {s['session_id'][:12]:12}  {s['message_count']:5}  "
+              f"{(s['project'] or '')[:24]:24}  {s['title'] or ''}")
+
+
+def cmd_show(con, args):
+    cid = resolve_id(con, args.id)
+    session = _session(con.execute(
+        f"SELECT {SESSION_COLUMNS} FROM sessions s LEFT JOIN projects p ON p.id = s.project_id "
+        "WHERE s.composer_id=?", (cid,)).fetchone())
+    session["messages"] = session_messages(con, cid)
+    if args.json:
+        return _write_json(session)
+    print(f"{session['title'] or '(untitled)'}  [{session['project']}]  {_when(session)}")
+    print(f"id: {cid}")
+    for m in session["messages"]:
+        print(f"\n--- {m['role']} ---\n{m['content']}")
+
+
+def _snippet(text: str, needle: str, width: int = 60) -> str:
+    i = text.lower().find(needle.lower())
+    start = max(0, i - width // 2)
+    snippet = text[start:start + width + len(needle)].replace("\n", " ")
+    return ("…" if start else "") + snippet
+
+
+def cmd_search(con, args):
+    pattern = "%" + args.text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    rows = con.execute(
+        f"SELECT {SESSION_COLUMNS}, m.seq, m.role, m.content FROM messages m "
+        "JOIN sessions s ON s.composer_id = m.session_id "
+        "LEFT JOIN projects p ON p.id = s.project_id "
+        "WHERE m.content LIKE ? ESCAPE '\\' "
+        "ORDER BY coalesce(s.last_updated_at, s.created_at) DESC, m.seq LIMIT ?",
+        (pattern, args.limit)).fetchall()
+    hits = []
+    for row in rows:
+        hit = _session(row[:9])
+        hit.update(message_index=row[9], role=row[10], snippet=_snippet(row[11], args.text))
+        hits.append(hit)
+    if args.json:
+        return _write_json(hits)
+    for h in hits:
+        print(f"{_when(h)}  {h['session_id'][:12]:12}  {(h['project'] or '')[:20]:20}  "
+              f"#{h['message_index']} {h['role']}: {h['snippet']}")
+
+
+def cmd_export(con, args):
+    from chat_format import format_chat_for_frontend, generate_standalone_html
+    from cursor_roots import RootSet
+
+    cid = resolve_id(con, args.id)
+    roots = RootSet(args.root)
+    # Render from the live DBs (point lookups) for output identical to the server's
+    chat = roots.load_chat(cid)
+    if chat is None:
+        raise LookupError(f"Chat {cid} is in the index but no longer in Cursor's storage")
+    formatted = format_chat_for_frontend(chat, roots=roots)
+    if args.format == "json":
+        data = json.dumps(formatted, indent=2).encode("utf-8")
+    else:
+        data = generate_standalone_html(formatted).encode("utf-8")
+    out = args.out or pathlib.Path(f"cursor-chat-{cid[:8]}.{args.format}")
+    if str(out) == "-":
+        sys.stdout.buffer.write(data)
+    else:
+        out.write_bytes(data)
+        print(f"Exported chat {cid} to {out}", file=sys.stderr)
+
+
+def cmd_build_site(con, args):
+    from chat_format import format_chat_for_frontend
+    from cursor_roots import RootSet
+    from static_site import build_site
+
+    roots = RootSet(args.root)
+    chats = roots.extract_chats()
+    project_cache = {}
+    formatted = [format_chat_for_frontend(chat, project_cache, roots) for chat in chats]
+    titles = {chat.composer_id: chat.title for chat in chats}
+    counts = build_site(formatted, titles, args.dir, page_size=args.page_size,
+                        shard_bytes=args.shard_kb * 1024, workers=args.workers)
+    print(f"Built {args.dir}: {counts['chats']} chats in {counts['projects']} projects, "
+          f"{counts['terms']} search terms in {counts['shards']} shards ({counts['seconds']}s)",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Browse Cursor chats from the command line")
+    parser.add_argument("--root", action="append", default=[], metavar="[NAME=]PATH",
+                        help="Cursor storage root; repeat for several (default: this user's)")
+    parser.add_argument("--refresh", action="store_true", help="Rebuild the cached index")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="List chats, most recent first")
+    p.add_argument("--limit", type=int, default=50)
+    p.add_argument("--project", help="Only chats whose project name contains this")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("show", help="Print one chat")
+    p.add_argument("id")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_show)
+
+    p = sub.add_parser("search", help="Find messages containing text (case-insensitive)")
+    p.add_argument("text")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("export", help="Export one chat as standalone HTML or JSON")
+    p.add_argument("id")
+    p.add_argument("--format", choices=["html", "json"], default="html")
+    p.add_argument("--out", type=pathlib.Path, help="Output file, or - for stdout")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("build-site", help="Render every chat into a static website with offline search")
+    p.add_argument("dir", type=pathlib.Path, help="Output directory (replaced if it holds an earlier build)")
+    p.add_argument("--page-size", type=int, default=50, help="Chats per project index page")
+    p.add_argument("--shard-kb", type=int, default=256, help="Uncompressed size of a search index shard")
+    p.add_argument("--workers", type=int, help="Rendering processes (default: one per CPU)")
+    # Renders from the live DBs, so the cached index is not needed
+    p.set_defaults(func=cmd_build_site, index=False)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(message)s")
+    try:
+        con = open_index(args.root, args.refresh) if getattr(args, "index", True) else None
+        try:
+            args.func(con, args)
+        finally:
+            if con is not None:
+                con.close()
+    except (LookupError, RuntimeError) as e:
+        parser.exit(1, f"{e}\n")
+    except BrokenPipeError:
+        # The reader (e.g. `head`) went away; don't dump a traceback on exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
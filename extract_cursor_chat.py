@@ -25,75 +25,30 @@ python extract_cursor_chat.py --workspace state.vscdb --session state.sqlite --o
 
 from __future__ import annotations
 
-import argparse, json, os, pathlib, sqlite3, sys
+import argparse, json, pathlib
 from dataclasses import dataclass
-from typing import Dict, List, Any, Iterable, Tuple
+from typing import Dict, List, Any
 
-
-# ------------------------------------------------------------
-# Shared helpers
-# ------------------------------------------------------------
-def _load_json(cur: sqlite3.Cursor, table: str, key: str):
-    cur.execute(f"SELECT value FROM {table} WHERE key=?", (key,))
-    row = cur.fetchone()
-    if not row:
-        return None
-    try:
-        return json.loads(row[0])
-    except Exception:
-        return None
+from cursor_extraction import read_disk_kv_bubbles, workspace_info
 
 
 # ------------------------------------------------------------
 # Project metadata (from workspace DB)
 # ------------------------------------------------------------
 def extract_project(workspace_db: pathlib.Path) -> Dict[str, str]:
-    con = sqlite3.connect(workspace_db)
-    cur = con.cursor()
-    entries = _load_json(cur, "ItemTable", "history.entries") or []
-    con.close()
-
-    file_paths: List[str] = []
-    for entry in entries:
-        res = entry.get("editor", {}).get("resource", "")
-        if res.startswith("file:///"):
-            file_paths.append(res[len("file://"):])
-
-    if not file_paths:
+    project, _ = workspace_info(workspace_db)
+    if project.get("rootPath") == "(unknown)":
         return {}
-
-    root = os.path.commonprefix(file_paths).rstrip("/")
-    if "/" in root:
-        root = root[: root.rfind("/")]
-
-    return {"name": os.path.basename(root), "rootPath": "/" + root}
+    return project
 
 
 # ------------------------------------------------------------
 # Messages from session DB (cursorDiskKV)
 # ------------------------------------------------------------
-def _iter_bubble_messages(session_db: pathlib.Path) -> Iterable[Tuple[int, Dict[str, str]]]:
-    """Yield (rowid, msg_dict) for every bubble with non‑empty text."""
-    con = sqlite3.connect(session_db)
-    cur = con.cursor()
-    cur.execute("SELECT rowid, key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%'")
-    for rowid, key, val in cur.fetchall():
-        try:
-            bubble = json.loads(val)
-        except Exception:
-            continue
-        text = bubble.get("text", "").strip()
-        if not text:
-            continue
-        role = "user" if bubble.get("type") == 1 else "assistant"
-        yield rowid, {"role": role, "content": text}
-    con.close()
-
-
 def extract_messages(session_db: pathlib.Path) -> List[Dict[str, str]]:
-    # Sort by rowid (= insertion order)
-    msgs = [msg for _, msg in sorted(_iter_bubble_messages(session_db), key=lambda t: t[0])]
-    return msgs
+    # Bubbles come back in rowid (= insertion) order
+    return [{"role": role, "content": text}
+            for _, role, text, _, _ in read_disk_kv_bubbles(session_db)]
 
 
 # ------------------------------------------------------------
@@ -112,3 +67,25 @@ def load_chat_session(workspace_db: pathlib.Path, session_db: pathlib.Path) -> "
     project = extract_project(workspace_db)
     messages = extract_messages(session_db)
     return ChatSession(project, messages)
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Extract one Cursor chat session")
+    ap.add_argument("--workspace", type=pathlib.Path, required=True, help="workspace state.vscdb")
+    ap.add_argument("--session", type=pathlib.Path, required=True, help="session DB with cursorDiskKV")
+    ap.add_argument("--out", type=pathlib.Path, help="output JSON file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    text = json.dumps(load_chat_session(args.workspace, args.session).to_dict(),
+                      ensure_ascii=False, indent=2)
+    if args.out:
+        args.out.write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import { useEffect, useRef, useState } from 'react';
+
+// Wait this long after the last keystroke before querying
+const DEBOUNCE_MS = 150;
+
+// Search the loaded chats in a Web Worker (see chatSearch.worker.js) so that
+// typing never scans message text on the main thread. Chats are indexed as
+// they load; `generation` must change whenever `chats` is replaced rather
+// than appended to (a list whose indexed prefix changed is re-indexed from
+// scratch as well). Returns {results, pending}: results maps the id of every
+// matching chat to {count, message, ranges} and is null without a query.
+export const useChatSearch = (chats, generation, query) => {
+  const workerRef = useRef(null);
+  const indexed = useRef({ generation: null, count: 0, lastId: null });
+  const queryId = useRef(0);
+  const [results, setResults] = useState(null);
+  const [pending, setPending] = useState(false);
+
+  useEffect(() => {
+    const worker = new Worker(new URL('./chatSearch.worker.js', import.meta.url));
+    worker.onmessage = (event) => {
+      // Answers to superseded queries are dropped
+      if (event.data.id === queryId.current) {
+        setResults(event.data.matches);
+        setPending(false);
+      }
+    };
+    workerRef.current = worker;
+    indexed.current = { generation: null, count: 0, lastId: null };
+    return () => {
+      worker.terminate();
+      workerRef.current = null;
+    };
+  }, []);
+
+  // Index what was loaded since last time: a whole new list after a reload,
+  // otherwise just the appended page
+  useEffect(() => {
+    const worker = workerRef.current;
+    if (!worker) return;
+    let start = indexed.current.count;
+    if (indexed.current.generation !== generation || chats.length < start
+        || (start > 0 && chats[start - 1].session_id !== indexed.current.lastId)) {
+      worker.postMessage({ type: 'reset' });
+      start = 0;
+    }
+    if (chats.length > start) {
+      worker.postMessage({
+        type: 'add',
+        chats: chats.slice(start).map(chat => ({
+          id: chat.session_id,
+          project: chat.project?.name || 'Unknown Project',
+          texts: Array.isArray(chat.messages)
+            ? chat.messages.map(msg => (typeof msg.content === 'string' ? msg.content : ''))
+            : [],
+        })),
+      });
+    }
+    indexed.current = {
+      generation,
+      count: chats.length,
+      lastId: chats.length ? chats[chats.length - 1].session_id : null,
+    };
+  }, [chats, generation]);
+
+  // Query after typing pauses, and again whenever more chats were indexed;
+  // a new query cancels the one the worker may still be answering
+  useEffect(() => {
+    const trimmed = query.trim();
+    if (!trimmed) {
+      queryId.current += 1;
+      setResults(null);
+      setPending(false);
+      return undefined;
+    }
+    setPending(true);
+    const timer = setTimeout(() => {
+      queryId.current += 1;
+      workerRef.current.postMessage({ type: 'query', id: queryId.current, query: trimmed });
+    }, DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [query, chats, generation]);
+
+  return { results, pending };
+};
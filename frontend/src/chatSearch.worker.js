@@ -0,0 +1,148 @@
+/* eslint-disable no-restricted-globals */
+// Inverted index over chat messages, built and queried off the main thread.
+//
+// Messages from the page:
+//   {type: 'reset'}                                   drop the index
+//   {type: 'add', chats: [{id, project, texts}]}      index more chats
+//   {type: 'query', id, query}                        answer a query
+// Replies:
+//   {type: 'result', id, query, matches}
+//
+// A message matches when every word of the query starts a word of the
+// message (so typing "auth tok" finds "authentication token"); a chat
+// matches when one of its messages does or its project name contains the
+// query. `matches` maps each matching chat id to {count, message, ranges}:
+// how many of its messages match, the first one, and the [start, end)
+// character ranges in it to highlight.
+//
+// Queries are answered in slices, yielding to the message queue between
+// them, so a newer query cancels an older one still in progress.
+
+const WORD_RE = /[\p{L}\p{N}_]+/gu;
+const SLICE = 5000;  // docs handled between checks for a newer query
+
+let chats = [];            // {id, project, projectLower}
+let docs = [];             // per message: {chat, message, text}
+let postings = new Map();  // word -> array of doc numbers, ascending
+let words = null;          // sorted postings keys, rebuilt after adds
+let latestQuery = 0;
+
+const tokenize = (text) => text.toLowerCase().match(WORD_RE) || [];
+
+const addChats = (added) => {
+  for (const chat of added) {
+    const chatIndex = chats.length;
+    chats.push({ id: chat.id, projectLower: (chat.project || '').toLowerCase() });
+    chat.texts.forEach((text, message) => {
+      if (typeof text !== 'string' || !text) return;
+      const doc = docs.length;
+      docs.push({ chat: chatIndex, message, text });
+      for (const word of new Set(tokenize(text))) {
+        let list = postings.get(word);
+        if (!list) postings.set(word, (list = []));
+        list.push(doc);
+      }
+    });
+  }
+  words = null;
+};
+
+// All words starting with `prefix`, via binary search over the sorted words
+const wordsWithPrefix = (prefix) => {
+  if (words === null) words = Array.from(postings.keys()).sort();
+  let lo = 0;
+  let hi = words.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1;
+    if (words[mid] < prefix) lo = mid + 1;
+    else hi = mid;
+  }
+  const result = [];
+  for (let i = lo; i < words.length && words[i].startsWith(prefix); i++) result.push(words[i]);
+  return result;
+};
+
+// Let queued messages (a newer query) run; false if this query is stale
+const stillCurrent = (id) => new Promise((resolve) => {
+  setTimeout(() => resolve(id === latestQuery), 0);
+});
+
+const highlightRanges = (text, prefixes) => {
+  const ranges = [];
+  const lower = text.toLowerCase();
+  for (const match of lower.matchAll(WORD_RE)) {
+    const prefix = prefixes.find(p => match[0].startsWith(p));
+    if (prefix) ranges.push([match.index, match.index + prefix.length]);
+  }
+  return ranges;
+};
+
+const runQuery = async (id, query) => {
+  const queryLower = query.trim().toLowerCase();
+  const prefixes = Array.from(new Set(tokenize(queryLower)));
+  const matches = {};
+
+  chats.forEach((chat) => {
+    if (queryLower && chat.projectLower.includes(queryLower)) {
+      matches[chat.id] = { count: 0, message: null, ranges: [] };
+    }
+  });
+
+  if (prefixes.length > 0) {
+    // Docs containing a word with each prefix, smallest set first
+    const sets = [];
+    for (const prefix of prefixes) {
+      const docSet = new Set();
+      for (const word of wordsWithPrefix(prefix)) {
+        for (const doc of postings.get(word)) docSet.add(doc);
+      }
+      sets.push(docSet);
+      if (!(await stillCurrent(id))) return;
+    }
+    sets.sort((a, b) => a.size - b.size);
+    const [smallest, ...rest] = sets;
+
+    let handled = 0;
+    for (const doc of smallest) {
+      if (rest.every(set => set.has(doc))) {
+        const { chat, message, text } = docs[doc];
+        const chatId = chats[chat].id;
+        const entry = matches[chatId];
+        if (!entry || entry.message === null) {
+          matches[chatId] = {
+            count: 1,
+            message,
+            ranges: highlightRanges(text, prefixes),
+          };
+        } else {
+          entry.count += 1;
+          // Docs are numbered in message order, but sets iterate by insertion
+          if (message < entry.message) {
+            entry.message = message;
+            entry.ranges = highlightRanges(text, prefixes);
+          }
+        }
+      }
+      if (++handled % SLICE === 0 && !(await stillCurrent(id))) return;
+    }
+  }
+
+  if (id === latestQuery) {
+    self.postMessage({ type: 'result', id, query, matches });
+  }
+};
+
+self.onmessage = (event) => {
+  const data = event.data;
+  if (data.type === 'reset') {
+    chats = [];
+    docs = [];
+    postings = new Map();
+    words = null;
+  } else if (data.type === 'add') {
+    addChats(data.chats);
+  } else if (data.type === 'query') {
+    latestQuery = data.id;
+    runQuery(data.id, data.query);
+  }
+};
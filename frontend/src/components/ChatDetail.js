@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import axios from 'axios';
 import ReactMarkdown from 'react-markdown';
@@ -37,6 +37,47 @@ import DataObjectIcon from '@mui/icons-material/DataObject';
 import FileDownloadIcon from '@mui/icons-material/FileDownload';
 import WarningIcon from '@mui/icons-material/Warning';
 import { colors } from '../App';
+import VirtualList from './VirtualList';
+import { getApi } from '../wireFormat';
+
+// Messages fetched per request; later pages load as the list scrolls to them,
+// so long agent sessions paint after the first page instead of the whole chat
+const MESSAGE_PAGE_SIZE = 100;
+
+// Markdown is only rendered once a message scrolls into view. Until then (for
+// instance in the rows VirtualList renders ahead of the viewport) the text is
+// shown as-is, which is far cheaper and takes up about as much room.
+const MessageContent = React.memo(({ content }) => {
+  const ref = useRef(null);
+  const [onScreen, setOnScreen] = useState(false);
+
+  useEffect(() => {
+    if (onScreen) return undefined;
+    if (typeof IntersectionObserver === 'undefined') {
+      setOnScreen(true);
+      return undefined;
+    }
+    const observer = new IntersectionObserver((entries) => {
+      if (entries.some(entry => entry.isIntersecting)) setOnScreen(true);
+    });
+    observer.observe(ref.current);
+    return () => observer.disconnect();
+  }, [onScreen]);
+
+  return (
+    <div ref={ref}>
+      {onScreen ? (
+        <ReactMarkdown>
+          {content}
+        </ReactMarkdown>
+      ) : (
+        <Typography component="div" sx={{ whiteSpace: 'pre-wrap', wordBreak: 'break-word', my: 2 }}>
+          {content}
+        </Typography>
+      )}
+    </div>
+  );
+});
 
 const ChatDetail = () => {
   const { sessionId } = useParams();
@@ -47,12 +88,21 @@ const ChatDetail = () => {
   const [formatDialogOpen, setFormatDialogOpen] = useState(false);
   const [exportFormat, setExportFormat] = useState('html');
   const [dontShowExportWarning, setDontShowExportWarning] = useState(false);
+  const [nextOffset, setNextOffset] = useState(null);
+  // The chat whose pages are being loaded; pages of a chat navigated away from are dropped
+  const currentSession = useRef(sessionId);
+  const loadingMore = useRef(false);
 
   useEffect(() => {
+    currentSession.current = sessionId;
     const fetchChat = async () => {
       try {
-        const response = await axios.get(`/api/chat/${sessionId}`);
+        const response = await getApi(`/api/chat/${sessionId}`, {
+          params: { offset: 0, limit: MESSAGE_PAGE_SIZE },
+        });
+        if (currentSession.current !== sessionId) return;
         setChat(response.data);
+        setNextOffset(response.data.next);
         setLoading(false);
       } catch (err) {
         setError(err.message);
@@ -158,6 +208,35 @@ const ChatDetail = () => {
     }
   };
 
+  // Append the next page of messages once the list reaches the last loaded one
+  const loadMoreMessages = useCallback(async () => {
+    if (nextOffset === null || loadingMore.current) return;
+    loadingMore.current = true;
+    const session = sessionId;
+    try {
+      const response = await getApi(`/api/chat/${session}`, {
+        params: { offset: nextOffset, limit: MESSAGE_PAGE_SIZE },
+      });
+      if (currentSession.current !== session) return;
+      setChat(prev => ({ ...prev, messages: [...prev.messages, ...response.data.messages] }));
+      setNextOffset(response.data.next);
+    } catch (err) {
+      console.error('Error loading more messages:', err);
+    } finally {
+      loadingMore.current = false;
+    }
+  }, [nextOffset, sessionId]);
+
+  // Row callbacks of the virtualized message list; keys include the session
+  // so measured heights never carry over to another chat
+  const getMessageKey = useCallback((index) => `${sessionId}:${index}`, [sessionId]);
+  const estimateMessageSize = useCallback((index) => {
+    const content = chat?.messages?.[index]?.content;
+    const length = typeof content === 'string' ? content.length : 0;
+    // Avatar row and padding, plus a line for every ~100 characters
+    return 110 + Math.ceil(length / 100) * 24;
+  }, [chat]);
+
   if (loading) {
     return (
       <Container sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '70vh' }}>
@@ -204,6 +283,79 @@ const ChatDetail = () => {
   const messages = Array.isArray(chat.messages) ? chat.messages : [];
   const projectName = chat.project?.name || 'Unknown Project';
 
+  const renderMessage = (index) => {
+    const message = messages[index];
+    return (
+      <Box sx={{ mb: 3.5 }}>
+        <Box sx={{ display: 'flex', alignItems: 'center', mb: 1.5 }}>
+          <Avatar
+            sx={{
+              bgcolor: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
+              width: 32,
+              height: 32,
+              mr: 1.5,
+              boxShadow: '0 2px 4px rgba(0,0,0,0.1)'
+            }}
+          >
+            {message.role === 'user' ? <PersonIcon /> : <SmartToyIcon />}
+          </Avatar>
+          <Typography variant="subtitle1" fontWeight="600">
+            {message.role === 'user' ? 'You' : 'Cursor Assistant'}
+          </Typography>
+        </Box>
+        
+        <Paper 
+          elevation={1}
+          sx={{ 
+            p: 2.5, 
+            ml: message.role === 'user' ? 0 : 5,
+            mr: message.role === 'assistant' ? 0 : 5,
+            backgroundColor:alpha(colors.highlightColor, 0.04),
+            borderLeft: '4px solid',
+            borderColor: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
+            borderRadius: 2
+          }}
+        >
+          <Box sx={{ 
+            '& pre': { 
+              maxWidth: '100%', 
+              overflowX: 'auto',
+              backgroundColor: message.role === 'user' 
+                ? alpha(colors.primary.main, 0.07) 
+                : colors.highlightColor,
+              borderRadius: 1,
+              p: 2
+            },
+            '& code': { 
+              display: 'inline-block', 
+              maxWidth: '100%', 
+              overflowX: 'auto',
+              backgroundColor: message.role === 'user' 
+                ? alpha(colors.primary.main, 0.07) 
+                : colors.highlightColor,
+              borderRadius: 0.5,
+              px: 0.8,
+              py: 0.2
+            },
+            '& img': { maxWidth: '100%' },
+            '& ul, & ol': { pl: 3 },
+            '& a': { 
+              color: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
+              textDecoration: 'none',
+              '&:hover': { textDecoration: 'none' }
+            }
+          }}>
+            {typeof message.content === 'string' ? (
+              <MessageContent content={message.content} />
+            ) : (
+              <Typography>Content unavailable</Typography>
+            )}
+          </Box>
+        </Paper>
+      </Box>
+    );
+  };
+
   return (
     <Container sx={{ mb: 6 }}>
       {/* Format Selection Dialog */}
@@ -403,77 +555,21 @@ const ChatDetail = () => {
         </Paper>
       ) : (
         <Box sx={{ mb: 4 }}>
-          {messages.map((message, index) => (
-            <Box key={index} sx={{ mb: 3.5 }}>
-              <Box sx={{ display: 'flex', alignItems: 'center', mb: 1.5 }}>
-                <Avatar
-                  sx={{
-                    bgcolor: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
-                    width: 32,
-                    height: 32,
-                    mr: 1.5,
-                    boxShadow: '0 2px 4px rgba(0,0,0,0.1)'
-                  }}
-                >
-                  {message.role === 'user' ? <PersonIcon /> : <SmartToyIcon />}
-                </Avatar>
-                <Typography variant="subtitle1" fontWeight="600">
-                  {message.role === 'user' ? 'You' : 'Cursor Assistant'}
-                </Typography>
-              </Box>
-              
-              <Paper 
-                elevation={1}
-                sx={{ 
-                  p: 2.5, 
-                  ml: message.role === 'user' ? 0 : 5,
-                  mr: message.role === 'assistant' ? 0 : 5,
-                  backgroundColor:alpha(colors.highlightColor, 0.04),
-                  borderLeft: '4px solid',
-                  borderColor: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
-                  borderRadius: 2
-                }}
-              >
-                <Box sx={{ 
-                  '& pre': { 
-                    maxWidth: '100%', 
-                    overflowX: 'auto',
-                    backgroundColor: message.role === 'user' 
-                      ? alpha(colors.primary.main, 0.07) 
-                      : colors.highlightColor,
-                    borderRadius: 1,
-                    p: 2
-                  },
-                  '& code': { 
-                    display: 'inline-block', 
-                    maxWidth: '100%', 
-                    overflowX: 'auto',
-                    backgroundColor: message.role === 'user' 
-                      ? alpha(colors.primary.main, 0.07) 
-                      : colors.highlightColor,
-                    borderRadius: 0.5,
-                    px: 0.8,
-                    py: 0.2
-                  },
-                  '& img': { maxWidth: '100%' },
-                  '& ul, & ol': { pl: 3 },
-                  '& a': { 
-                    color: message.role === 'user' ? colors.highlightColor : colors.secondary.main,
-                    textDecoration: 'none',
-                    '&:hover': { textDecoration: 'none' }
-                  }
-                }}>
-                  {typeof message.content === 'string' ? (
-                    <ReactMarkdown>
-                      {message.content}
-                    </ReactMarkdown>
-                  ) : (
-                    <Typography>Content unavailable</Typography>
-                  )}
-                </Box>
-              </Paper>
+          <VirtualList
+            count={messages.length}
+            getKey={getMessageKey}
+            estimateSize={estimateMessageSize}
+            renderRow={renderMessage}
+            onEndReached={loadMoreMessages}
+          />
+          {nextOffset !== null && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', gap: 2, py: 3 }}>
+              <CircularProgress size={20} sx={{ color: colors.highlightColor }} />
+              <Typography variant="body2" color="text.secondary">
+                Loaded {messages.length} of {chat.message_count} messages
+              </Typography>
             </Box>
-          ))}
+          )}
         </Box>
       )}
     </Container>
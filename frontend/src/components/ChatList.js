@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { Link } from 'react-router-dom';
 import axios from 'axios';
 import {
@@ -14,7 +14,6 @@ import {
   Paper,
   Alert,
   Button,
-  Collapse,
   IconButton,
   alpha,
   TextField,
@@ -29,6 +28,8 @@ import {
   Checkbox,
   DialogContentText,
   Switch,
+  useMediaQuery,
+  useTheme,
 } from '@mui/material';
 import FolderIcon from '@mui/icons-material/Folder';
 import CalendarTodayIcon from '@mui/icons-material/CalendarToday';
@@ -42,6 +43,37 @@ import ClearIcon from '@mui/icons-material/Clear';
 import FileDownloadIcon from '@mui/icons-material/FileDownload';
 import WarningIcon from '@mui/icons-material/Warning';
 import { colors } from '../App';
+import VirtualList from './VirtualList';
+import { useChatSearch } from '../chatSearch';
+import { getApi } from '../wireFormat';
+
+// Chats fetched per request; further pages load as the list is scrolled
+const PAGE_SIZE = 100;
+
+// A snippet of `text` around the first search match, with every match in it
+// marked
+const highlightSnippet = (text, ranges) => {
+  const start = Math.max(0, ranges[0][0] - 40);
+  const end = Math.min(text.length, start + 160);
+  const parts = [start > 0 ? '...' : ''];
+  let pos = start;
+  ranges.forEach(([from, to], i) => {
+    if (from < pos || to > end) return;
+    parts.push(text.slice(pos, from));
+    parts.push(
+      <Box
+        component="mark"
+        key={i}
+        sx={{ backgroundColor: alpha(colors.highlightColor, 0.5), color: 'inherit', borderRadius: 0.5 }}
+      >
+        {text.slice(from, to)}
+      </Box>
+    );
+    pos = to;
+  });
+  parts.push(text.slice(pos, end) + (end < text.length ? '...' : ''));
+  return parts;
+};
 
 const ChatList = () => {
   const [chats, setChats] = useState([]);
@@ -54,12 +86,25 @@ const ChatList = () => {
   const [exportModalOpen, setExportModalOpen] = useState(false);
   const [dontShowExportWarning, setDontShowExportWarning] = useState(false);
   const [currentExportSession, setCurrentExportSession] = useState(null);
+  // null while the server has only served the newest chats and not counted them all
+  const [totalChats, setTotalChats] = useState(0);
+  const [nextOffset, setNextOffset] = useState(null);
+  // Bumped by every full reload so pages of an older load are dropped
+  const loadGeneration = useRef(0);
+  // The load `chats` came from, as state so the search index sees every change
+  const [chatsGeneration, setChatsGeneration] = useState(0);
+  const loadingMore = useRef(false);
+  const demoCount = useRef(0);
+  const { results: searchResults, pending: searchPending } =
+    useChatSearch(chats, chatsGeneration, searchQuery);
 
   const fetchChats = async () => {
     setLoading(true);
+    const generation = ++loadGeneration.current;
     try {
-      const response = await axios.get('/api/chats');
-      const chatData = response.data;
+      const response = await getApi('/api/chats', { params: { offset: 0, limit: PAGE_SIZE } });
+      if (generation !== loadGeneration.current) return;
+      const chatData = response.data.chats;
       
       // Check if these are sample chats (demo data)
       const isSampleData = chatData.length > 0 && chatData[0].session_id?.startsWith('sample');
@@ -98,6 +143,10 @@ const ChatList = () => {
       const combinedData = [...demoProjects, ...chatData];
       
       setChats(combinedData);
+      setChatsGeneration(generation);
+      demoCount.current = demoProjects.length;
+      setTotalChats(response.data.total === null ? null : demoProjects.length + response.data.total);
+      setNextOffset(response.data.next);
       setLoading(false);
     } catch (err) {
       setError(err.message);
@@ -105,6 +154,35 @@ const ChatList = () => {
     }
   };
 
+  // Append the next page of chats (skipping any already listed, in case newer
+  // chats shifted the server's list since the previous page)
+  const loadMoreChats = useCallback(async () => {
+    if (nextOffset === null || loadingMore.current) return;
+    loadingMore.current = true;
+    const generation = loadGeneration.current;
+    try {
+      const response = await getApi('/api/chats', { params: { offset: nextOffset, limit: PAGE_SIZE } });
+      if (generation !== loadGeneration.current) return;
+      setChats(prev => {
+        const seen = new Set(prev.map(chat => chat.session_id));
+        return [...prev, ...response.data.chats.filter(chat => !seen.has(chat.session_id))];
+      });
+      if (response.data.total !== null) setTotalChats(demoCount.current + response.data.total);
+      setNextOffset(response.data.next);
+    } catch (err) {
+      console.error('Error loading more chats:', err);
+    } finally {
+      loadingMore.current = false;
+    }
+  }, [nextOffset]);
+
+  // Searching needs every chat, so keep loading pages while there is a query
+  useEffect(() => {
+    if (searchQuery.trim() && nextOffset !== null) {
+      loadMoreChats();
+    }
+  }, [searchQuery, nextOffset, loadMoreChats]);
+
   // Toggle demo chats visibility
   const toggleDemoChats = () => {
     const newValue = !showDemoChats;
@@ -143,59 +221,29 @@ const ChatList = () => {
     }));
   };
 
-  // Filter chats based on search query
+  // Group chats by project, keeping only search matches while there is a
+  // query (matching happens in the search worker, see useChatSearch)
   const filteredChatsByProject = () => {
-    if (!searchQuery.trim()) {
-      return chats.reduce((acc, chat) => {
-        const projectName = chat.project?.name || 'Unknown Project';
-        
-        if (!acc[projectName]) {
-          acc[projectName] = {
-            name: projectName,
-            path: chat.project?.rootPath || 'Unknown',
-            chats: []
-          };
-        }
-        
-        if (chat.project?.rootPath && 
-            acc[projectName].path === 'Unknown') {
-          acc[projectName].path = chat.project.rootPath;
-        }
-        
-        acc[projectName].chats.push(chat);
-        return acc;
-      }, {});
-    }
-
-    const query = searchQuery.toLowerCase();
     return chats.reduce((acc, chat) => {
+      if (searchResults && !searchResults[chat.session_id]) {
+        return acc;
+      }
       const projectName = chat.project?.name || 'Unknown Project';
       
-      // Check if project name matches
-      const projectMatches = projectName.toLowerCase().includes(query);
-      
-      // Check if any message content matches
-      const contentMatches = Array.isArray(chat.messages) && chat.messages.some(msg => 
-        typeof msg.content === 'string' && msg.content.toLowerCase().includes(query)
-      );
+      if (!acc[projectName]) {
+        acc[projectName] = {
+          name: projectName,
+          path: chat.project?.rootPath || 'Unknown',
+          chats: []
+        };
+      }
       
-      if (projectMatches || contentMatches) {
-        if (!acc[projectName]) {
-          acc[projectName] = {
-            name: projectName,
-            path: chat.project?.rootPath || 'Unknown',
-            chats: []
-          };
-        }
-        
-        if (chat.project?.rootPath && 
-            acc[projectName].path === 'Unknown') {
-          acc[projectName].path = chat.project.rootPath;
-        }
-        
-        acc[projectName].chats.push(chat);
+      if (chat.project?.rootPath && 
+          acc[projectName].path === 'Unknown') {
+        acc[projectName].path = chat.project.rootPath;
       }
       
+      acc[projectName].chats.push(chat);
       return acc;
     }, {});
   };
@@ -316,6 +364,269 @@ const ChatList = () => {
     }
   };
 
+  // Project groups only change with the data or the query, not on scroll
+  const chatsByProject = useMemo(filteredChatsByProject, [chats, searchResults]); // eslint-disable-line react-hooks/exhaustive-deps
+
+  // Cards per line, following the xs=12 / sm=6 / md=4 grid
+  const theme = useTheme();
+  const isMd = useMediaQuery(theme.breakpoints.up('md'));
+  const isSm = useMediaQuery(theme.breakpoints.up('sm'));
+  const columns = isMd ? 3 : isSm ? 2 : 1;
+
+  // The list as VirtualList rows: one per project header and one per line of
+  // chat cards of each expanded project
+  const rows = useMemo(() => {
+    const result = [];
+    Object.entries(chatsByProject).forEach(([projectName, projectData]) => {
+      const expanded = expandedProjects[projectName] || false;
+      result.push({ key: `project:${projectName}`, projectName, projectData, expanded });
+      if (!expanded) return;
+      for (let i = 0; i < projectData.chats.length; i += columns) {
+        result.push({
+          key: `chats:${projectName}:${i}`,
+          chats: projectData.chats.slice(i, i + columns),
+          first: i,
+          last: i + columns >= projectData.chats.length,
+        });
+      }
+    });
+    return result;
+  }, [chatsByProject, expandedProjects, columns]);
+
+  const getRowKey = useCallback((index) => rows[index].key, [rows]);
+  const estimateRowSize = useCallback((index) => (rows[index].chats ? 260 : 110), [rows]);
+
+  const renderProjectHeader = (projectName, projectData) => (
+    <Paper 
+      sx={{ 
+        p: 0, 
+        mb: 2, 
+        overflow: 'hidden',
+        boxShadow: '0 4px 12px rgba(0,0,0,0.08)',
+        transition: 'all 0.3s ease-in-out',
+        '&:hover': {
+          boxShadow: '0 8px 24px rgba(0,0,0,0.12)',
+        }
+      }}
+    >
+      <Box 
+        sx={{ 
+          background: colors.background.paper,
+          borderBottom: '1px solid',
+          borderColor: alpha(colors.text.secondary, 0.1),
+          color: colors.text.primary,
+          p: 2,
+          cursor: 'pointer',
+          '&:hover': {
+            backgroundColor: alpha(colors.highlightColor, 0.02)
+          }
+        }}
+        onClick={() => toggleProjectExpand(projectName)}
+      >
+        <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
+          <Box sx={{ display: 'flex', alignItems: 'center' }}>
+            <FolderIcon sx={{ mr: 1.5, fontSize: 28, color: colors.text.secondary }} />
+            <Typography variant="h6" sx={{ fontWeight: 600 }}>
+              {projectData.name}
+            </Typography>
+            <Chip 
+              label={`${projectData.chats.length} ${projectData.chats.length === 1 ? 'chat' : 'chats'}`} 
+              size="small" 
+              sx={{ 
+                ml: 2,
+                fontWeight: 500,
+                backgroundColor: colors.highlightColor,
+                color: colors.text.primary,
+                '& .MuiChip-label': {
+                  px: 1.5
+                }
+              }} 
+            />
+          </Box>
+          <IconButton 
+            aria-expanded={expandedProjects[projectName]}
+            aria-label="show more"
+            sx={{ 
+              color: colors.text.primary,
+              bgcolor: colors.highlightColor,
+              '&:hover': {
+                bgcolor: alpha(colors.highlightColor, 0.8)
+              }
+            }}
+            onClick={(e) => {
+              // Prevent the click from reaching the parent Box
+              e.stopPropagation();
+              toggleProjectExpand(projectName);
+            }}
+          >
+            {expandedProjects[projectName] ? <ExpandLessIcon /> : <ExpandMoreIcon />}
+          </IconButton>
+        </Box>
+        <Typography variant="body2" sx={{ color: colors.text.secondary, mt: 0.5 }}>
+          {projectData.path}
+        </Typography>
+      </Box>
+    </Paper>
+  );
+
+  const renderChatCard = (chat, index) => {
+    // The first matching message of a search hit, shown instead of the first message
+    const hit = searchResults && searchResults[chat.session_id];
+    const matched = hit && hit.message !== null && hit.ranges.length > 0
+      ? chat.messages[hit.message]
+      : null;
+
+    // Format the date safely
+    let dateDisplay = 'Unknown date';
+    try {
+      if (chat.date) {
+        const dateObj = new Date(chat.date * 1000);
+        // Check if date is valid
+        if (!isNaN(dateObj.getTime())) {
+          dateDisplay = dateObj.toLocaleString();
+        }
+      }
+    } catch (err) {
+      console.error('Error formatting date:', err);
+    }
+
+    return (
+      <Grid item xs={12} sm={6} md={4} key={chat.session_id || `chat-${index}`}>
+        <Card 
+          component={Link} 
+          to={`/chat/${chat.session_id}`}
+          sx={{ 
+            height: '100%', 
+            display: 'flex', 
+            flexDirection: 'column',
+            transition: 'all 0.3s cubic-bezier(.17,.67,.83,.67)',
+            textDecoration: 'none',
+            borderTop: '1px solid',
+            borderColor: alpha(colors.text.secondary, 0.1),
+            '&:hover': {
+              transform: 'translateY(-8px)',
+              boxShadow: '0 20px 25px -5px rgba(0,0,0,0.1), 0 10px 10px -5px rgba(0,0,0,0.04)',
+            }
+          }}
+        >
+          <CardContent>
+            <Box sx={{ 
+              display: 'flex', 
+              alignItems: 'center', 
+              mb: 1.5,
+              justifyContent: 'space-between'
+            }}>
+              <Box sx={{ display: 'flex', alignItems: 'center' }}>
+                <CalendarTodayIcon fontSize="small" sx={{ mr: 1, color: 'text.secondary' }} />
+                <Typography variant="body2" color="text.secondary">
+                  {dateDisplay}
+                </Typography>
+              </Box>
+            </Box>
+
+            <Divider sx={{ my: 1.5 }} />
+
+            <Box sx={{ display: 'flex', alignItems: 'center', mb: 1.5 }}>
+              <MessageIcon fontSize="small" sx={{ mr: 1, color: colors.text.secondary }} />
+              <Typography variant="body2" fontWeight="500">
+                {Array.isArray(chat.messages) ? chat.messages.length : 0} messages
+                {hit && hit.count > 0 && ` · ${hit.count} matching`}
+              </Typography>
+            </Box>
+
+            {chat.db_path && (
+              <Typography 
+                variant="caption" 
+                color="text.secondary"
+                sx={{ 
+                  display: 'block',
+                  mb: 1.5,
+                  overflow: 'hidden',
+                  textOverflow: 'ellipsis',
+                  whiteSpace: 'nowrap'
+                }}
+              >
+                DB: {chat.db_path.split('/').slice(-2).join('/')}
+              </Typography>
+            )}
+
+            {(matched || (Array.isArray(chat.messages) && chat.messages[0] && chat.messages[0].content)) && (
+              <Box sx={{ 
+                mt: 2, 
+                p: 1.5, 
+                backgroundColor: alpha(colors.highlightColor, 0.1),
+                borderRadius: 2,
+                border: '1px solid',
+                borderColor: alpha(colors.text.secondary, 0.05)
+              }}>
+                <Typography 
+                  variant="body2" 
+                  sx={{ 
+                    overflow: 'hidden',
+                    textOverflow: 'ellipsis',
+                    display: '-webkit-box',
+                    WebkitLineClamp: 2,
+                    WebkitBoxOrient: 'vertical',
+                    color: 'text.primary',
+                    fontWeight: 400
+                  }}
+                >
+                  {matched
+                    ? highlightSnippet(matched.content, hit.ranges)
+                    : typeof chat.messages[0].content === 'string' 
+                    ? chat.messages[0].content.substring(0, 100) + (chat.messages[0].content.length > 100 ? '...' : '')
+                    : 'Content unavailable'}
+                </Typography>
+              </Box>
+            )}
+          </CardContent>
+          <CardActions sx={{ mt: 'auto', pt: 0 }}>
+            <Tooltip title="Export as HTML (Warning: Check for sensitive data)">
+              <IconButton 
+                size="small" 
+                onClick={(e) => handleExport(e, chat.session_id)}
+                sx={{ 
+                  ml: 'auto',
+                  position: 'relative',
+                  '&::after': dontShowExportWarning ? null : {
+                    content: '""',
+                    position: 'absolute',
+                    width: '6px',
+                    height: '6px',
+                    backgroundColor: 'warning.main',
+                    borderRadius: '50%',
+                    top: '2px',
+                    right: '2px'
+                  }
+                }}
+              >
+                <FileDownloadIcon fontSize="small" />
+              </IconButton>
+            </Tooltip>
+          </CardActions>
+        </Card>
+      </Grid>
+    );
+  };
+
+  const renderRow = (index) => {
+    const row = rows[index];
+    if (!row.chats) {
+      return (
+        <Box sx={{ pb: row.expanded ? 0 : 4 }}>
+          {renderProjectHeader(row.projectName, row.projectData)}
+        </Box>
+      );
+    }
+    return (
+      <Box sx={{ pb: row.last ? 4 : 3 }}>
+        <Grid container spacing={3}>
+          {row.chats.map((chat, i) => renderChatCard(chat, row.first + i))}
+        </Grid>
+      </Box>
+    );
+  };
+
   if (loading) {
     return (
       <Container sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '70vh' }}>
@@ -334,8 +645,6 @@ const ChatList = () => {
     );
   }
 
-  const chatsByProject = filteredChatsByProject();
-
   return (
     <Container maxWidth="lg" sx={{ mt: 4, mb: 4 }}>
       {/* No need to show error again since we have the conditional return above */}
@@ -429,6 +738,9 @@ const ChatList = () => {
           ),
           endAdornment: searchQuery && (
             <InputAdornment position="end">
+              {searchPending && (
+                <CircularProgress size={18} sx={{ mr: 1, color: colors.highlightColor }} />
+              )}
               <IconButton
                 size="small"
                 aria-label="clear search"
@@ -471,7 +783,7 @@ const ChatList = () => {
         </Alert>
       )}
       
-      {Object.keys(chatsByProject).length === 0 ? (
+      {rows.length === 0 && nextOffset === null ? (
         <Paper 
           sx={{ 
             p: 4, 
@@ -523,217 +835,24 @@ const ChatList = () => {
           )}
         </Paper>
       ) : (
-        Object.entries(chatsByProject).map(([projectName, projectData]) => {
-          return (
-            <Box key={projectName} sx={{ mb: 4 }}>
-              <Paper 
-                sx={{ 
-                  p: 0, 
-                  mb: 2, 
-                  overflow: 'hidden',
-                  boxShadow: '0 4px 12px rgba(0,0,0,0.08)',
-                  transition: 'all 0.3s ease-in-out',
-                  '&:hover': {
-                    boxShadow: '0 8px 24px rgba(0,0,0,0.12)',
-                  }
-                }}
-              >
-                <Box 
-                  sx={{ 
-                    background: colors.background.paper,
-                    borderBottom: '1px solid',
-                    borderColor: alpha(colors.text.secondary, 0.1),
-                    color: colors.text.primary,
-                    p: 2,
-                    cursor: 'pointer',
-                    '&:hover': {
-                      backgroundColor: alpha(colors.highlightColor, 0.02)
-                    }
-                  }}
-                  onClick={() => toggleProjectExpand(projectName)}
-                >
-                  <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
-                    <Box sx={{ display: 'flex', alignItems: 'center' }}>
-                      <FolderIcon sx={{ mr: 1.5, fontSize: 28, color: colors.text.secondary }} />
-                      <Typography variant="h6" sx={{ fontWeight: 600 }}>
-                        {projectData.name}
-                      </Typography>
-                      <Chip 
-                        label={`${projectData.chats.length} ${projectData.chats.length === 1 ? 'chat' : 'chats'}`} 
-                        size="small" 
-                        sx={{ 
-                          ml: 2,
-                          fontWeight: 500,
-                          backgroundColor: colors.highlightColor,
-                          color: colors.text.primary,
-                          '& .MuiChip-label': {
-                            px: 1.5
-                          }
-                        }} 
-                      />
-                    </Box>
-                    <IconButton 
-                      aria-expanded={expandedProjects[projectName]}
-                      aria-label="show more"
-                      sx={{ 
-                        color: colors.text.primary,
-                        bgcolor: colors.highlightColor,
-                        '&:hover': {
-                          bgcolor: alpha(colors.highlightColor, 0.8)
-                        }
-                      }}
-                      onClick={(e) => {
-                        // Prevent the click from reaching the parent Box
-                        e.stopPropagation();
-                        toggleProjectExpand(projectName);
-                      }}
-                    >
-                      {expandedProjects[projectName] ? <ExpandLessIcon /> : <ExpandMoreIcon />}
-                    </IconButton>
-                  </Box>
-                  <Typography variant="body2" sx={{ color: colors.text.secondary, mt: 0.5 }}>
-                    {projectData.path}
-                  </Typography>
-                </Box>
-              </Paper>
-              
-              <Collapse in={expandedProjects[projectName] || false}>
-                <Grid container spacing={3}>
-                  {projectData.chats.map((chat, index) => {
-                    // Format the date safely
-                    let dateDisplay = 'Unknown date';
-                    try {
-                      if (chat.date) {
-                        const dateObj = new Date(chat.date * 1000);
-                        // Check if date is valid
-                        if (!isNaN(dateObj.getTime())) {
-                          dateDisplay = dateObj.toLocaleString();
-                        }
-                      }
-                    } catch (err) {
-                      console.error('Error formatting date:', err);
-                    }
-
-                    return (
-                      <Grid item xs={12} sm={6} md={4} key={chat.session_id || `chat-${index}`}>
-                        <Card 
-                          component={Link} 
-                          to={`/chat/${chat.session_id}`}
-                          sx={{ 
-                            height: '100%', 
-                            display: 'flex', 
-                            flexDirection: 'column',
-                            transition: 'all 0.3s cubic-bezier(.17,.67,.83,.67)',
-                            textDecoration: 'none',
-                            borderTop: '1px solid',
-                            borderColor: alpha(colors.text.secondary, 0.1),
-                            '&:hover': {
-                              transform: 'translateY(-8px)',
-                              boxShadow: '0 20px 25px -5px rgba(0,0,0,0.1), 0 10px 10px -5px rgba(0,0,0,0.04)',
-                            }
-                          }}
-                        >
-                          <CardContent>
-                            <Box sx={{ 
-                              display: 'flex', 
-                              alignItems: 'center', 
-                              mb: 1.5,
-                              justifyContent: 'space-between'
-                            }}>
-                              <Box sx={{ display: 'flex', alignItems: 'center' }}>
-                                <CalendarTodayIcon fontSize="small" sx={{ mr: 1, color: 'text.secondary' }} />
-                                <Typography variant="body2" color="text.secondary">
-                                  {dateDisplay}
-                                </Typography>
-                              </Box>
-                            </Box>
-                            
-                            <Divider sx={{ my: 1.5 }} />
-                            
-                            <Box sx={{ display: 'flex', alignItems: 'center', mb: 1.5 }}>
-                              <MessageIcon fontSize="small" sx={{ mr: 1, color: colors.text.secondary }} />
-                              <Typography variant="body2" fontWeight="500">
-                                {Array.isArray(chat.messages) ? chat.messages.length : 0} messages
-                              </Typography>
-                            </Box>
-                            
-                            {chat.db_path && (
-                              <Typography 
-                                variant="caption" 
-                                color="text.secondary"
-                                sx={{ 
-                                  display: 'block',
-                                  mb: 1.5,
-                                  overflow: 'hidden',
-                                  textOverflow: 'ellipsis',
-                                  whiteSpace: 'nowrap'
-                                }}
-                              >
-                                DB: {chat.db_path.split('/').slice(-2).join('/')}
-                              </Typography>
-                            )}
-                            
-                            {Array.isArray(chat.messages) && chat.messages[0] && chat.messages[0].content && (
-                              <Box sx={{ 
-                                mt: 2, 
-                                p: 1.5, 
-                                backgroundColor: alpha(colors.highlightColor, 0.1),
-                                borderRadius: 2,
-                                border: '1px solid',
-                                borderColor: alpha(colors.text.secondary, 0.05)
-                              }}>
-                                <Typography 
-                                  variant="body2" 
-                                  sx={{ 
-                                    overflow: 'hidden',
-                                    textOverflow: 'ellipsis',
-                                    display: '-webkit-box',
-                                    WebkitLineClamp: 2,
-                                    WebkitBoxOrient: 'vertical',
-                                    color: 'text.primary',
-                                    fontWeight: 400
-                                  }}
-                                >
-                                  {typeof chat.messages[0].content === 'string' 
-                                    ? chat.messages[0].content.substring(0, 100) + (chat.messages[0].content.length > 100 ? '...' : '')
-                                    : 'Content unavailable'}
-                                </Typography>
-                              </Box>
-                            )}
-                          </CardContent>
-                          <CardActions sx={{ mt: 'auto', pt: 0 }}>
-                            <Tooltip title="Export as HTML (Warning: Check for sensitive data)">
-                              <IconButton 
-                                size="small" 
-                                onClick={(e) => handleExport(e, chat.session_id)}
-                                sx={{ 
-                                  ml: 'auto',
-                                  position: 'relative',
-                                  '&::after': dontShowExportWarning ? null : {
-                                    content: '""',
-                                    position: 'absolute',
-                                    width: '6px',
-                                    height: '6px',
-                                    backgroundColor: 'warning.main',
-                                    borderRadius: '50%',
-                                    top: '2px',
-                                    right: '2px'
-                                  }
-                                }}
-                              >
-                                <FileDownloadIcon fontSize="small" />
-                              </IconButton>
-                            </Tooltip>
-                          </CardActions>
-                        </Card>
-                      </Grid>
-                    );
-                  })}
-                </Grid>
-              </Collapse>
-            </Box>
-          );
-        })
+        <VirtualList
+          count={rows.length}
+          getKey={getRowKey}
+          estimateSize={estimateRowSize}
+          renderRow={renderRow}
+          onEndReached={loadMoreChats}
+        />
+      )}
+
+      {nextOffset !== null && (
+        <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', gap: 2, py: 3 }}>
+          <CircularProgress size={20} sx={{ color: colors.highlightColor }} />
+          <Typography variant="body2" color="text.secondary">
+            {totalChats === null
+              ? `Loaded the ${chats.length} most recent chats`
+              : `Loaded ${chats.length} of ${totalChats} chats`}
+          </Typography>
+        </Box>
       )}
     </Container>
   );
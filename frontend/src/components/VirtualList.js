@@ -0,0 +1,138 @@
+import React, { useCallback, useEffect, useMemo, useRef, useState } from 'react';
+
+// Renders only the rows of a long list that are on or near the screen. The
+// list scrolls with the page (no inner scroll box), rows may have any height:
+// each row is measured once rendered and estimated until then. The rows above
+// and below the rendered window are replaced by two spacers.
+const VirtualList = ({
+  count,
+  getKey,
+  estimateSize,
+  renderRow,
+  overscan = 800,       // px rendered above and below the viewport
+  onEndReached,         // called when the last row comes into range
+}) => {
+  const containerRef = useRef(null);
+  const sizes = useRef(new Map());  // row key -> measured height
+  const observed = useRef(new Set());  // row elements being observed
+  const [measureVersion, setMeasureVersion] = useState(0);
+  const [viewport, setViewport] = useState({ top: 0, bottom: window.innerHeight });
+
+  // Track the viewport relative to the top of the list, at most once per frame
+  useEffect(() => {
+    let frame = null;
+    const update = () => {
+      frame = null;
+      if (!containerRef.current) return;
+      const top = -containerRef.current.getBoundingClientRect().top;
+      setViewport(prev => (
+        prev.top === top && prev.bottom === top + window.innerHeight
+          ? prev
+          : { top, bottom: top + window.innerHeight }
+      ));
+    };
+    const schedule = () => {
+      if (frame === null) frame = window.requestAnimationFrame(update);
+    };
+    update();
+    window.addEventListener('scroll', schedule, { passive: true });
+    window.addEventListener('resize', schedule);
+    return () => {
+      window.removeEventListener('scroll', schedule);
+      window.removeEventListener('resize', schedule);
+      if (frame !== null) window.cancelAnimationFrame(frame);
+    };
+  }, []);
+
+  // Re-measure rows whose height changes (images loading, deferred markdown)
+  const observer = useMemo(() => {
+    if (typeof ResizeObserver === 'undefined') return null;
+    return new ResizeObserver(entries => {
+      let changed = false;
+      for (const entry of entries) {
+        const key = entry.target.dataset.rowKey;
+        const height = entry.target.offsetHeight;
+        if (key !== undefined && sizes.current.get(key) !== height) {
+          sizes.current.set(key, height);
+          changed = true;
+        }
+      }
+      if (changed) setMeasureVersion(v => v + 1);
+    });
+  }, []);
+  useEffect(() => () => {
+    if (observer) observer.disconnect();
+    observed.current.clear();
+  }, [observer]);
+
+  const measureRef = useCallback((el) => {
+    if (!el) return;
+    const key = el.dataset.rowKey;
+    if (!sizes.current.has(key)) sizes.current.set(key, el.offsetHeight);
+    if (observer && !observed.current.has(el)) {
+      observer.observe(el);
+      observed.current.add(el);
+    }
+  }, [observer]);
+
+  // Stop observing rows that scrolled out of the window
+  useEffect(() => {
+    for (const el of observed.current) {
+      if (!el.isConnected) {
+        observer.unobserve(el);
+        observed.current.delete(el);
+      }
+    }
+  });
+
+  // offsets[i] is the top of row i; offsets[count] the total height
+  const offsets = useMemo(() => {
+    const result = new Float64Array(count + 1);
+    for (let i = 0; i < count; i++) {
+      const size = sizes.current.get(String(getKey(i)));
+      result[i + 1] = result[i] + (size !== undefined ? size : estimateSize(i));
+    }
+    return result;
+    // measureVersion: recompute when a row was (re)measured
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [count, getKey, estimateSize, measureVersion]);
+
+  // First row ending below `y`
+  const rowAt = (y) => {
+    let lo = 0;
+    let hi = count;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (offsets[mid + 1] <= y) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo;
+  };
+  const start = rowAt(viewport.top - overscan);
+  const end = Math.min(count, rowAt(viewport.bottom + overscan) + 1);
+
+  useEffect(() => {
+    if (onEndReached && count > 0 && end >= count) onEndReached();
+  }, [end, count, onEndReached]);
+
+  const rows = [];
+  for (let i = start; i < end; i++) {
+    const key = String(getKey(i));
+    rows.push(
+      // flow-root keeps the row's margins inside its measured height
+      <div key={key} data-row-key={key} ref={measureRef} style={{ display: 'flow-root' }}>
+        {renderRow(i)}
+      </div>
+    );
+  }
+
+  return (
+    <div ref={containerRef}>
+      <div style={{ height: offsets[start] }} />
+      {rows}
+      <div style={{ height: offsets[count] - offsets[end] }} />
+    </div>
+  );
+};
+
+export default VirtualList;
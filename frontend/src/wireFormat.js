@@ -0,0 +1,110 @@
+import axios from 'axios';
+
+// The chat APIs answer MessagePack when asked to and the server has msgpack
+// installed (see wire_format.py), and JSON otherwise. Both decode to the same
+// objects, so callers never see which one was used.
+const MSGPACK = 'application/msgpack';
+const ACCEPT = `${MSGPACK}, application/json;q=0.9`;
+
+const utf8 = new TextDecoder();
+
+// Decoder for the MessagePack subset the server emits (nil, booleans, ints,
+// floats, str, bin, array, map)
+export const decodeMsgpack = (buffer) => {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (length) => {
+    const start = pos;
+    pos += length;
+    return utf8.decode(bytes.subarray(start, pos));
+  };
+  const array = (length) => {
+    const out = new Array(length);
+    for (let i = 0; i < length; i++) out[i] = value();
+    return out;
+  };
+  const map = (length) => {
+    const out = {};
+    for (let i = 0; i < length; i++) {
+      const key = value();
+      out[key] = value();
+    }
+    return out;
+  };
+  const bin = (length) => {
+    const start = pos;
+    pos += length;
+    return bytes.slice(start, pos);
+  };
+
+  const value = () => {
+    const type = bytes[pos++];
+    if (type < 0x80) return type;
+    if (type < 0x90) return map(type & 0x0f);
+    if (type < 0xa0) return array(type & 0x0f);
+    if (type < 0xc0) return str(type & 0x1f);
+    if (type >= 0xe0) return type - 0x100;
+    let n;
+    switch (type) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: n = bytes[pos]; pos += 1; return bin(n);
+      case 0xc5: n = view.getUint16(pos); pos += 2; return bin(n);
+      case 0xc6: n = view.getUint32(pos); pos += 4; return bin(n);
+      case 0xca: n = view.getFloat32(pos); pos += 4; return n;
+      case 0xcb: n = view.getFloat64(pos); pos += 8; return n;
+      case 0xcc: n = bytes[pos]; pos += 1; return n;
+      case 0xcd: n = view.getUint16(pos); pos += 2; return n;
+      case 0xce: n = view.getUint32(pos); pos += 4; return n;
+      case 0xcf: n = Number(view.getBigUint64(pos)); pos += 8; return n;
+      case 0xd0: n = view.getInt8(pos); pos += 1; return n;
+      case 0xd1: n = view.getInt16(pos); pos += 2; return n;
+      case 0xd2: n = view.getInt32(pos); pos += 4; return n;
+      case 0xd3: n = Number(view.getBigInt64(pos)); pos += 8; return n;
+      case 0xd9: n = bytes[pos]; pos += 1; return str(n);
+      case 0xda: n = view.getUint16(pos); pos += 2; return str(n);
+      case 0xdb: n = view.getUint32(pos); pos += 4; return str(n);
+      case 0xdc: n = view.getUint16(pos); pos += 2; return array(n);
+      case 0xdd: n = view.getUint32(pos); pos += 4; return array(n);
+      case 0xde: n = view.getUint16(pos); pos += 2; return map(n);
+      case 0xdf: n = view.getUint32(pos); pos += 4; return map(n);
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${type.toString(16)} at byte ${pos - 1}`);
+    }
+  };
+
+  return value();
+};
+
+// Times a request turned away with 503 (the server is busy extracting chats)
+// is retried after the server's Retry-After
+const OVERLOAD_RETRIES = 3;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// axios.get() for the chat APIs, preferring MessagePack
+export const getApi = async (url, config = {}) => {
+  let response;
+  for (let attempt = 0; ; attempt++) {
+    try {
+      response = await axios.get(url, {
+        ...config,
+        headers: { ...config.headers, Accept: ACCEPT },
+        responseType: 'arraybuffer',
+      });
+      break;
+    } catch (err) {
+      if (err.response?.status !== 503 || attempt >= OVERLOAD_RETRIES) throw err;
+      const seconds = Number(err.response.headers['retry-after']) || 5;
+      await sleep(Math.min(seconds, 60) * 1000);
+    }
+  }
+  const contentType = response.headers['content-type'] || '';
+  response.data = contentType.startsWith(MSGPACK)
+    ? decodeMsgpack(response.data)
+    : JSON.parse(utf8.decode(response.data));
+  return response;
+};
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Profiling hooks for slow extraction and request handling.
+
+Three tools, usable together:
+
+StackSampler         – samples the Python stack of every thread at a fixed
+                       interval and counts them as collapsed stacks
+                       ("thread;module:function;... count"), the input format
+                       of flamegraph.pl and speedscope.
+profile_call()       – runs one call under cProfile and returns the stats.
+top_allocations()    – tracemalloc's biggest allocation sites of a snapshot.
+
+`server.py --profile` uses them to profile every API request and to enable
+/api/debug/profile?seconds=N.
+
+`python3 profiling.py --bench` measures the memory and build time of the
+in-memory chat model (slotted Chat/Message objects) against the per-message
+dicts it replaced, on synthetic chats.
+"""
+
+import argparse
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SAMPLE_INTERVAL = 0.005
+MAX_SECONDS = 120
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class StackSampler:
+    """Background thread that samples all other threads' stacks."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, exclude=()):
+        self.interval = interval
+        self.exclude = set(exclude)
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or ident in self.exclude:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def collapsed(self, idle: bool = False) -> str:
+        """
+        Collapsed-stack text, one "frame;frame;... count" line per stack.
+        Threads parked in wait()/select() are left out unless `idle`.
+        """
+        lines = []
+        for stack, count in self.stacks.most_common():
+            if not idle and _is_idle(stack):
+                continue
+            lines.append(f"{stack} {count}")
+        return "\n".join(lines) + "\n"
+
+
+_IDLE_LEAVES = {"threading:wait", "threading:_wait_for_tstate_lock", "selectors:select",
+                "socketserver:serve_forever", "queue:get", "concurrent.futures.thread:_worker"}
+
+
+def _is_idle(stack: str) -> bool:
+    return stack.rsplit(";", 1)[-1] in _IDLE_LEAVES
+
+
+def profile_call(fn: Callable, *args, **kwargs) -> Tuple[Any, pstats.Stats]:
+    """Run fn(*args, **kwargs) under cProfile; returns (result, stats)."""
+    prof = cProfile.Profile()
+    result = prof.runcall(fn, *args, **kwargs)
+    return result, pstats.Stats(prof)
+
+
+def pstats_dump(stats: pstats.Stats) -> bytes:
+    """Serialize stats in the format pstats.Stats(<file>) and snakeviz load."""
+    return marshal.dumps(stats.stats)
+
+
+def pstats_text(stats: pstats.Stats, limit: int = 30, sort: str = "cumulative") -> str:
+    out = io.StringIO()
+    stream, stats.stream = stats.stream, out
+    try:
+        stats.sort_stats(sort).print_stats(limit)
+    finally:
+        stats.stream = stream
+    return out.getvalue()
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = 25) -> List[Dict[str, Any]]:
+    stats = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]).statistics("lineno")
+    return [{
+        "file": s.traceback[0].filename,
+        "line": s.traceback[0].lineno,
+        "size_kb": round(s.size / 1024, 1),
+        "count": s.count,
+    } for s in stats[:limit]]
+
+
+def sample_window(seconds: float, work: Optional[Callable] = None,
+                  trace_memory: bool = True) -> Dict[str, Any]:
+    """
+    Sample every thread for `seconds` (or, if given, for as long as `work()`
+    takes, running it in this thread) and trace allocations meanwhile.
+    """
+    seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        # Without work, this thread only sleeps; keep it out of the profile
+        exclude = () if work is not None else (threading.get_ident(),)
+        with StackSampler(exclude=exclude) as sampler:
+            if work is not None:
+                work()
+            else:
+                time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot() if trace_memory else None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return {
+        "seconds": round(time.perf_counter() - t0, 3),
+        "sampler": sampler,
+        "allocations": top_allocations(snapshot) if snapshot else [],
+    }
+
+
+################################################################################
+# Data model benchmark (--bench)
+################################################################################
+def _measure(build: Callable) -> Dict[str, Any]:
+    """Bytes still allocated by, and seconds taken by, `build()`."""
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        result = build()
+        seconds = time.perf_counter() - t0
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"mb": round(size / 1024 / 1024, 1), "seconds": round(seconds, 3)}
+
+
+def model_benchmark(chats: int = 10000, messages_per_chat: int = 50) -> Dict[str, Dict[str, Any]]:
+    """
+    Container overhead of `chats` chats as per-message dicts (one project
+    dict per chat) and as slotted objects (one shared Project). Message text
+    is shared by both, so only the containers are counted.
+    """
+    from cursor_extraction import Chat, Message, Project
+
+    texts = [f"message {i}" for i in range(messages_per_chat)]
+    roles = ["user" if i % 2 == 0 else "assistant" for i in range(messages_per_chat)]
+
+    def as_dicts():
+        return [{
+            "project": {"name": "project", "rootPath": "/src/project"},
+            "session": {"composerId": f"composer-{i}", "title": "title", "createdAt": i, "lastUpdatedAt": i},
+            "messages": [{"role": role, "content": text} for role, text in zip(roles, texts)],
+            "workspace_id": "workspace",
+            "db_path": "/db",
+        } for i in range(chats)]
+
+    def as_objects():
+        project = Project("project", "/src/project")
+        return [Chat(f"composer-{i}", "title", i, i, project,
+                     [Message(role, text) for role, text in zip(roles, texts)], "workspace", "/db")
+                for i in range(chats)]
+
+    return {"dicts": _measure(as_dicts), "slotted": _measure(as_objects)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the extraction data model")
+    parser.add_argument("--bench", action="store_true", required=True,
+                        help="Compare per-message dicts with slotted Chat/Message objects")
+    parser.add_argument("--chats", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=50, help="Messages per chat")
+    args = parser.parse_args(argv)
+
+    results = model_benchmark(args.chats, args.messages)
+    print(f"{args.chats} chats x {args.messages} messages, container overhead only")
+    for name, r in results.items():
+        print(f"  {name:<8}{r['mb']:>9.1f} MB{r['seconds']:>9.3f} s")
+
+
+if __name__ == "__main__":
+    main()
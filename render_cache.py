@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+In-process cache of rendered chats (API JSON, JSON and HTML exports).
+
+Opening or exporting the same chat again would otherwise re-run
+format_chat_for_frontend() and generate_standalone_html(). Entries are the
+final response bytes, keyed by (kind, composerId) and tagged with a version
+(the chat's lastUpdatedAt/message-count stamp): a chat that changed is simply
+re-rendered and replaces its old entry. The cache is bounded by the total
+size of the bytes it holds, evicting least recently used entries first.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("CURSOR_VIEW_RENDER_CACHE_MB", "64")) * 1024 * 1024)
+
+
+class RenderCache:
+    """Byte-budgeted LRU of versioned, pre-serialized responses."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        # One huge export must not flush everything else
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 8
+        self._lock = threading.Lock()
+        # key -> (version, bytes), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bytes]]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+                self.stale += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: Any, data: bytes):
+        if len(data) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_render(self, key: Hashable, version: Any,
+                      render: Callable[[], bytes]) -> Tuple[bytes, bool]:
+        """Cached bytes for (key, version), rendering them on a miss; returns (bytes, hit)."""
+        data = self.get(key, version)
+        if data is not None:
+            return data, True
+        # Rendered outside the lock; concurrent misses on one key just render twice
+        data = render()
+        self.put(key, version, data)
+        return data, False
+
+    def _remove(self, key: Hashable):
+        _, data = self._entries.pop(key)
+        self.size -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "stale": self.stale,
+            }
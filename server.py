@@ -4,833 +4,340 @@ Simple API server to serve Cursor chat data for the web interface.
 """
 
 import json
-import uuid
-import logging
-import datetime
+import gzip
+import hmac
 import os
-import platform
-import sqlite3
+import cProfile
+import asyncio
+import logging
+import time
 import argparse
-import pathlib
-from collections import defaultdict
-from typing import Dict, Any, Iterable
 from pathlib import Path
-from flask import Flask, Response, jsonify, send_from_directory, request
+from flask import Flask, Response, g, jsonify, send_from_directory, request
 from flask_cors import CORS
 
+import chat_format
+import profiling
+import wire_format
+from admission import AdmissionController, Overloaded
+from chat_dedup import DuplicateDetector
+from chat_format import generate_standalone_html
+from chat_search import ChatIndex, IndexRefresher, chat_summary
+from chat_sync import SYNC_TOKEN_HEADER, ChangeFeed, SyncStore, chat_stamp, push_changes
+from code_index import CodeIndex
+from cursor_extraction import Chat, ExtractionProgress, MissingDependency, load_chats
+from cursor_roots import RootSet
+from render_cache import RenderCache
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='frontend/build')
-CORS(app)
+# Every route but the sync endpoints, which only other servers call: a page
+# open in a local browser must not be able to push chats into the store
+CORS(app, resources={r"^/(?!api/sync(/|$)).*": {}})
 
-################################################################################
-# Cursor storage roots
-################################################################################
-def cursor_root() -> pathlib.Path:
-    h = pathlib.Path.home()
-    s = platform.system()
-    if s == "Darwin":   return h / "Library" / "Application Support" / "Cursor"
-    if s == "Windows":  return h / "AppData" / "Roaming" / "Cursor"
-    if s == "Linux":    return h / ".config" / "Cursor"
-    raise RuntimeError(f"Unsupported OS: {s}")
+# Memory budget, concurrency limit and wait queue for full extractions;
+# replaced from --extract-memory-mb/--max-extractions/--extract-queue at startup
+admission = AdmissionController()
 
-################################################################################
-# Helpers
-################################################################################
-def j(cur: sqlite3.Cursor, table: str, key: str):
-    cur.execute(f"SELECT value FROM {table} WHERE key=?", (key,))
-    row = cur.fetchone()
-    if row:
-        try:    return json.loads(row[0])
-        except Exception as e: 
-            logger.debug(f"Failed to parse JSON for {key}: {e}")
-    return None
+# Cursor storage roots to serve; replaced from --root at startup
+roots = RootSet(admission=admission)
 
-def iter_bubbles_from_disk_kv(db: pathlib.Path) -> Iterable[tuple[str,str,str,str]]:
-    """Yield (composerId, role, text, db_path) from cursorDiskKV table."""
-    try:
-        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-        cur = con.cursor()
-        # Check if table exists
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cursorDiskKV'")
-        if not cur.fetchone():
-            con.close()
-            return
-        
-        cur.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'bubbleId:%'")
-    except sqlite3.DatabaseError as e:
-        logger.debug(f"Database error with {db}: {e}")
-        return
-    
-    db_path_str = str(db)
-    
-    for k, v in cur.fetchall():
-        try:
-            if v is None:
-                continue
-                
-            b = json.loads(v)
-        except Exception as e:
-            logger.debug(f"Failed to parse bubble JSON for key {k}: {e}")
-            continue
-        
-        txt = (b.get("text") or b.get("richText") or "").strip()
-        if not txt:         continue
-        role = "user" if b.get("type") == 1 else "assistant"
-        composerId = k.split(":")[1]  # Format is bubbleId:composerId:bubbleId
-        yield composerId, role, txt, db_path_str
-    
-    con.close()
+# TF-IDF vectors and code blocks of every extracted chat, refreshed
+# incrementally in the background whenever the extracted chats change
+search_index = ChatIndex()
+code_index = CodeIndex()
+index_refresher = IndexRefresher(search_index, code_index)
 
-def iter_chat_from_item_table(db: pathlib.Path) -> Iterable[tuple[str,str,str,str]]:
-    """Yield (composerId, role, text, db_path) from ItemTable."""
-    try:
-        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-        cur = con.cursor()
-        
-        # Try to get chat data from workbench.panel.aichat.view.aichat.chatdata
-        chat_data = j(cur, "ItemTable", "workbench.panel.aichat.view.aichat.chatdata")
-        if chat_data and "tabs" in chat_data:
-            for tab in chat_data.get("tabs", []):
-                tab_id = tab.get("tabId", "unknown")
-                for bubble in tab.get("bubbles", []):
-                    bubble_type = bubble.get("type")
-                    if not bubble_type:
-                        continue
-                    
-                    # Extract text from various possible fields
-                    text = ""
-                    if "text" in bubble:
-                        text = bubble["text"]
-                    elif "content" in bubble:
-                        text = bubble["content"]
-                    
-                    if text and isinstance(text, str):
-                        role = "user" if bubble_type == "user" else "assistant"
-                        yield tab_id, role, text, str(db)
-        
-        # Check for composer data
-        composer_data = j(cur, "ItemTable", "composer.composerData")
-        if composer_data:
-            for comp in composer_data.get("allComposers", []):
-                comp_id = comp.get("composerId", "unknown")
-                messages = comp.get("messages", [])
-                for msg in messages:
-                    role = msg.get("role", "unknown")
-                    content = msg.get("content", "")
-                    if content:
-                        yield comp_id, role, content, str(db)
-        
-        # Also check for aiService entries
-        for key_prefix in ["aiService.prompts", "aiService.generations"]:
-            try:
-                cur.execute("SELECT key, value FROM ItemTable WHERE key LIKE ?", (f"{key_prefix}%",))
-                for k, v in cur.fetchall():
-                    try:
-                        data = json.loads(v)
-                        if isinstance(data, list):
-                            for item in data:
-                                if "id" in item and "text" in item:
-                                    role = "user" if "prompts" in key_prefix else "assistant"
-                                    yield item.get("id", "unknown"), role, item.get("text", ""), str(db)
-                    except json.JSONDecodeError:
-                        continue
-            except sqlite3.Error:
-                continue
-    
-    except sqlite3.DatabaseError as e:
-        logger.debug(f"Database error in ItemTable with {db}: {e}")
-        return
-    finally:
-        if 'con' in locals():
-            con.close()
+def refresh_search_index(chats, stats, wait: bool = False):
+    """Start refreshing the indexes if `chats` changed; with `wait`, return once they cover them."""
+    index_refresher.update(chats, stats.get("fingerprint"))
+    if wait:
+        index_refresher.wait()
 
-def iter_composer_data(db: pathlib.Path) -> Iterable[tuple[str,dict,str]]:
-    """Yield (composerId, composerData, db_path) from cursorDiskKV table."""
-    try:
-        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-        cur = con.cursor()
-        # Check if table exists
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='cursorDiskKV'")
-        if not cur.fetchone():
-            con.close()
-            return
-        
-        cur.execute("SELECT key, value FROM cursorDiskKV WHERE key LIKE 'composerData:%'")
-    except sqlite3.DatabaseError as e:
-        logger.debug(f"Database error with {db}: {e}")
-        return
-    
-    db_path_str = str(db)
-    
-    for k, v in cur.fetchall():
-        try:
-            if v is None:
-                continue
-                
-            composer_data = json.loads(v)
-            composer_id = k.split(":")[1]
-            yield composer_id, composer_data, db_path_str
-            
-        except Exception as e:
-            logger.debug(f"Failed to parse composer data for key {k}: {e}")
-            continue
-    
-    con.close()
+# MinHash signatures for near-duplicate clusters, refreshed in the background
+# after every extraction
+duplicate_detector = DuplicateDetector()
 
-################################################################################
-# Workspace discovery
-################################################################################
-def workspaces(base: pathlib.Path):
-    ws_root = base / "User" / "workspaceStorage"
-    if not ws_root.exists():
-        return
-    for folder in ws_root.iterdir():
-        db = folder / "state.vscdb"
-        if db.exists():
-            yield folder.name, db
+# Sequence-numbered chat changes for /api/changes and --sync-to; the store
+# of mirrored chats is only set when this instance is an aggregator
+change_feed = ChangeFeed(loader=lambda: roots.load_chats(),
+                         fingerprint=lambda: roots.fingerprint())
+sync_store = None
+# Shared secret --sync-to clients must send in the X-Sync-Token header
+sync_token = None
 
-def extract_project_name_from_path(root_path, debug=False):
-    """
-    Extract a project name from a path, skipping user directories.
-    """
-    if not root_path or root_path == '/':
-        return "Root"
-        
-    path_parts = [p for p in root_path.split('/') if p]
-    
-    # Skip common user directory patterns
-    project_name = None
-    home_dir_patterns = ['Users', 'home']
-    
-    # Get current username for comparison
-    current_username = os.path.basename(os.path.expanduser('~'))
-    
-    # Find user directory in path
-    username_index = -1
-    for i, part in enumerate(path_parts):
-        if part in home_dir_patterns:
-            username_index = i + 1
-            break
-    
-    # If this is just /Users/username with no deeper path, don't use username as project
-    if username_index >= 0 and username_index < len(path_parts) and path_parts[username_index] == current_username:
-        if len(path_parts) <= username_index + 1:
-            return "Home Directory"
-    
-    if username_index >= 0 and username_index + 1 < len(path_parts):
-        # First try specific project directories we know about by name
-        known_projects = ['genaisf', 'cursor-view', 'cursor', 'cursor-apps', 'universal-github', 'inquiry']
-        
-        # Look at the most specific/deepest part of the path first
-        for i in range(len(path_parts)-1, username_index, -1):
-            if path_parts[i] in known_projects:
-                project_name = path_parts[i]
-                if debug:
-                    logger.debug(f"Found known project name from specific list: {project_name}")
-                break
-        
-        # If no known project found, use the last part of the path as it's likely the project directory
-        if not project_name and len(path_parts) > username_index + 1:
-            # Check if we have a structure like /Users/username/Documents/codebase/project_name
-            if 'Documents' in path_parts and 'codebase' in path_parts:
-                doc_index = path_parts.index('Documents')
-                codebase_index = path_parts.index('codebase')
-                
-                # If there's a path component after 'codebase', use that as the project name
-                if codebase_index + 1 < len(path_parts):
-                    project_name = path_parts[codebase_index + 1]
-                    if debug:
-                        logger.debug(f"Found project name in Documents/codebase structure: {project_name}")
-            
-            # If no specific structure found, use the last component of the path
-            if not project_name:
-                project_name = path_parts[-1]
-                if debug:
-                    logger.debug(f"Using last path component as project name: {project_name}")
-        
-        # Skip username as project name
-        if project_name == current_username:
-            project_name = 'Home Directory'
-            if debug:
-                logger.debug(f"Avoided using username as project name")
-        
-        # Skip common project container directories
-        project_containers = ['Documents', 'Projects', 'Code', 'workspace', 'repos', 'git', 'src', 'codebase']
-        if project_name in project_containers:
-            # Don't use container directories as project names
-            # Try to use the next component if available
-            container_index = path_parts.index(project_name)
-            if container_index + 1 < len(path_parts):
-                project_name = path_parts[container_index + 1]
-                if debug:
-                    logger.debug(f"Skipped container dir, using next component as project name: {project_name}")
-        
-        # If we still don't have a project name, use the first non-system directory after username
-        if not project_name and username_index + 1 < len(path_parts):
-            system_dirs = ['Library', 'Applications', 'System', 'var', 'opt', 'tmp']
-            for i in range(username_index + 1, len(path_parts)):
-                if path_parts[i] not in system_dirs and path_parts[i] not in project_containers:
-                    project_name = path_parts[i]
-                    if debug:
-                        logger.debug(f"Using non-system dir as project name: {project_name}")
-                    break
-    else:
-        # If not in a user directory, use the basename
-        project_name = path_parts[-1] if path_parts else "Root"
-        if debug:
-            logger.debug(f"Using basename as project name: {project_name}")
-    
-    # Final check: don't return username as project name
-    if project_name == current_username:
-        project_name = "Home Directory"
-        if debug:
-            logger.debug(f"Final check: replaced username with 'Home Directory'")
-    
-    return project_name if project_name else "Unknown Project"
+# Rendered chat JSON and exports of recently viewed chats, keyed by composerId
+# and re-rendered when the chat's (lastUpdatedAt, message count) stamp changes;
+# resized from --render-cache-mb at startup
+render_cache = RenderCache()
 
-def workspace_info(db: pathlib.Path):
-    try:
-        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-        cur = con.cursor()
+def render_cached(kind: str, chat: Chat, render):
+    """Return (bytes, hit) of `render()` for this version of `chat`."""
+    return render_cache.get_or_render((kind, chat.composer_id), tuple(chat_stamp(chat)), render)
 
-        # Get file paths from history entries to extract the project name
-        proj = {"name": "(unknown)", "rootPath": "(unknown)"}
-        ents = j(cur,"ItemTable","history.entries") or []
-        
-        # Extract file paths from history entries, stripping the file:/// scheme
-        paths = []
-        for e in ents:
-            resource = e.get("editor", {}).get("resource", "")
-            if resource and resource.startswith("file:///"):
-                paths.append(resource[len("file:///"):])
-        
-        # If we found file paths, extract the project name using the longest common prefix
-        if paths:
-            logger.debug(f"Found {len(paths)} paths in history entries")
-            
-            # Get the longest common prefix
-            common_prefix = os.path.commonprefix(paths)
-            logger.debug(f"Common prefix: {common_prefix}")
-            
-            # Find the last directory separator in the common prefix
-            last_separator_index = common_prefix.rfind('/')
-            if last_separator_index > 0:
-                project_root = common_prefix[:last_separator_index]
-                logger.debug(f"Project root from common prefix: {project_root}")
-                
-                # Extract the project name using the helper function
-                project_name = extract_project_name_from_path(project_root, debug=True)
-                
-                proj = {"name": project_name, "rootPath": "/" + project_root.lstrip('/')}
-        
-        # Try backup methods if we didn't get a project name
-        if proj["name"] == "(unknown)":
-            logger.debug("Trying backup methods for project name")
-            
-            # Check debug.selectedroot as a fallback
-            selected_root = j(cur, "ItemTable", "debug.selectedroot")
-            if selected_root and isinstance(selected_root, str) and selected_root.startswith("file:///"):
-                path = selected_root[len("file:///"):]
-                if path:
-                    root_path = "/" + path.strip("/")
-                    logger.debug(f"Project root from debug.selectedroot: {root_path}")
-                    
-                    # Extract the project name using the helper function
-                    project_name = extract_project_name_from_path(root_path, debug=True)
-                    
-                    if project_name:
-                        proj = {"name": project_name, "rootPath": root_path}
+def api_response(obj, mimetype: str = wire_format.JSON) -> Response:
+    """`obj` encoded as negotiated with wire_format.negotiate(); JSON goes through jsonify as before."""
+    response = jsonify(obj) if mimetype == wire_format.JSON else \
+        Response(wire_format.encode(mimetype, obj), mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
 
-        # composers meta
-        comp_meta={}
-        cd = j(cur,"ItemTable","composer.composerData") or {}
-        for c in cd.get("allComposers",[]):
-            comp_meta[c["composerId"]] = {
-                "title": c.get("name","(untitled)"),
-                "createdAt": c.get("createdAt"),
-                "lastUpdatedAt": c.get("lastUpdatedAt")
-            }
-        
-        # Try to get composer info from workbench.panel.aichat.view.aichat.chatdata
-        chat_data = j(cur, "ItemTable", "workbench.panel.aichat.view.aichat.chatdata") or {}
-        for tab in chat_data.get("tabs", []):
-            tab_id = tab.get("tabId")
-            if tab_id and tab_id not in comp_meta:
-                comp_meta[tab_id] = {
-                    "title": f"Chat {tab_id[:8]}",
-                    "createdAt": None,
-                    "lastUpdatedAt": None
-                }
-    except sqlite3.DatabaseError as e:
-        logger.debug(f"Error getting workspace info from {db}: {e}")
-        proj = {"name": "(unknown)", "rootPath": "(unknown)"}
-        comp_meta = {}
-    finally:
-        if 'con' in locals():
-            con.close()
-            
-    return proj, comp_meta
+def overloaded_response(e: Overloaded):
+    """503 with Retry-After for an extraction the admission controller turned away."""
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
 
-################################################################################
-# GlobalStorage
-################################################################################
-def global_storage_path(base: pathlib.Path) -> pathlib.Path:
-    """Return path to the global storage state.vscdb."""
-    global_db = base / "User" / "globalStorage" / "state.vscdb"
-    if global_db.exists():
-        return global_db
-    
-    # Legacy paths
-    g_dirs = [base/"User"/"globalStorage"/"cursor.cursor",
-              base/"User"/"globalStorage"/"cursor"]
-    for d in g_dirs:
-        if d.exists():
-            for file in d.glob("*.sqlite"):
-                return file
-    
-    return None
+def collapse_duplicates(chats):
+    """
+    Keep the newest chat of each duplicate cluster. Returns the kept chats and
+    a map from each keeper's composerId to the ids of the chats it hides.
+    """
+    clusters = duplicate_detector.clusters()
+    hidden = {}
+    for cluster in clusters:
+        for cid in cluster[1:]:
+            hidden[cid] = cluster[0]
+    duplicates = {}
+    for cid, keeper in hidden.items():
+        duplicates.setdefault(keeper, []).append(cid)
+    return [chat for chat in chats if chat.composer_id not in hidden], duplicates
 
 ################################################################################
-# Extraction pipeline
+# Profiling (--profile)
 ################################################################################
-def extract_chats() -> list[Dict[str,Any]]:
-    root = cursor_root()
-    logger.debug(f"Using Cursor root: {root}")
-
-    # Diagnostic: Check for AI-related keys in the first workspace
-    if os.environ.get("CURSOR_CHAT_DIAGNOSTICS"):
-        try:
-            first_ws = next(workspaces(root))
-            if first_ws:
-                ws_id, db = first_ws
-                logger.debug(f"\n--- DIAGNOSTICS for workspace {ws_id} ---")
-                con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-                cur = con.cursor()
-                
-                # List all tables
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [row[0] for row in cur.fetchall()]
-                logger.debug(f"Tables in workspace DB: {tables}")
-                
-                # Search for AI-related keys
-                if "ItemTable" in tables:
-                    for pattern in ['%ai%', '%chat%', '%composer%', '%prompt%', '%generation%']:
-                        cur.execute("SELECT key FROM ItemTable WHERE key LIKE ?", (pattern,))
-                        keys = [row[0] for row in cur.fetchall()]
-                        if keys:
-                            logger.debug(f"Keys matching '{pattern}': {keys}")
-                
-                con.close()
-                
-            # Check global storage
-            global_db = global_storage_path(root)
-            if global_db:
-                logger.debug(f"\n--- DIAGNOSTICS for global storage ---")
-                con = sqlite3.connect(f"file:{global_db}?mode=ro", uri=True)
-                cur = con.cursor()
-                
-                # List all tables
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = [row[0] for row in cur.fetchall()]
-                logger.debug(f"Tables in global DB: {tables}")
-                
-                # Search for AI-related keys in ItemTable
-                if "ItemTable" in tables:
-                    for pattern in ['%ai%', '%chat%', '%composer%', '%prompt%', '%generation%']:
-                        cur.execute("SELECT key FROM ItemTable WHERE key LIKE ?", (pattern,))
-                        keys = [row[0] for row in cur.fetchall()]
-                        if keys:
-                            logger.debug(f"Keys matching '{pattern}': {keys}")
-                
-                # Check for keys in cursorDiskKV
-                if "cursorDiskKV" in tables:
-                    cur.execute("SELECT DISTINCT substr(key, 1, instr(key, ':') - 1) FROM cursorDiskKV")
-                    prefixes = [row[0] for row in cur.fetchall()]
-                    logger.debug(f"Key prefixes in cursorDiskKV: {prefixes}")
-                
-                con.close()
-            
-            logger.debug("\n--- END DIAGNOSTICS ---\n")
-        except Exception as e:
-            logger.debug(f"Error in diagnostics: {e}")
-
-    # map lookups
-    ws_proj  : Dict[str,Dict[str,Any]] = {}
-    comp_meta: Dict[str,Dict[str,Any]] = {}
-    comp2ws  : Dict[str,str]           = {}
-    sessions : Dict[str,Dict[str,Any]] = defaultdict(lambda: {"messages":[]})
+# Set by --profile: every API request is run under cProfile and its stats are
+# written to this directory, and /api/debug/profile is enabled
+profile_dir = None
 
-    # 1. Process workspace DBs first
-    logger.debug("Processing workspace databases...")
-    ws_count = 0
-    for ws_id, db in workspaces(root):
-        ws_count += 1
-        logger.debug(f"Processing workspace {ws_id} - {db}")
-        proj, meta = workspace_info(db)
-        ws_proj[ws_id] = proj
-        for cid, m in meta.items():
-            comp_meta[cid] = m
-            comp2ws[cid] = ws_id
-        
-        # Extract chat data from workspace's state.vscdb
-        msg_count = 0
-        for cid, role, text, db_path in iter_chat_from_item_table(db):
-            # Add the message
-            sessions[cid]["messages"].append({"role": role, "content": text})
-            # Make sure to record the database path
-            if "db_path" not in sessions[cid]:
-                sessions[cid]["db_path"] = db_path
-            msg_count += 1
-            if cid not in comp_meta:
-                comp_meta[cid] = {"title": f"Chat {cid[:8]}", "createdAt": None, "lastUpdatedAt": None}
-                comp2ws[cid] = ws_id
-        logger.debug(f"  - Extracted {msg_count} messages from workspace {ws_id}")
-    
-    logger.debug(f"Processed {ws_count} workspaces")
+def extract_uncached():
+    """
+    Extract every root in this thread, bypassing the per-root caches (for
+    cProfile), but not the admission budget: raises Overloaded when turned away.
+    """
+    with admission.admit(roots.extraction_cost(), "profile"):
+        return [load_chats(root.path) for root in roots.roots]
 
-    # 2. Process global storage
-    global_db = global_storage_path(root)
-    if global_db:
-        logger.debug(f"Processing global storage: {global_db}")
-        # Extract bubbles from cursorDiskKV
-        msg_count = 0
-        for cid, role, text, db_path in iter_bubbles_from_disk_kv(global_db):
-            sessions[cid]["messages"].append({"role": role, "content": text})
-            # Record the database path
-            if "db_path" not in sessions[cid]:
-                sessions[cid]["db_path"] = db_path
-            msg_count += 1
-            if cid not in comp_meta:
-                comp_meta[cid] = {"title": f"Chat {cid[:8]}", "createdAt": None, "lastUpdatedAt": None}
-                comp2ws[cid] = "(global)"
-        logger.debug(f"  - Extracted {msg_count} messages from global cursorDiskKV bubbles")
-        
-        # Extract composer data
-        comp_count = 0
-        for cid, data, db_path in iter_composer_data(global_db):
-            if cid not in comp_meta:
-                created_at = data.get("createdAt")
-                comp_meta[cid] = {
-                    "title": f"Chat {cid[:8]}",
-                    "createdAt": created_at,
-                    "lastUpdatedAt": created_at
-                }
-                comp2ws[cid] = "(global)"
-            
-            # Record the database path
-            if "db_path" not in sessions[cid]:
-                sessions[cid]["db_path"] = db_path
-                
-            # Extract conversation from composer data
-            conversation = data.get("conversation", [])
-            if conversation:
-                msg_count = 0
-                for msg in conversation:
-                    msg_type = msg.get("type")
-                    if msg_type is None:
-                        continue
-                    
-                    # Type 1 = user, Type 2 = assistant
-                    role = "user" if msg_type == 1 else "assistant"
-                    content = msg.get("text", "")
-                    if content and isinstance(content, str):
-                        sessions[cid]["messages"].append({"role": role, "content": content})
-                        msg_count += 1
-                
-                if msg_count > 0:
-                    comp_count += 1
-                    logger.debug(f"  - Added {msg_count} messages from composer {cid[:8]}")
-        
-        if comp_count > 0:
-            logger.debug(f"  - Extracted data from {comp_count} composers in global cursorDiskKV")
-        
-        # Also try ItemTable in global DB
-        try:
-            con = sqlite3.connect(f"file:{global_db}?mode=ro", uri=True)
-            chat_data = j(con.cursor(), "ItemTable", "workbench.panel.aichat.view.aichat.chatdata")
-            if chat_data:
-                msg_count = 0
-                for tab in chat_data.get("tabs", []):
-                    tab_id = tab.get("tabId")
-                    if tab_id and tab_id not in comp_meta:
-                        comp_meta[tab_id] = {
-                            "title": f"Global Chat {tab_id[:8]}",
-                            "createdAt": None,
-                            "lastUpdatedAt": None
-                        }
-                        comp2ws[tab_id] = "(global)"
-                    
-                    for bubble in tab.get("bubbles", []):
-                        content = ""
-                        if "text" in bubble:
-                            content = bubble["text"]
-                        elif "content" in bubble:
-                            content = bubble["content"]
-                        
-                        if content and isinstance(content, str):
-                            role = "user" if bubble.get("type") == "user" else "assistant"
-                            sessions[tab_id]["messages"].append({"role": role, "content": content})
-                            msg_count += 1
-                logger.debug(f"  - Extracted {msg_count} messages from global chat data")
-            con.close()
-        except Exception as e:
-            logger.debug(f"Error processing global ItemTable: {e}")
+@app.before_request
+def start_request_profile():
+    if profile_dir is None or not request.path.startswith('/api/') \
+            or request.path.startswith('/api/debug/'):
+        return
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # Another profiler is active on this interpreter (concurrent request)
+        return
+    g.profiler = prof
+    g.profile_start = time.perf_counter()
 
-    # 3. Build final list
-    out = []
-    for cid, data in sessions.items():
-        if not data["messages"]:
-            continue
-        ws_id = comp2ws.get(cid, "(unknown)")
-        project = ws_proj.get(ws_id, {"name": "(unknown)", "rootPath": "(unknown)"})
-        meta = comp_meta.get(cid, {"title": "(untitled)", "createdAt": None, "lastUpdatedAt": None})
-        
-        # Create the output object with the db_path included
-        chat_data = {
-            "project": project,
-            "session": {"composerId": cid, **meta},
-            "messages": data["messages"],
-            "workspace_id": ws_id,
-        }
-        
-        # Add the database path if available
-        if "db_path" in data:
-            chat_data["db_path"] = data["db_path"]
-            
-        out.append(chat_data)
-    
-    # Sort by last updated time if available
-    out.sort(key=lambda s: s["session"].get("lastUpdatedAt") or 0, reverse=True)
-    logger.debug(f"Total chat sessions extracted: {len(out)}")
-    return out
+@app.teardown_request
+def finish_request_profile(exc=None):
+    prof = g.pop('profiler', None)
+    if prof is None:
+        return
+    prof.disable()
+    elapsed = time.perf_counter() - g.pop('profile_start')
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unknown'}-{int(elapsed * 1000)}ms.pstats"
+    prof.dump_stats(profile_dir / name)
+    logger.info(f"Profiled {request.method} {request.full_path} in {elapsed:.3f}s -> {profile_dir / name}")
 
-def extract_project_from_git_repos(workspace_id, debug=False):
+################################################################################
+# Streaming extraction
+################################################################################
+def stream_extraction(ticket=None, poll_interval: float = 0.25):
     """
-    Extract project name from the git repositories in a workspace.
-    Returns None if no repositories found or unable to access the DB.
+    Run load_chats_async() over every root on a private event loop, under
+    the admission `ticket` if given, and yield NDJSON lines: progress events
+    while it runs, then a final event with the chats.
+
+    Closing the generator (which the WSGI server does when the client goes
+    away) cancels the extraction.
     """
-    if not workspace_id or workspace_id == "unknown" or workspace_id == "(unknown)" or workspace_id == "(global)":
-        if debug:
-            logger.debug(f"Invalid workspace ID: {workspace_id}")
-        return None
-        
-    # Find the workspace DB
-    cursor_base = cursor_root()
-    workspace_db_path = cursor_base / "User" / "workspaceStorage" / workspace_id / "state.vscdb"
-    
-    if not workspace_db_path.exists():
-        if debug:
-            logger.debug(f"Workspace DB not found for ID: {workspace_id}")
-        return None
-        
+    progress = ExtractionProgress()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(roots.load_chats_async(progress, ticket))
     try:
-        # Connect to the workspace DB
-        if debug:
-            logger.debug(f"Connecting to workspace DB: {workspace_db_path}")
-        con = sqlite3.connect(f"file:{workspace_db_path}?mode=ro", uri=True)
-        cur = con.cursor()
-        
-        # Look for git repositories
-        git_data = j(cur, "ItemTable", "scm:view:visibleRepositories")
-        if not git_data or not isinstance(git_data, dict) or 'all' not in git_data:
-            if debug:
-                logger.debug(f"No git repositories found in workspace {workspace_id}, git_data: {git_data}")
-            con.close()
-            return None
-            
-        # Extract repo paths from the 'all' key
-        repos = git_data.get('all', [])
-        if not repos or not isinstance(repos, list):
-            if debug:
-                logger.debug(f"No repositories in 'all' key for workspace {workspace_id}, repos: {repos}")
-            con.close()
-            return None
-            
-        if debug:
-            logger.debug(f"Found {len(repos)} git repositories in workspace {workspace_id}: {repos}")
-            
-        # Process each repo path
-        for repo in repos:
-            if not isinstance(repo, str):
-                continue
-                
-            # Look for git:Git:file:/// pattern
-            if "git:Git:file:///" in repo:
-                # Extract the path part
-                path = repo.split("file:///")[-1]
-                path_parts = [p for p in path.split('/') if p]
-                
-                if path_parts:
-                    # Use the last part as the project name
-                    project_name = path_parts[-1]
-                    if debug:
-                        logger.debug(f"Found project name '{project_name}' from git repo in workspace {workspace_id}")
-                    con.close()
-                    return project_name
-            else:
-                if debug:
-                    logger.debug(f"No 'git:Git:file:///' pattern in repo: {repo}")
-                    
-        if debug:
-            logger.debug(f"No suitable git repos found in workspace {workspace_id}")
-        con.close()
-    except Exception as e:
-        if debug:
-            logger.debug(f"Error extracting git repos from workspace {workspace_id}: {e}")
-        return None
-        
-    return None
+        while not task.done():
+            loop.run_until_complete(asyncio.wait([task], timeout=poll_interval))
+            yield json.dumps({"event": "progress", **progress.as_dict()}) + "\n"
+        project_cache = {}
+        chats = [format_chat_for_frontend(chat, project_cache) for chat in task.result()]
+        yield json.dumps({"event": "done", "chats": chats}) + "\n"
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass
+        loop.close()
 
-def format_chat_for_frontend(chat):
-    """Format the chat data to match what the frontend expects."""
-    try:
-        # Generate a unique ID for this chat if it doesn't have one
-        session_id = str(uuid.uuid4())
-        if 'session' in chat and chat['session'] and isinstance(chat['session'], dict):
-            session_id = chat['session'].get('composerId', session_id)
-        
-        # Format date from createdAt timestamp or use current date
-        date = int(datetime.datetime.now().timestamp())
-        if 'session' in chat and chat['session'] and isinstance(chat['session'], dict):
-            created_at = chat['session'].get('createdAt')
-            if created_at and isinstance(created_at, (int, float)):
-                # Convert from milliseconds to seconds
-                date = created_at / 1000
-        
-        # Ensure project has expected fields
-        project = chat.get('project', {})
-        if not isinstance(project, dict):
-            project = {}
-            
-        # Get workspace_id from chat
-        workspace_id = chat.get('workspace_id', 'unknown')
-        
-        # Get the database path information
-        db_path = chat.get('db_path', 'Unknown database path')
-        
-        # If project name is a username or unknown, try to extract a better name from rootPath
-        if project.get('rootPath'):
-            current_name = project.get('name', '')
-            username = os.path.basename(os.path.expanduser('~'))
-            
-            # Check if project name is username or unknown or very generic
-            if (current_name == username or 
-                current_name == '(unknown)' or 
-                current_name == 'Root' or
-                # Check if rootPath is directly under /Users/username with no additional path components
-                (project.get('rootPath').startswith(f'/Users/{username}') and 
-                 project.get('rootPath').count('/') <= 3)):
-                
-                # Try to extract a better name from the path
-                project_name = extract_project_name_from_path(project.get('rootPath'), debug=False)
-                
-                # Only use the new name if it's meaningful
-                if (project_name and 
-                    project_name != 'Unknown Project' and 
-                    project_name != username and
-                    project_name not in ['Documents', 'Downloads', 'Desktop']):
-                    
-                    logger.debug(f"Improved project name from '{current_name}' to '{project_name}'")
-                    project['name'] = project_name
-                elif project.get('rootPath').startswith(f'/Users/{username}/Documents/codebase/'):
-                    # Special case for /Users/saharmor/Documents/codebase/X
-                    parts = project.get('rootPath').split('/')
-                    if len(parts) > 5:  # /Users/username/Documents/codebase/X
-                        project['name'] = parts[5]
-                        logger.debug(f"Set project name to specific codebase subdirectory: {parts[5]}")
-                    else:
-                        project['name'] = "cursor-view"  # Current project as default
-        
-        # If the project doesn't have a rootPath or it's very generic, enhance it with workspace_id
-        if not project.get('rootPath') or project.get('rootPath') == '/' or project.get('rootPath') == '/Users':
-            if workspace_id != 'unknown':
-                # Use workspace_id to create a more specific path
-                if not project.get('rootPath'):
-                    project['rootPath'] = f"/workspace/{workspace_id}"
-                elif project.get('rootPath') == '/' or project.get('rootPath') == '/Users':
-                    project['rootPath'] = f"{project['rootPath']}/workspace/{workspace_id}"
-        
-        # FALLBACK: If project name is still generic, try to extract it from git repositories
-        if project.get('name') in ['Home Directory', '(unknown)']:
-            git_project_name = extract_project_from_git_repos(workspace_id, debug=True)
-            if git_project_name:
-                logger.debug(f"Improved project name from '{project.get('name')}' to '{git_project_name}' using git repo")
-                project['name'] = git_project_name
-        
-        # Add workspace_id to the project data explicitly
-        project['workspace_id'] = workspace_id
-            
-        # Ensure messages exist and are properly formatted
-        messages = chat.get('messages', [])
-        if not isinstance(messages, list):
-            messages = []
-        
-        # Create properly formatted chat object
-        return {
-            'project': project,
-            'messages': messages,
-            'date': date,
-            'session_id': session_id,
-            'workspace_id': workspace_id,
-            'db_path': db_path  # Include the database path in the output
-        }
-    except Exception as e:
-        logger.error(f"Error formatting chat: {e}")
-        # Return a minimal valid object if there's an error
-        return {
-            'project': {'name': 'Error', 'rootPath': '/'},
-            'messages': [],
-            'date': int(datetime.datetime.now().timestamp()),
-            'session_id': str(uuid.uuid4()),
-            'workspace_id': 'error',
-            'db_path': 'Error retrieving database path'
-        }
+def format_chat_for_frontend(chat: Chat, project_cache: dict = None):
+    """Format a chat for the frontend, resolving it against the served roots."""
+    return chat_format.format_chat_for_frontend(chat, project_cache, roots)
 
 @app.route('/api/chats', methods=['GET'])
 def get_chats():
-    """Get all chat sessions."""
+    """
+    Get all chat sessions, newest first. With ?limit=N (and ?offset=M) only
+    that page is formatted and returned, as {chats, total, offset, next}.
+    A first page requested before the chats were extracted is served from
+    roots.load_recent_chats(), with a null total.
+    """
     try:
         logger.info(f"Received request for chats from {request.remote_addr}")
-        chats = extract_chats()
-        logger.info(f"Retrieved {len(chats)} chats")
-        
-        # Format each chat for the frontend
+        mimetype = wire_format.negotiate(request.accept_mimetypes)
+        collapse = request.args.get('collapse', '').lower() in ('1', 'true', 'duplicates')
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = request.args.get('limit', type=int)
+        if limit and offset == 0 and not collapse and sync_store is None:
+            recent = roots.load_recent_chats(limit)
+            if recent is not None:
+                logger.info(f"Returning {len(recent)} most recent chats while extraction runs")
+                project_cache = {}
+                return api_response({
+                    "chats": [format_chat_for_frontend(chat, project_cache) for chat in recent],
+                    "total": None if len(recent) == limit else len(recent),
+                    "offset": 0,
+                    "next": len(recent) if len(recent) == limit else None,
+                }, mimetype)
+        
+        stats = {}
+        chats = roots.load_chats(stats=stats)
+        logger.info(f"Retrieved {len(chats)} chats "
+                    f"({stats.get('duplicates_dropped', 0)} duplicate messages dropped)")
+        refresh_search_index(chats, stats)
+        change_feed.refresh(chats)
+        if collapse:
+            duplicate_detector.update(chats)
+        else:
+            duplicate_detector.update_async(chats)
+        
+        duplicates = {}
+        if collapse:
+            chats, duplicates = collapse_duplicates(chats)
+        items = chats
+        if sync_store is not None:
+            # Chats mirrored into the sync store are already formatted; merge
+            # them with the local ones, most recently updated first
+            merged = [(chat.last_updated_at or 0, chat) for chat in chats] + sync_store.chats()
+            merged.sort(key=lambda item: item[0], reverse=True)
+            items = [chat for _, chat in merged]
+        page = items[offset:offset + limit] if limit is not None else items[offset:]
+        
+        # Format each chat of the page for the frontend
         formatted_chats = []
-        for chat in chats:
+        project_cache = {}
+        for chat in page:
+            if isinstance(chat, dict):
+                formatted_chats.append(chat)
+                continue
             try:
-                formatted_chat = format_chat_for_frontend(chat)
-                formatted_chats.append(formatted_chat)
+                formatted_chat = format_chat_for_frontend(chat, project_cache)
             except Exception as e:
                 logger.error(f"Error formatting individual chat: {e}")
                 # Skip this chat if it can't be formatted
                 continue
+            if chat.composer_id in duplicates:
+                formatted_chat['duplicates'] = duplicates[chat.composer_id]
+            formatted_chats.append(formatted_chat)
         
         logger.info(f"Returning {len(formatted_chats)} formatted chats")
-        return jsonify(formatted_chats)
+        if limit is None:
+            return api_response(formatted_chats, mimetype)
+        end = offset + len(page)
+        return api_response({
+            "chats": formatted_chats,
+            "total": len(items),
+            "offset": offset,
+            "next": end if end < len(items) else None,
+        }, mimetype)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except MissingDependency as e:
+        return jsonify({"error": str(e)}), 501
     except Exception as e:
         logger.error(f"Error in get_chats: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/chats/stream', methods=['GET'])
+def stream_chats():
+    """Stream extraction progress as NDJSON, ending with all formatted chats."""
+    logger.info(f"Received streaming request for chats from {request.remote_addr}")
+    # Admitted before the response starts, so a rejection can still be a 503;
+    # the ticket is held until the extraction ends or the stream is closed
+    try:
+        ticket = roots.admit_extraction("stream")
+    except Overloaded as e:
+        return overloaded_response(e)
+    response = Response(
+        stream_extraction(ticket),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(ticket.release)
+    return response
+
+def message_page(formatted: dict, total: int, offset: int, limit: int) -> dict:
+    """Add the message paging fields to a formatted chat holding messages[offset:offset + limit]."""
+    end = offset + limit
+    formatted.update(message_count=total, offset=offset, next=end if end < total else None)
+    return formatted
+
+def format_chat_page(chat: Chat, offset: int, limit: int) -> dict:
+    """A formatted chat with only messages[offset:offset + limit], and paging fields."""
+    page = Chat(chat.composer_id, chat.title, chat.created_at, chat.last_updated_at, chat.project,
+                chat.messages[offset:offset + limit], chat.workspace_id, chat.db_path)
+    return message_page(format_chat_for_frontend(page), len(chat.messages), offset, limit)
+
 @app.route('/api/chat/<session_id>', methods=['GET'])
 def get_chat(session_id):
-    """Get a specific chat session by ID."""
+    """
+    Get a specific chat session by ID, as JSON or a negotiated binary format.
+    With ?limit=N (and ?offset=M) only that page of its messages is
+    returned, along with message_count, offset and next.
+    """
     try:
         logger.info(f"Received request for chat {session_id} from {request.remote_addr}")
-        chats = extract_chats()
-        
-        for chat in chats:
-            # Check for a matching composerId safely
-            if 'session' in chat and chat['session'] and isinstance(chat['session'], dict):
-                if chat['session'].get('composerId') == session_id:
-                    formatted_chat = format_chat_for_frontend(chat)
-                    return jsonify(formatted_chat)
+        mimetype = wire_format.negotiate(request.accept_mimetypes)
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(1, limit)
+        # Mirrored chats ("<source>:<composerId>") come from the sync store
+        mirrored = sync_store.get(session_id) if sync_store is not None else None
+        if mirrored:
+            if limit is not None:
+                messages = mirrored["messages"]
+                mirrored["messages"] = messages[offset:offset + limit]
+                message_page(mirrored, len(messages), offset, limit)
+            return api_response(mirrored, mimetype)
+        chat = roots.load_chat(session_id)
+        if chat:
+            kind = 'chat' if mimetype == wire_format.JSON else f'chat:{mimetype}'
+            if limit is None:
+                render = lambda: format_chat_for_frontend(chat)
+            else:
+                kind += f':{offset}:{limit}'
+                render = lambda: format_chat_page(chat, offset, limit)
+            if mimetype == wire_format.JSON:
+                data, hit = render_cached(kind, chat, lambda: jsonify(render()).get_data())
+            else:
+                data, hit = render_cached(kind, chat, lambda: wire_format.encode(mimetype, render()))
+            response = Response(data, mimetype=mimetype, headers={"X-Cache": "hit" if hit else "miss"})
+            response.vary.add("Accept")
+            return response
         
         logger.warning(f"Chat with ID {session_id} not found")
         return jsonify({"error": "Chat not found"}), 404
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error in get_chat: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
@@ -841,173 +348,267 @@ def export_chat(session_id):
     try:
         logger.info(f"Received request to export chat {session_id} from {request.remote_addr}")
         export_format = request.args.get('format', 'html').lower()
-        chats = extract_chats()
-        
-        for chat in chats:
-            # Check for a matching composerId safely
-            if 'session' in chat and chat['session'] and isinstance(chat['session'], dict):
-                if chat['session'].get('composerId') == session_id:
-                    formatted_chat = format_chat_for_frontend(chat)
-                    
-                    if export_format == 'json':
-                        # Export as JSON
-                        return Response(
-                            json.dumps(formatted_chat, indent=2),
-                            mimetype="application/json; charset=utf-8",
-                            headers={
-                                "Content-Disposition": f'attachment; filename="cursor-chat-{session_id[:8]}.json"',
-                                "Cache-Control": "no-store",
-                            },
-                        )
-                    else:
-                        # Default to HTML export
-                        html_content = generate_standalone_html(formatted_chat)
-                        return Response(
-                            html_content,
-                            mimetype="text/html; charset=utf-8",
-                            headers={
-                                "Content-Disposition": f'attachment; filename="cursor-chat-{session_id[:8]}.html"',
-                                "Content-Length": str(len(html_content)),
-                                "Cache-Control": "no-store",
-                            },
-                        )
+        if export_format != 'json':
+            export_format = 'html'
+        # Mirrored chats ("<source>:<composerId>") come from the sync store
+        formatted_chat = sync_store.get(session_id) if sync_store is not None else None
+        chat = None if formatted_chat else roots.load_chat(session_id)
+        content, hit = None, False
+        if formatted_chat:
+            content = (json.dumps(formatted_chat, indent=2) if export_format == 'json'
+                       else generate_standalone_html(formatted_chat)).encode("utf-8")
+        elif chat:
+            if export_format == 'json':
+                render = lambda: json.dumps(format_chat_for_frontend(chat), indent=2).encode("utf-8")
+            else:
+                render = lambda: generate_standalone_html(format_chat_for_frontend(chat)).encode("utf-8")
+            content, hit = render_cached(export_format, chat, render)
+        if content:
+            if export_format == 'json':
+                # Export as JSON
+                return Response(
+                    content,
+                    mimetype="application/json; charset=utf-8",
+                    headers={
+                        "Content-Disposition": f'attachment; filename="cursor-chat-{session_id[:8]}.json"',
+                        "Cache-Control": "no-store",
+                        "X-Cache": "hit" if hit else "miss",
+                    },
+                )
+            else:
+                # Default to HTML export
+                return Response(
+                    content,
+                    mimetype="text/html; charset=utf-8",
+                    headers={
+                        "Content-Disposition": f'attachment; filename="cursor-chat-{session_id[:8]}.html"',
+                        "Content-Length": str(len(content)),
+                        "Cache-Control": "no-store",
+                        "X-Cache": "hit" if hit else "miss",
+                    },
+                )
         
         logger.warning(f"Chat with ID {session_id} not found for export")
         return jsonify({"error": "Chat not found"}), 404
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error in export_chat: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
-def generate_standalone_html(chat):
-    """Generate a standalone HTML representation of the chat."""
-    logger.info(f"Generating HTML for session ID: {chat.get('session_id', 'N/A')}")
+@app.route('/api/search', methods=['GET'])
+def search_chats():
+    """Search chats by substring (mode=text, default) or TF-IDF similarity (mode=semantic)."""
+    query = request.args.get('q', '').strip()
+    mode = request.args.get('mode', 'text').lower()
+    limit = request.args.get('limit', 20, type=int)
+    if not query:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
     try:
-        # Format date for display
-        date_display = "Unknown date"
-        if chat.get('date'):
-            try:
-                date_obj = datetime.datetime.fromtimestamp(chat['date'])
-                date_display = date_obj.strftime("%Y-%m-%d %H:%M:%S")
-            except Exception as e:
-                logger.warning(f"Error formatting date: {e}")
-        
-        # Get project info
-        project_name = chat.get('project', {}).get('name', 'Unknown Project')
-        project_path = chat.get('project', {}).get('rootPath', 'Unknown Path')
-        logger.info(f"Project: {project_name}, Path: {project_path}, Date: {date_display}")
-        
-        # Build the HTML content
-        messages_html = ""
-        messages = chat.get('messages', [])
-        logger.info(f"Found {len(messages)} messages for the chat.")
-        
-        if not messages:
-            logger.warning("No messages found in the chat object to generate HTML.")
-            messages_html = "<p>No messages found in this conversation.</p>"
+        logger.info(f"Received {mode} search request from {request.remote_addr}")
+        stats = {}
+        chats = roots.load_chats(stats=stats)
+        if mode == 'semantic':
+            refresh_search_index(chats, stats, wait=True)
+            results = search_index.search(query, limit)
         else:
-            for i, msg in enumerate(messages):
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')
-                logger.debug(f"Processing message {i+1}/{len(messages)} - Role: {role}, Content length: {len(content)}")
-                
-                if not content or not isinstance(content, str):
-                    logger.warning(f"Message {i+1} has invalid content: {content}")
-                    content = "Content unavailable"
-                
-                # Simple HTML escaping
-                escaped_content = content.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                
-                # Convert markdown code blocks (handle potential nesting issues simply)
-                processed_content = ""
-                in_code_block = False
-                for line in escaped_content.split('\n'):
-                    if line.strip().startswith("```"):
-                        if not in_code_block:
-                            processed_content += "<pre><code>"
-                            in_code_block = True
-                            # Remove the first ``` marker
-                            line = line.strip()[3:] 
-                        else:
-                            processed_content += "</code></pre>\n"
-                            in_code_block = False
-                            line = "" # Skip the closing ``` line
-                    
-                    if in_code_block:
-                         # Inside code block, preserve spacing and add line breaks
-                        processed_content += line + "\n" 
-                    else:
-                        # Outside code block, use <br> for newlines
-                        processed_content += line + "<br>"
-                
-                # Close any unclosed code block at the end
-                if in_code_block:
-                    processed_content += "</code></pre>"
-                
-                avatar = "👤" if role == "user" else "🤖"
-                name = "You" if role == "user" else "Cursor Assistant"
-                bg_color = "#f0f7ff" if role == "user" else "#f0fff7"
-                border_color = "#3f51b5" if role == "user" else "#00796b"
-                
-                messages_html += f"""
-                <div class="message" style="margin-bottom: 20px;">
-                    <div class="message-header" style="display: flex; align-items: center; margin-bottom: 8px;">
-                        <div class="avatar" style="width: 32px; height: 32px; border-radius: 50%; background-color: {border_color}; color: white; display: flex; justify-content: center; align-items: center; margin-right: 10px;">
-                            {avatar}
-                        </div>
-                        <div class="sender" style="font-weight: bold;">{name}</div>
-                    </div>
-                    <div class="message-content" style="padding: 15px; border-radius: 8px; background-color: {bg_color}; border-left: 4px solid {border_color}; margin-left: {0 if role == 'user' else '40px'}; margin-right: {0 if role == 'assistant' else '40px'};">
-                        {processed_content} 
-                    </div>
-                </div>
-                """
+            q = query.lower()
+            results = [chat_summary(chat) for chat in chats
+                       if q in (chat.project.name or '').lower()
+                       or any(q in m.content.lower() for m in chat.messages)][:limit]
+        return jsonify(results)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except MissingDependency as e:
+        return jsonify({"error": str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error in search_chats: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
 
-        # Create the complete HTML document
-        html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Cursor Chat - {project_name}</title>
-    <style>
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Helvetica, Arial, sans-serif; line-height: 1.6; color: #333; max-width: 900px; margin: 20px auto; padding: 20px; border: 1px solid #eee; box-shadow: 0 2px 5px rgba(0,0,0,0.1); }}
-        h1, h2, h3 {{ color: #2c3e50; }}
-        .header {{ background: linear-gradient(90deg, #f0f7ff 0%, #f0fff7 100%); color: white; padding: 15px 20px; border-radius: 8px 8px 0 0; margin: -20px -20px 20px -20px; }}
-        .chat-info {{ display: flex; flex-wrap: wrap; gap: 10px 20px; margin-bottom: 20px; background-color: #f9f9f9; padding: 12px 15px; border-radius: 8px; font-size: 0.9em; }}
-        .info-item {{ display: flex; align-items: center; }}
-        .info-label {{ font-weight: bold; margin-right: 5px; color: #555; }}
-        pre {{ background-color: #eef; padding: 15px; border-radius: 5px; overflow-x: auto; border: 1px solid #ddd; font-family: 'Courier New', Courier, monospace; font-size: 0.9em; white-space: pre-wrap; word-wrap: break-word; }}
-        code {{ background-color: transparent; padding: 0; border-radius: 0; font-family: inherit; }}
-        .message-content pre code {{ background-color: transparent; }}
-        .message-content {{ word-wrap: break-word; overflow-wrap: break-word; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>Cursor Chat: {project_name}</h1>
-    </div>
-    <div class="chat-info">
-        <div class="info-item"><span class="info-label">Project:</span> <span>{project_name}</span></div>
-        <div class="info-item"><span class="info-label">Path:</span> <span>{project_path}</span></div>
-        <div class="info-item"><span class="info-label">Date:</span> <span>{date_display}</span></div>
-        <div class="info-item"><span class="info-label">Session ID:</span> <span>{chat.get('session_id', 'Unknown')}</span></div>
-    </div>
-    <h2>Conversation History</h2>
-    <div class="messages">
-{messages_html}
-    </div>
-    <div style="margin-top: 30px; font-size: 12px; color: #999; text-align: center; border-top: 1px solid #eee; padding-top: 15px;">
-        <a href="https://github.com/saharmor/cursor-view" target="_blank" rel="noopener noreferrer">Exported from Cursor View</a>
-    </div>
-</body>
-</html>"""
-        
-        logger.info(f"Finished generating HTML. Total length: {len(html)}")
-        return html
+@app.route('/api/chat/<session_id>/similar', methods=['GET'])
+def similar_chats(session_id):
+    """List the chats most similar to the given one."""
+    limit = request.args.get('limit', 10, type=int)
+    try:
+        logger.info(f"Received request for chats similar to {session_id} from {request.remote_addr}")
+        stats = {}
+        refresh_search_index(roots.load_chats(stats=stats), stats, wait=True)
+        results = search_index.similar(session_id, limit)
+        if results is None:
+            return jsonify({"error": "Chat not found"}), 404
+        return jsonify(results)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except MissingDependency as e:
+        return jsonify({"error": str(e)}), 501
     except Exception as e:
-        logger.error(f"Error generating HTML for session {chat.get('session_id', 'N/A')}: {e}", exc_info=True)
-        # Return an HTML formatted error message
-        return f"<html><body><h1>Error generating chat export</h1><p>Error: {e}</p></body></html>"
+        logger.error(f"Error in similar_chats: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/code', methods=['GET'])
+def search_code():
+    """Search fenced code blocks by content, language and project."""
+    limit = request.args.get('limit', 50, type=int)
+    try:
+        logger.info(f"Received code search request from {request.remote_addr}")
+        stats = {}
+        refresh_search_index(roots.load_chats(stats=stats), stats, wait=True)
+        results = code_index.search(
+            query=request.args.get('q', '').strip(),
+            language=request.args.get('language') or None,
+            project=request.args.get('project') or None,
+            unique=request.args.get('unique', '').lower() in ('1', 'true'),
+            limit=limit,
+            with_content=request.args.get('content', '1').lower() not in ('0', 'false'),
+        )
+        results["languages"] = code_index.languages()
+        return jsonify(results)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error in search_code: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Chats changed since a sequence number, for incremental mirroring."""
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', 200, type=int)
+    try:
+        change_feed.refresh()
+        page = change_feed.changes(since, request.args.get('epoch'), max(1, limit))
+        chats = []
+        for stamp, chat in page["chats"]:
+            formatted_chat = format_chat_for_frontend(chat)
+            formatted_chat["stamp"] = stamp
+            chats.append(formatted_chat)
+        page["chats"] = chats
+        body = json.dumps(page).encode("utf-8")
+        headers = {"Cache-Control": "no-store"}
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return Response(body, mimetype="application/json", headers=headers)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error in get_changes: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+def check_sync_request():
+    """Error response for a sync request this aggregator must refuse, else None."""
+    if sync_store is None:
+        return jsonify({"error": "Not an aggregator; start the server with --sync-store"}), 404
+    token = request.headers.get(SYNC_TOKEN_HEADER, "")
+    if not hmac.compare_digest(token.encode("utf-8"), sync_token.encode("utf-8")):
+        logger.warning(f"Rejected sync request without a valid token from {request.remote_addr}")
+        return jsonify({"error": f"Missing or wrong {SYNC_TOKEN_HEADER}"}), 403
+    return None
+
+@app.route('/api/sync/state', methods=['GET'])
+def get_sync_state():
+    """Stamps of the chats this aggregator holds for a source."""
+    refused = check_sync_request()
+    if refused:
+        return refused
+    source = request.args.get('source', '')
+    return jsonify({"source": source, "chats": sync_store.state(source)})
+
+@app.route('/api/sync', methods=['POST'])
+def receive_sync():
+    """Apply a batch of changed and deleted chats pushed by --sync-to."""
+    refused = check_sync_request()
+    if refused:
+        return refused
+    try:
+        body = request.get_data()
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        batch = json.loads(body)
+        result = sync_store.apply(batch["source"], batch.get("chats", []), batch.get("deleted", []))
+        logger.info(f"Sync from {batch['source']} ({request.remote_addr}): {result}")
+        return jsonify(result)
+    except (KeyError, ValueError, OSError) as e:
+        return jsonify({"error": f"Invalid sync batch: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error in receive_sync: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/debug/profile', methods=['GET'])
+def debug_profile():
+    """
+    Profile the server for `seconds` (default 5), or a fresh extraction with
+    extract=1. format=collapsed (flamegraph stacks, default), pstats (cProfile
+    dump; needs extract=1) or json (top stacks, stats and allocations).
+    Only available when started with --profile.
+    """
+    if profile_dir is None:
+        return jsonify({"error": "Profiling is disabled; start the server with --profile"}), 404
+    seconds = request.args.get('seconds', 5, type=float)
+    fmt = request.args.get('format', 'collapsed').lower()
+    extract = request.args.get('extract', '').lower() in ('1', 'true')
+    if fmt not in ('collapsed', 'pstats', 'json'):
+        return jsonify({"error": f"Unknown format: {fmt}"}), 400
+    if fmt == 'pstats' and not extract:
+        return jsonify({"error": "format=pstats profiles an extraction; add extract=1"}), 400
+    try:
+        stats = None
+
+        def run_extraction():
+            nonlocal stats
+            _, stats = profiling.profile_call(extract_uncached)
+
+        logger.info(f"Profiling for {'one extraction' if extract else f'{seconds}s'} ({fmt})")
+        result = profiling.sample_window(seconds, run_extraction if extract else None)
+        sampler = result["sampler"]
+        if fmt == 'collapsed':
+            return Response(sampler.collapsed(), mimetype="text/plain; charset=utf-8", headers={
+                "Content-Disposition": 'attachment; filename="cursor-view.collapsed"'})
+        if fmt == 'pstats':
+            return Response(profiling.pstats_dump(stats), mimetype="application/octet-stream", headers={
+                "Content-Disposition": 'attachment; filename="cursor-view.pstats"'})
+        return jsonify({
+            "seconds": result["seconds"],
+            "samples": sampler.samples,
+            "stacks": [{"stack": line.rsplit(" ", 1)[0], "count": int(line.rsplit(" ", 1)[1])}
+                       for line in sampler.collapsed().splitlines()[:100]],
+            "allocations": result["allocations"],
+            "pstats": profiling.pstats_text(stats) if stats else None,
+        })
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error in debug_profile: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/debug/cache', methods=['GET'])
+def debug_cache():
+    """Size and hit/miss/eviction counts of the rendered-chat cache."""
+    return jsonify(render_cache.stats())
+
+@app.route('/api/debug/admission', methods=['GET'])
+def debug_admission():
+    """Running and queued extractions, the budget, and admission/rejection counts."""
+    return jsonify(admission.stats())
+
+@app.route('/api/duplicates', methods=['GET'])
+def get_duplicates():
+    """List clusters of near-duplicate chats, newest chat first in each."""
+    try:
+        logger.info(f"Received request for duplicate chats from {request.remote_addr}")
+        duplicate_detector.update(roots.load_chats())
+        clusters = duplicate_detector.describe()
+        return jsonify({
+            "clusters": clusters,
+            "duplicate_chats": sum(c["size"] - 1 for c in clusters),
+        })
+    except Overloaded as e:
+        return overloaded_response(e)
+    except MissingDependency as e:
+        return jsonify({"error": str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error in get_duplicates: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 500
 
 # Serve React app
 @app.route('/', defaults={'path': ''})
@@ -1020,8 +621,72 @@ def serve_react(path):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Run the Cursor Chat View server')
     parser.add_argument('--port', type=int, default=5000, help='Port to run the server on')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (default: 127.0.0.1; 0.0.0.0 for an aggregator '
+                             'other machines push to)')
     parser.add_argument('--debug', action='store_true', help='Run in debug mode')
+    parser.add_argument('--root', action='append', default=[], metavar='[NAME=]PATH',
+                        help='Cursor storage root to serve; repeat for several '
+                             '(default: the current user\'s Cursor directory)')
+    parser.add_argument('--profile', nargs='?', const='profiles', metavar='DIR',
+                        help='Profile the startup extraction and every API request into DIR '
+                             '(default: profiles/) and enable /api/debug/profile')
+    parser.add_argument('--sync-store', metavar='PATH',
+                        help='Act as an aggregator: accept chats pushed by --sync-to into this SQLite file')
+    parser.add_argument('--sync-to', metavar='URL',
+                        help='Instead of serving, push chat changes to the aggregator at URL')
+    parser.add_argument('--sync-source', help='Name for this machine on the aggregator (default: hostname)')
+    parser.add_argument('--sync-token', default=os.environ.get('CURSOR_VIEW_SYNC_TOKEN'),
+                        help='Shared secret between the aggregator and --sync-to clients; required '
+                             'with --sync-store (default: $CURSOR_VIEW_SYNC_TOKEN)')
+    parser.add_argument('--render-cache-mb', type=float,
+                        help='Memory for rendered chats and exports kept for repeat views '
+                             '(default: $CURSOR_VIEW_RENDER_CACHE_MB or 64; 0 disables)')
+    parser.add_argument('--sync-interval', type=float, default=60,
+                        help='Seconds between --sync-to pushes; 0 pushes once and exits')
+    parser.add_argument('--extract-memory-mb', type=float,
+                        help='Memory budget of concurrent full extractions, estimated from DB sizes '
+                             '(default: $CURSOR_VIEW_EXTRACT_MEMORY_MB or 1024)')
+    parser.add_argument('--max-extractions', type=int,
+                        help='Full extractions run at once '
+                             '(default: $CURSOR_VIEW_MAX_EXTRACTIONS or 2)')
+    parser.add_argument('--extract-queue', type=int,
+                        help='Extractions that may wait for the budget before requests get 503 '
+                             '(default: $CURSOR_VIEW_EXTRACT_QUEUE or 8)')
     args = parser.parse_args()
+    if args.sync_store and not args.sync_token:
+        parser.error('--sync-store needs --sync-token (or CURSOR_VIEW_SYNC_TOKEN) so only your machines can push')
+    
+    admission = AdmissionController(
+        int(args.extract_memory_mb * 1024 * 1024) if args.extract_memory_mb is not None
+        else admission.max_bytes,
+        args.max_extractions if args.max_extractions is not None else admission.max_running,
+        args.extract_queue if args.extract_queue is not None else admission.max_queued,
+    )
+    roots = RootSet(args.root, admission=admission)
+    for root in roots.roots:
+        logger.info(f"Serving Cursor root {root.name}: {root.path}")
+    if args.sync_to:
+        try:
+            totals = push_changes(args.sync_to, change_feed, format_chat_for_frontend,
+                                  args.sync_source, args.sync_interval, token=args.sync_token)
+            logger.info(f"Sync finished: {totals}")
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+    if args.profile:
+        profile_dir = Path(args.profile)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        _, stats = profiling.profile_call(extract_uncached)
+        stats.dump_stats(profile_dir / "startup-extraction.pstats")
+        logger.info("Startup extraction profile (top 15 by cumulative time):\n"
+                    + profiling.pstats_text(stats, limit=15))
+    if args.render_cache_mb is not None:
+        render_cache = RenderCache(int(args.render_cache_mb * 1024 * 1024))
+    if args.sync_store:
+        sync_store = SyncStore(args.sync_store)
+        sync_token = args.sync_token
+        logger.info(f"Accepting synced chats into {args.sync_store}")
     
-    logger.info(f"Starting server on port {args.port}")
-    app.run(host='127.0.0.1', port=args.port, debug=args.debug)
\ No newline at end of file
+    logger.info(f"Starting server on {args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, debug=args.debug)
\ No newline at end of file
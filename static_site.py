@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Render chats into a static website (`cursor_view.py build-site`).
+
+The output directory can be served by any static web server or opened from
+a file share; nothing runs at request time:
+
+    index.html                      projects, and a search box
+    projects/<slug>/index.html      chats of one project, newest first,
+    projects/<slug>/page-N.html     PAGE_SIZE per page
+    chats/<id>.html                 one page per chat (generate_standalone_html)
+    search/index.json               search manifest: shard ranges and files
+    search/chats.json.gz            [id, title, project, date, page] per chat
+    search/shard-NNN.json.gz        {term: delta-encoded chat numbers}
+    search.js                       client-side search
+
+The search index maps every word of every message to the chats containing
+it. Terms are sorted and split into shards of about SHARD_BYTES, so a query
+only downloads the shards whose term range its words fall in, and prefix
+queries ("auth tok") work as in the app. Shards are gzip-compressed; the
+browser inflates them with DecompressionStream.
+
+Chat pages and shards are rendered and written by a process pool, since
+rendering is CPU-bound.
+"""
+
+import datetime
+import gzip
+import html
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from chat_format import STANDALONE_CSS, generate_standalone_html
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+SHARD_BYTES = 256 * 1024
+# Longer "words" are hashes, base64 and minified code nobody searches for
+MAX_TERM_LENGTH = 40
+CHAT_BATCH = 200
+MANIFEST_VERSION = 1
+
+WORD_RE = re.compile(r"\w+")
+
+################################################################################
+# Helpers
+################################################################################
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", text).strip("-.") or "x"
+
+
+def _when(date) -> str:
+    try:
+        return datetime.datetime.fromtimestamp(date).strftime("%Y-%m-%d %H:%M")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return ""
+
+
+def _preview(chat: Dict[str, Any], width: int = 120) -> str:
+    for msg in chat["messages"]:
+        if msg.get("role") == "user" and msg.get("content"):
+            text = " ".join(msg["content"].split())
+            return text if len(text) <= width else text[:width - 1] + "…"
+    return ""
+
+
+def _page(title: str, body: str, base: str = "") -> str:
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(title)}</title>
+    <style>
+{STANDALONE_CSS}
+        .chat-row {{ padding: 10px 0; border-bottom: 1px solid #eee; }}
+        .chat-row .meta {{ color: #777; font-size: 0.85em; }}
+        .pager a, .pager span {{ margin-right: 10px; }}
+        #search {{ width: 100%; padding: 8px; font-size: 1em; box-sizing: border-box; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1><a href="{base}index.html" style="color: #2c3e50; text-decoration: none;">Cursor Chats</a></h1>
+    </div>
+{body}
+</body>
+</html>
+"""
+
+
+def _chat_row(entry: Dict[str, Any], base: str) -> str:
+    meta = f"{html.escape(entry['project'])} · {_when(entry['date'])} · {entry['messages']} messages"
+    return (f'<div class="chat-row"><a href="{base}{entry["page"]}">{html.escape(entry["title"])}</a>'
+            f'<div class="meta">{meta}</div>'
+            f'<div>{html.escape(entry["preview"])}</div></div>')
+
+
+def _terms(chat: Dict[str, Any]) -> set:
+    words = set()
+    for msg in chat["messages"]:
+        content = msg.get("content")
+        if isinstance(content, str):
+            words.update(WORD_RE.findall(content.lower()))
+    return {w for w in words if len(w) <= MAX_TERM_LENGTH}
+
+
+def _write(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+################################################################################
+# Workers (run in the process pool)
+################################################################################
+def _render_chats(out_dir: str, chats: List[Dict[str, Any]], pages: List[str]) -> List[List[str]]:
+    """Write the pages of a batch of chats; return the search terms of each."""
+    back = '<p style="margin: 0 0 20px 0;"><a href="../index.html">← All chats</a></p>'
+    terms = []
+    for chat, page in zip(chats, pages):
+        page_html = generate_standalone_html(chat).replace("<body>", "<body>\n    " + back, 1)
+        _write(Path(out_dir, page), page_html.encode("utf-8"))
+        terms.append(sorted(_terms(chat)))
+    return terms
+
+
+def _write_shard(out_dir: str, name: str, postings: Dict[str, List[int]]):
+    data = json.dumps(postings, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _write(Path(out_dir, "search", name), gzip.compress(data, compresslevel=9, mtime=0))
+
+################################################################################
+# Site
+################################################################################
+def _delta(numbers: List[int]) -> List[int]:
+    return [n - prev for prev, n in zip([0] + numbers, numbers)]
+
+
+def split_shards(postings: Dict[str, List[int]], shard_bytes: int = SHARD_BYTES) -> List[Dict[str, List[int]]]:
+    """Split delta-encoded postings into shards of consecutive terms of about `shard_bytes`."""
+    shards, current, size = [], {}, 0
+    for term in sorted(postings):
+        entry = _delta(postings[term])
+        cost = len(term) + 4 + sum(len(str(n)) + 1 for n in entry)
+        if current and size + cost > shard_bytes:
+            shards.append(current)
+            current, size = {}, 0
+        current[term] = entry
+        size += cost
+    if current:
+        shards.append(current)
+    return shards
+
+
+def build_site(chats: List[Dict[str, Any]], titles: Dict[str, str], out_dir: Path,
+               page_size: int = PAGE_SIZE, shard_bytes: int = SHARD_BYTES,
+               workers: int = None) -> Dict[str, Any]:
+    """
+    Write the static site for `chats` (formatted for the frontend, newest
+    first) to `out_dir`. `titles` maps session ids to chat titles.
+
+    The site is built next to `out_dir` and then swapped in, so a server
+    never sees a half-written site; an existing `out_dir` must be an
+    earlier build. Returns counts for a summary line.
+    """
+    out_dir = Path(out_dir)
+    if out_dir.exists() and not (out_dir / "search" / "index.json").exists():
+        raise RuntimeError(f"{out_dir} exists and is not a site built by build-site; choose another directory")
+    building = out_dir.with_name(out_dir.name + ".building")
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+    t0 = time.perf_counter()
+
+    # Per-chat entries, grouped by project (newest project first)
+    entries, by_project = [], defaultdict(list)
+    slugs: Dict[str, str] = {}
+    for chat in chats:
+        project = chat.get("project", {}).get("name") or "Unknown Project"
+        if project not in slugs:
+            slug = _slug(project)
+            while slug in slugs.values():
+                slug += "-"
+            slugs[project] = slug
+        entry = {
+            "id": chat["session_id"],
+            "title": titles.get(chat["session_id"]) or _preview(chat, 60) or "(untitled)",
+            "project": project,
+            "date": chat.get("date"),
+            "messages": len(chat["messages"]),
+            "preview": _preview(chat),
+            "page": f"chats/{_slug(chat['session_id'])}.html",
+        }
+        entries.append(entry)
+        by_project[project].append(entry)
+
+    # Chat pages, in parallel; their terms come back for the search index
+    postings: Dict[str, List[int]] = defaultdict(list)
+    workers = workers or os.cpu_count() or 1
+    batches = [range(i, min(i + CHAT_BATCH, len(chats))) for i in range(0, len(chats), CHAT_BATCH)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_chats, str(building), [chats[i] for i in batch],
+                               [entries[i]["page"] for i in batch]) for batch in batches]
+
+        # Index pages are cheap; write them while the chat pages render
+        for project, project_entries in by_project.items():
+            slug = slugs[project]
+            pages = max(1, -(-len(project_entries) // page_size))
+            for page in range(pages):
+                name = "index.html" if page == 0 else f"page-{page + 1}.html"
+                rows = "\n".join(_chat_row(e, "../../") for e in project_entries[page * page_size:(page + 1) * page_size])
+                pager = " ".join(
+                    f"<span>{n + 1}</span>" if n == page else
+                    f'<a href="{"index.html" if n == 0 else f"page-{n + 1}.html"}">{n + 1}</a>'
+                    for n in range(pages))
+                body = (f"    <h2>{html.escape(project)}</h2>\n"
+                        f"    <p>{len(project_entries)} chats</p>\n{rows}\n"
+                        + (f'    <p class="pager">{pager}</p>\n' if pages > 1 else ""))
+                _write(building / "projects" / slug / name,
+                       _page(f"Cursor Chats - {project}", body, "../../").encode("utf-8"))
+
+        project_rows = "\n".join(
+            f'<div class="chat-row"><a href="projects/{slugs[p]}/index.html">{html.escape(p)}</a>'
+            f'<div class="meta">{len(e)} chats · last {_when(e[0]["date"])}</div></div>'
+            for p, e in by_project.items())
+        body = (f'    <input id="search" type="search" placeholder="Search all {len(chats)} chats" autocomplete="off">\n'
+                f'    <div id="results"></div>\n'
+                f'    <div id="projects">\n    <h2>Projects</h2>\n{project_rows}\n    </div>\n'
+                f'    <script src="search.js"></script>')
+        _write(building / "index.html", _page("Cursor Chats", body).encode("utf-8"))
+        _write(building / "search.js", SEARCH_JS.encode("utf-8"))
+
+        number = 0
+        for future in futures:
+            for terms in future.result():
+                for term in terms:
+                    postings[term].append(number)
+                number += 1
+
+        shards = split_shards(postings, shard_bytes)
+        names = [f"shard-{i:03}.json.gz" for i in range(len(shards))]
+        shard_futures = [pool.submit(_write_shard, str(building), name, shard)
+                         for name, shard in zip(names, shards)]
+        chat_list = [[e["id"], e["title"], e["project"], e["date"], e["page"]] for e in entries]
+        _write(building / "search" / "chats.json.gz",
+               gzip.compress(json.dumps(chat_list, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                             compresslevel=9, mtime=0))
+        for future in shard_futures:
+            future.result()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "chats": len(chats),
+        "chat_list": "chats.json.gz",
+        # Shard i holds the terms from first[i] up to first[i + 1]
+        "shards": [{"file": name, "first": next(iter(shard))} for name, shard in zip(names, shards)],
+    }
+    _write(building / "search" / "index.json", json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+
+    if out_dir.exists():
+        old = out_dir.with_name(out_dir.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(out_dir, old)
+        os.replace(building, out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(building, out_dir)
+
+    elapsed = time.perf_counter() - t0
+    logger.info(f"Built site for {len(chats)} chats in {elapsed:.2f}s")
+    return {"chats": len(chats), "projects": len(by_project), "terms": len(postings),
+            "shards": len(shards), "seconds": round(elapsed, 2)}
+
+################################################################################
+# Client-side search
+################################################################################
+SEARCH_JS = r"""// Search over the prebuilt index in search/ (see static_site.py)
+(() => {
+  const WORD_RE = /[\p{L}\p{N}_]+/gu;
+  const MAX_RESULTS = 200;
+  const input = document.getElementById('search');
+  const results = document.getElementById('results');
+  const projects = document.getElementById('projects');
+  const cache = new Map();  // file -> Promise of parsed JSON
+  let manifest = null;
+  let latest = 0;
+
+  // Shards may arrive still gzipped, or inflated by a server that sends them
+  // with Content-Encoding: gzip
+  const load = (file) => {
+    if (!cache.has(file)) {
+      cache.set(file, fetch('search/' + file).then(r => r.arrayBuffer()).then(async (buf) => {
+        const bytes = new Uint8Array(buf);
+        if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+          const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+          return new Response(stream).json();
+        }
+        return JSON.parse(new TextDecoder().decode(bytes));
+      }));
+    }
+    return cache.get(file);
+  };
+
+  // Shards whose term range overlaps the words starting with `prefix`
+  const shardsFor = (prefix) => {
+    const shards = manifest.shards;
+    const upper = prefix + '\uffff';
+    let first = 0;
+    while (first + 1 < shards.length && shards[first + 1].first <= prefix) first++;
+    const out = [];
+    for (let i = first; i < shards.length && shards[i].first < upper; i++) out.push(shards[i].file);
+    return out;
+  };
+
+  const chatsWithPrefix = async (prefix) => {
+    const found = new Set();
+    for (const shard of await Promise.all(shardsFor(prefix).map(load))) {
+      for (const [term, deltas] of Object.entries(shard)) {
+        if (!term.startsWith(prefix)) continue;
+        let n = 0;
+        for (const d of deltas) found.add(n += d);
+      }
+    }
+    return found;
+  };
+
+  const pad = (n) => String(n).padStart(2, '0');
+  const formatDate = (d) => `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())} ${pad(d.getHours())}:${pad(d.getMinutes())}`;
+
+  const escape = (s) => String(s).replace(/[&<>"]/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' }[c]));
+
+  const search = async (query, id) => {
+    manifest = manifest || await fetch('search/index.json').then(r => r.json());
+    const prefixes = Array.from(new Set(query.toLowerCase().match(WORD_RE) || []));
+    const [chatList, ...sets] = await Promise.all([load(manifest.chat_list), ...prefixes.map(chatsWithPrefix)]);
+    if (id !== latest) return;
+    sets.sort((a, b) => a.size - b.size);
+    const [smallest, ...rest] = sets;
+    // Chat numbers follow the newest-first order of the site
+    const hits = Array.from(smallest || []).filter(n => rest.every(set => set.has(n))).sort((a, b) => a - b);
+    const rows = hits.slice(0, MAX_RESULTS).map((n) => {
+      const [, title, project, date, page] = chatList[n];
+      const when = date ? formatDate(new Date(date * 1000)) : '';
+      return `<div class="chat-row"><a href="${escape(page)}">${escape(title)}</a>`
+        + `<div class="meta">${escape(project)} · ${when}</div></div>`;
+    });
+    results.innerHTML = `<p>${hits.length} matching chats${hits.length > MAX_RESULTS ? ` (showing ${MAX_RESULTS})` : ''}</p>`
+      + rows.join('');
+  };
+
+  let timer = null;
+  input.addEventListener('input', () => {
+    clearTimeout(timer);
+    const query = input.value.trim();
+    const id = ++latest;
+    if (!query) {
+      results.innerHTML = '';
+      projects.hidden = false;
+      return;
+    }
+    timer = setTimeout(() => {
+      projects.hidden = true;
+      search(query, id).catch((err) => { results.textContent = 'Search failed: ' + err; });
+    }, 150);
+  });
+})();
+"""
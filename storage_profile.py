@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Report where the bytes in Cursor's databases go, per key family.
+
+Usage:
+    python storage_profile.py                      # every DB under this user's Cursor root
+    python storage_profile.py --root PATH          # another root (backup, other user)
+    python storage_profile.py state.vscdb ...      # specific DB files
+    python storage_profile.py --json > profile.json
+
+For each DB and each key family (the key up to its first ':' in cursorDiskKV,
+e.g. bubbleId: or checkpointId:, or up to its first '.' in ItemTable) it
+prints the row count, the total and p50/p99 value sizes, and an estimate of
+how long extraction would spend reading and JSON-decoding the family.
+
+Rows are counted on the key index, and sizes come from a sample of evenly
+spaced keys per family (--sample, default 200) rather than from reading every
+value, so this finishes in seconds even on multi-GB databases. Totals of
+families with more rows than the sample are estimates, as are the timings,
+which extrapolate the sample's fetch and json.loads() time per byte. Families
+chat extraction reads are marked, along with roughly how much of the DB a
+`vscdb_to_sqlite.py --slim` copy would keep.
+"""
+
+import argparse
+import json
+import logging
+import pathlib
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from cursor_extraction import (
+    AI_SERVICE_PREFIXES,
+    DISK_KV_DECODERS,
+    LAYOUT_FAMILIES,
+    WORKSPACE_KEYS,
+    cursor_root,
+    global_storage_path,
+    prefix_range,
+    workspaces,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE = 200
+TABLES = ("cursorDiskKV", "ItemTable")
+# Character that ends the family part of a key, per table
+FAMILY_SEPARATORS = {"cursorDiskKV": ":", "ItemTable": "."}
+CHAT_ITEM_KEYS = tuple(WORKSPACE_KEYS) + LAYOUT_FAMILIES["ItemTable"] + AI_SERVICE_PREFIXES
+
+
+def family_of(table: str, key: str) -> str:
+    """The family prefix of `key`, including its separator (the whole key if it has none)."""
+    i = key.find(FAMILY_SEPARATORS[table])
+    return key if i < 0 else key[:i + 1]
+
+
+def chat_usage(table: str, family: str) -> str:
+    """'yes' if chat extraction reads the whole family, 'part' if some keys of it, else ''."""
+    if table == "cursorDiskKV":
+        return "yes" if family in DISK_KV_DECODERS else ""
+    return "part" if any(key.startswith(family) for key in CHAT_ITEM_KEYS) else ""
+
+
+def _percentile(sorted_values: List[int], q: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _value_bytes(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(value)
+
+
+def _families(cur: sqlite3.Cursor, table: str):
+    """Yield (family, low, high) key ranges, skipping over each family on the key index."""
+    low = ""
+    while True:
+        row = cur.execute(f"SELECT key FROM {table} WHERE key >= ? ORDER BY key LIMIT 1", (low,)).fetchone()
+        if row is None or row[0] is None:
+            return
+        family = family_of(table, row[0])
+        low, high = prefix_range(family) if family else (family, "\x00")
+        yield family, low, high
+        low = high
+
+
+def profile_family(cur: sqlite3.Cursor, table: str, family: str, low: str, high: str,
+                   sample: int = DEFAULT_SAMPLE) -> Dict[str, Any]:
+    """Row count, size distribution and estimated read/decode time of one key family."""
+    rows = cur.execute(f"SELECT count(*) FROM {table} WHERE key >= ? AND key < ?", (low, high)).fetchone()[0]
+    # Every stride-th key in key order; ids in keys are random, so this is an even sample
+    stride = max(1, rows // sample)
+    keys = [k for (k,) in cur.execute(
+        f"SELECT key FROM (SELECT key, row_number() OVER (ORDER BY key) AS n FROM {table} "
+        f"WHERE key >= ? AND key < ?) WHERE (n - 1) % ? = 0 LIMIT ?", (low, high, stride, sample))]
+
+    sizes = []
+    read_time = decode_time = 0.0
+    if keys:
+        start = time.perf_counter()
+        values = [v for (v,) in cur.execute(
+            f"SELECT value FROM {table} WHERE key IN ({','.join('?' * len(keys))})", keys)]
+        read_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for value in values:
+            sizes.append(_value_bytes(value))
+            try:
+                json.loads(value)
+            except (TypeError, ValueError):
+                pass
+        decode_time = time.perf_counter() - start
+    sizes.sort()
+
+    sampled_bytes = sum(sizes)
+    exact = len(sizes) == rows
+    total = sampled_bytes if exact else int(sampled_bytes / len(sizes) * rows) if sizes else 0
+    per_byte = lambda seconds: seconds / sampled_bytes if sampled_bytes else 0.0
+    return {
+        "table": table,
+        "family": family,
+        "rows": rows,
+        "total_bytes": total,
+        "exact": exact,
+        "p50_bytes": _percentile(sizes, 0.50),
+        "p99_bytes": _percentile(sizes, 0.99),
+        "max_sampled_bytes": sizes[-1] if sizes else 0,
+        "sampled": len(sizes),
+        "est_read_s": round(total * per_byte(read_time), 3),
+        "est_decode_s": round(total * per_byte(decode_time), 3),
+        "chat": chat_usage(table, family),
+    }
+
+
+def profile_db(db: pathlib.Path, sample: int = DEFAULT_SAMPLE) -> Dict[str, Any]:
+    """Profile every key family of the KV tables of one DB."""
+    wal = db.with_name(db.name + "-wal")
+    result = {
+        "db": str(db),
+        "file_bytes": db.stat().st_size + (wal.stat().st_size if wal.exists() else 0),
+        "families": [],
+    }
+    start = time.perf_counter()
+    try:
+        con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        try:
+            cur = con.cursor()
+            tables = {name for (name,) in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+            for table in TABLES:
+                if table not in tables:
+                    continue
+                for family, low, high in list(_families(cur, table)):
+                    result["families"].append(profile_family(cur, table, family, low, high, sample))
+        finally:
+            con.close()
+    except sqlite3.DatabaseError as e:
+        result["error"] = str(e)
+    result["families"].sort(key=lambda f: f["total_bytes"], reverse=True)
+    result["value_bytes"] = sum(f["total_bytes"] for f in result["families"])
+    result["chat_bytes"] = sum(f["total_bytes"] for f in result["families"] if f["chat"] == "yes")
+    result["profile_s"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def default_dbs(root: pathlib.Path) -> List[pathlib.Path]:
+    """The global DB and every workspace DB under a Cursor root."""
+    dbs = []
+    global_db = global_storage_path(root)
+    if global_db:
+        dbs.append(global_db)
+    dbs.extend(db for _, db in workspaces(root))
+    return dbs
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:,.1f}"
+
+
+def print_profile(profile: Dict[str, Any], limit: Optional[int] = None, out=sys.stdout):
+    print(f"{profile['db']}  ({_mb(profile['file_bytes'])} MB on disk, profiled in {profile['profile_s']}s)", file=out)
+    if "error" in profile:
+        print(f"  error: {profile['error']}", file=out)
+    families = profile["families"][:limit] if limit else profile["families"]
+    if families:
+        print(f"  {'table':<13}{'family':<32}{'rows':>10}{'total MB':>11}{'p50 B':>9}{'p99 B':>10}"
+              f"{'read s':>9}{'decode s':>10}  chat", file=out)
+    for f in families:
+        family = f["family"] if len(f["family"]) <= 30 else f["family"][:29] + "…"
+        total = _mb(f["total_bytes"]) + ("" if f["exact"] else "~")
+        print(f"  {f['table']:<13}{family:<32}{f['rows']:>10,}{total:>11}{f['p50_bytes']:>9,}{f['p99_bytes']:>10,}"
+              f"{f['est_read_s']:>9.2f}{f['est_decode_s']:>10.2f}  {f['chat']}", file=out)
+    hidden = len(profile["families"]) - len(families)
+    if hidden > 0:
+        print(f"  ... {hidden} smaller families", file=out)
+    if profile["chat_bytes"]:
+        print(f"  chat families: {_mb(profile['chat_bytes'])} of {_mb(profile['value_bytes'])} MB of values "
+              f"({profile['chat_bytes'] / profile['value_bytes']:.0%}; about what a --slim copy keeps)", file=out)
+    print(file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the key families of Cursor's databases")
+    parser.add_argument("dbs", nargs="*", type=pathlib.Path, help="DB files (default: all under --root)")
+    parser.add_argument("--root", type=pathlib.Path, help="Cursor storage root (default: this user's)")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="Values sampled per family")
+    parser.add_argument("--limit", type=int, default=20, help="Families shown per DB (0: all)")
+    parser.add_argument("--json", action="store_true", help="Print the full profile as JSON")
+    args = parser.parse_args(argv)
+    if args.sample < 1:
+        parser.error("--sample must be at least 1")
+
+    dbs = args.dbs or default_dbs(args.root or cursor_root())
+    if not dbs:
+        parser.exit(1, "No Cursor databases found\n")
+    missing = [db for db in dbs if not db.exists()]
+    if missing:
+        parser.exit(1, f"Not found: {', '.join(map(str, missing))}\n")
+
+    profiles = [profile_db(db, args.sample) for db in dbs]
+    if args.json:
+        json.dump(profiles, sys.stdout, indent=2)
+        print()
+    else:
+        for profile in profiles:
+            print_profile(profile, args.limit or None)
+
+
+if __name__ == "__main__":
+    main()
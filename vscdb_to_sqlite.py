@@ -4,16 +4,26 @@ Convert a vscdb file to a sqlite file by copying and validating the database.
 
 Usage:
     python vscdb_to_sqlite.py [input_vscdb_file] [output_sqlite_file]
+    python vscdb_to_sqlite.py --slim [--strip-large-fields] [input_vscdb_file] [output_sqlite_file]
 
 If output file is not specified, it creates a file with the same name but .sqlite extension.
+
+--slim writes a compact copy holding only the chat key families (bubbleId:*
+and composerData:* in cursorDiskKV, the chat keys of ItemTable) instead of
+the whole file. --strip-large-fields also drops large bubble and composer
+fields that chat extraction never reads (code blocks, diffs, context...).
 """
 
+import argparse
+import json
 import sqlite3
 import sys
 import os
 import shutil
 from pathlib import Path
 
+from cursor_extraction import AI_SERVICE_PREFIXES, DISK_KV_DECODERS, LAYOUT_FAMILIES, WORKSPACE_KEYS, prefix_range
+
 
 def validate_sqlite_db(file_path):
     """Validate that the file is a valid SQLite database."""
@@ -71,15 +81,149 @@ def convert_vscdb_to_sqlite(input_file, output_file=None):
         return False, f"Conversion failed: {message}"
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python vscdb_to_sqlite.py [input_vscdb_file] [output_sqlite_file]")
-        return
+# Chat key families kept by --slim: (table, exact keys, key prefixes)
+SLIM_FAMILIES = (
+    ("cursorDiskKV", (), tuple(DISK_KV_DECODERS)),
+    ("ItemTable", tuple(dict.fromkeys(WORKSPACE_KEYS + LAYOUT_FAMILIES["ItemTable"])), AI_SERVICE_PREFIXES),
+)
+
+# Fields chat extraction reads; with --strip-large-fields any other field
+# whose JSON is larger than STRIP_MIN_BYTES is dropped
+BUBBLE_FIELDS = {"type", "bubbleId", "text", "richText"}
+COMPOSER_FIELDS = {"composerId", "name", "createdAt", "lastUpdatedAt",
+                   "fullConversationHeadersOnly", "conversation"}
+STRIP_MIN_BYTES = 256
+
+
+def _strip_fields(obj, keep):
+    stripped = {}
+    for field, value in obj.items():
+        if field in keep or len(json.dumps(value)) <= STRIP_MIN_BYTES:
+            stripped[field] = value
+    # richText is only a fallback for bubbles without plain text
+    if "richText" in stripped and (obj.get("text") or "").strip():
+        del stripped["richText"]
+    return stripped
+
+
+def strip_large_fields(key, value):
+    """SQL function: `value` of a cursorDiskKV row with its large unused fields removed."""
+    if value is None:
+        return value
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return value
+    if not isinstance(data, dict):
+        return value
+    if key.startswith("bubbleId:"):
+        data = _strip_fields(data, BUBBLE_FIELDS)
+    elif key.startswith("composerData:"):
+        data = _strip_fields(data, COMPOSER_FIELDS)
+        if isinstance(data.get("conversation"), list):
+            data["conversation"] = [_strip_fields(b, BUBBLE_FIELDS) if isinstance(b, dict) else b
+                                    for b in data["conversation"]]
+    else:
+        return value
+    stripped = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return stripped.encode("utf-8") if isinstance(value, bytes) else stripped
+
+
+def slim_vscdb(input_file, output_file=None, strip=False):
+    """
+    Write a compact copy of a .vscdb file holding only the chat key families.
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    The rows are copied into a staging database next to the output, which is
+    then written out with VACUUM INTO: the result is defragmented and only
+    appears under its final name once complete. The input is opened
+    read-only, so this is safe while Cursor is running.
     
-    success, message = convert_vscdb_to_sqlite(input_file, output_file)
+    Args:
+        input_file: Path to the input .vscdb file
+        output_file: Path to the output file. If None, uses input name with .sqlite extension
+        strip: Also drop large bubble/composer fields chat extraction does not read
+    
+    Returns:
+        tuple: (success, message)
+    """
+    input_path = Path(input_file)
+    if not input_path.exists():
+        return False, f"Input file not found: {input_file}"
+    output_path = input_path.with_suffix('.sqlite') if output_file is None else Path(output_file)
+    if output_path.resolve() == input_path.resolve():
+        return False, "Output file must differ from the input file"
+    staging_path = output_path.with_name(output_path.name + ".staging")
+    vacuumed_path = output_path.with_name(output_path.name + ".tmp")
+    
+    counts = {}
+    try:
+        for path in (staging_path, vacuumed_path):
+            path.unlink(missing_ok=True)
+        conn = sqlite3.connect(f"file:{staging_path}", uri=True)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("ATTACH DATABASE ? AS src", (f"file:{input_path}?mode=ro",))
+            if strip:
+                conn.create_function("strip_large_fields", 2, strip_large_fields, deterministic=True)
+            
+            schemas = dict(conn.execute("SELECT name, sql FROM src.sqlite_master WHERE type='table'"))
+            for table, keys, prefixes in SLIM_FAMILIES:
+                if table not in schemas:
+                    continue
+                conn.execute(schemas[table])
+                clauses, params = [], []
+                if keys:
+                    clauses.append(f"key IN ({','.join('?' * len(keys))})")
+                    params.extend(keys)
+                for prefix in prefixes:
+                    clauses.append("(key >= ? AND key < ?)")
+                    params.extend(prefix_range(prefix))
+                value = "strip_large_fields(key, value)" if strip and table == "cursorDiskKV" else "value"
+                # Keep rowid order so the copy scans like the original
+                cur = conn.execute(f"INSERT INTO main.{table} (key, value) SELECT key, {value} FROM src.{table} "
+                                   f"WHERE {' OR '.join(clauses)} ORDER BY rowid", params)
+                counts[table] = cur.rowcount
+            conn.commit()
+            conn.execute("DETACH DATABASE src")
+            conn.execute("VACUUM INTO ?", (str(vacuumed_path),))
+        finally:
+            conn.close()
+        os.replace(vacuumed_path, output_path)
+    except (sqlite3.Error, OSError) as e:
+        vacuumed_path.unlink(missing_ok=True)
+        return False, f"Error writing slim copy: {str(e)}"
+    finally:
+        staging_path.unlink(missing_ok=True)
+    
+    is_valid, message = validate_sqlite_db(output_path)
+    if not is_valid:
+        output_path.unlink(missing_ok=True)
+        return False, f"Conversion failed: {message}"
+    before = input_path.stat().st_size
+    after = output_path.stat().st_size
+    rows = ", ".join(f"{n} {table} rows" for table, n in counts.items()) or "no chat tables"
+    return True, (f"Wrote slim copy to {output_path} ({rows})\n"
+                  f"{before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB "
+                  f"({after / before:.1%} of the original)" if before else f"Wrote slim copy to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a vscdb file to a sqlite file")
+    parser.add_argument("input_file", help="Input .vscdb file")
+    parser.add_argument("output_file", nargs="?", help="Output file (default: input name with .sqlite extension)")
+    parser.add_argument("--slim", action="store_true",
+                        help="Only copy the chat key families, compacted with VACUUM INTO")
+    parser.add_argument("--strip-large-fields", action="store_true",
+                        help="With --slim, also drop large bubble/composer fields chat extraction does not read")
+    args = parser.parse_args()
+    if args.strip_large_fields and not args.slim:
+        parser.error("--strip-large-fields requires --slim")
+    
+    if args.slim:
+        success, message = slim_vscdb(args.input_file, args.output_file, strip=args.strip_large_fields)
+    else:
+        success, message = convert_vscdb_to_sqlite(args.input_file, args.output_file)
     print(message)
     sys.exit(0 if success else 1)
 
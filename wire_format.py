@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Binary wire formats for the chat APIs, and a benchmark against JSON.
+
+/api/chats and /api/chat/<id> answer in MessagePack or CBOR when the
+request's Accept header prefers it and the encoder is installed
+(`python3 -m pip install msgpack` / `cbor2`); otherwise, and by default,
+they answer JSON as before. Both formats carry the same objects as the JSON
+responses, so the frontend decodes them to identical data.
+
+Run this file to compare the formats on your own chats:
+
+    python3 wire_format.py [--root PATH] [--limit N]
+
+It prints the payload size and the encode/decode time of every chat as
+served by /api/chat/<id>, per format.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cursor_extraction import MissingDependency
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# mimetype -> (module, pip package)
+BINARY_FORMATS = {
+    MSGPACK: ("msgpack", "msgpack"),
+    CBOR: ("cbor2", "cbor2"),
+}
+
+_codecs: Dict[str, Optional[Tuple[Callable, Callable]]] = {}
+
+
+def _load_codec(mimetype: str) -> Optional[Tuple[Callable, Callable]]:
+    """(encode, decode) of a binary format, or None if its module is missing."""
+    if mimetype not in _codecs:
+        try:
+            if mimetype == MSGPACK:
+                import msgpack
+                codec = (lambda obj: msgpack.packb(obj, use_bin_type=True),
+                         lambda data: msgpack.unpackb(data, raw=False))
+            else:
+                import cbor2
+                codec = (cbor2.dumps, cbor2.loads)
+        except ImportError:
+            codec = None
+        _codecs[mimetype] = codec
+    return _codecs[mimetype]
+
+
+def available_formats() -> List[str]:
+    """JSON first (the default for */*), then the installed binary formats."""
+    return [JSON] + [m for m in BINARY_FORMATS if _load_codec(m) is not None]
+
+
+def negotiate(accept) -> str:
+    """Best format for a werkzeug Accept header; JSON unless a binary one is preferred."""
+    return accept.best_match(available_formats(), default=JSON) or JSON
+
+
+def encode(mimetype: str, obj: Any) -> bytes:
+    if mimetype == JSON:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    codec = _load_codec(mimetype)
+    if codec is None:
+        module, package = BINARY_FORMATS[mimetype]
+        raise MissingDependency(f"{mimetype} responses need {module}: python3 -m pip install {package}")
+    return codec[0](obj)
+
+
+def decode(mimetype: str, data: bytes) -> Any:
+    if mimetype == JSON:
+        return json.loads(data)
+    codec = _load_codec(mimetype)
+    if codec is None:
+        module, package = BINARY_FORMATS[mimetype]
+        raise MissingDependency(f"{mimetype} responses need {module}: python3 -m pip install {package}")
+    return codec[1](data)
+
+################################################################################
+# Benchmark
+################################################################################
+def benchmark(payloads: List[Any], repeat: int = 3) -> List[Dict[str, Any]]:
+    """Total size and best-of-`repeat` encode/decode time of `payloads` per format."""
+    results = []
+    for mimetype in [JSON] + list(BINARY_FORMATS):
+        if mimetype != JSON and _load_codec(mimetype) is None:
+            results.append({"format": mimetype, "error": f"{BINARY_FORMATS[mimetype][1]} not installed"})
+            continue
+        encoded = [encode(mimetype, p) for p in payloads]
+        encode_s = decode_s = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for p in payloads:
+                encode(mimetype, p)
+            encode_s = min(encode_s, time.perf_counter() - start)
+            start = time.perf_counter()
+            for data in encoded:
+                decode(mimetype, data)
+            decode_s = min(decode_s, time.perf_counter() - start)
+        results.append({
+            "format": mimetype,
+            "bytes": sum(len(data) for data in encoded),
+            "encode_ms": round(encode_s * 1000, 2),
+            "decode_ms": round(decode_s * 1000, 2),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON, MessagePack and CBOR on your chats")
+    parser.add_argument("--root", action="append", default=[], metavar="[NAME=]PATH",
+                        help="Cursor storage root; repeat for several (default: this user's)")
+    parser.add_argument("--limit", type=int, help="Only the N most recent chats")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from chat_format import format_chat_for_frontend
+    from cursor_roots import RootSet
+
+    roots = RootSet(args.root)
+    chats = roots.load_chats(timeout=None)[:args.limit]
+    project_cache = {}
+    payloads = [format_chat_for_frontend(chat, project_cache, roots) for chat in chats]
+    print(f"{len(payloads)} chats, {sum(len(p['messages']) for p in payloads)} messages", file=sys.stderr)
+
+    results = benchmark(payloads, args.repeat)
+    base = results[0]
+    print(f"{'format':<22}{'MB':>9}{'size':>8}{'encode ms':>12}{'decode ms':>12}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['format']:<22}  ({r['error']})")
+            continue
+        print(f"{r['format']:<22}{r['bytes'] / 1024 / 1024:>9.2f}{r['bytes'] / base['bytes']:>8.0%}"
+              f"{r['encode_ms']:>12.1f}{r['decode_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()